@@ -0,0 +1,8 @@
+from economy.util import AppEventManager
+
+def register_events(event_manager: AppEventManager):
+    event_manager.register_event('on_trackers_flushed')
+    event_manager.register_event('on_trackers_reset')
+
+def register_functions(event_manager: AppEventManager):
+    pass
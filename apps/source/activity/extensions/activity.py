@@ -5,15 +5,15 @@ from django.utils import timezone
 from asgiref.sync import sync_to_async
 
 from apps.source.activity.settings import VOICE_CONFIG
-from apps.source.activity.util import (
-    get_activity_tracker_list,
-    daily_activity_tracker_reset,
-    get_active_multiplier,
-)
+from apps.source.activity.sessions import VOICE_SESSIONS
+from apps.source.activity.util import get_active_multiplier
 from apps.source.activity.models import ActivityMultiplier, ActivityController
+from apps.source.activity.snapshot import MULTIPLIER_SNAPSHOTS
+from apps.source.holiday.schedule import HOLIDAY_CALENDARS
 
 
 RESET_TIME = timezone.make_aware(time(hour=VOICE_CONFIG['REWARD_RESET_HOUR'], minute=0), timezone.get_current_timezone())
+MIDNIGHT = timezone.make_aware(time(hour=0, minute=0), timezone.get_current_timezone())
 
 class ActivityCog(commands.Cog):
     def __init__(self, bot: commands.Bot, activity_controller: ActivityController, active_multiplier: ActivityMultiplier):
@@ -21,24 +21,41 @@ class ActivityCog(commands.Cog):
         self.activity_controller = activity_controller
         self.active_multiplier = active_multiplier
         self.reset_activity.start()
+        # Weekends and holidays start at midnight, the reset already handles it when it runs at midnight
+        if VOICE_CONFIG['REWARD_RESET_HOUR'] != 0:
+            self.transition_day.start()
 
     def cog_unload(self):
         self.reset_activity.cancel()
+        self.transition_day.cancel()
 
-    @tasks.loop(time=RESET_TIME)
-    async def reset_activity(self):
-        all_trackers = await sync_to_async(get_activity_tracker_list)()
-        for tracker in all_trackers:
-            await sync_to_async(daily_activity_tracker_reset)(tracker, self.active_multiplier)
-
+    async def update_day_state(self):
+        # Rebuilt so holiday and multiplier edits made by other processes are picked up
+        HOLIDAY_CALENDARS.invalidate()
+        MULTIPLIER_SNAPSHOTS.invalidate()
         await sync_to_async(self.activity_controller.set_is_weekend)()
         await sync_to_async(self.activity_controller.set_is_holiday)()
-        self.active_multiplier = sync_to_async(get_active_multiplier)(self.activity_controller)
-        return
+        self.active_multiplier = await sync_to_async(get_active_multiplier)(self.activity_controller)
+
+    @tasks.loop(time=MIDNIGHT)
+    async def transition_day(self):
+        await self.update_day_state()
+
+    @transition_day.before_loop
+    async def before_transition_day(self):
+        await self.bot.wait_until_ready()
+
+    @tasks.loop(time=RESET_TIME)
+    async def reset_activity(self):
+        self.active_multiplier = await sync_to_async(get_active_multiplier)(self.activity_controller)
+        await sync_to_async(VOICE_SESSIONS.daily_reset)(self.activity_controller, self.active_multiplier)
+        await self.update_day_state()
 
     @reset_activity.before_loop
     async def before_reset_voice_activity(self):
         await self.bot.wait_until_ready()
+        # Finish a reset that was interrupted or missed while the bot was offline
+        await sync_to_async(VOICE_SESSIONS.daily_reset)(self.activity_controller, self.active_multiplier, catch_up=True)
 
 async def setup(bot: commands.Bot):
     activity_controller = await sync_to_async(ActivityController.objects.get)(client__id=bot.user.id)
@@ -2,12 +2,8 @@ import discord
 from discord.ext import commands, tasks
 from asgiref.sync import sync_to_async
 
-from apps.source.activity.util import (
-    get_activity_tracker_list,
-    update_voice_activity_from_discord_member_voice_state,
-    tick_member_activity_tracker,
-    get_active_multiplier,
-)
+from apps.source.activity.sessions import VOICE_SESSIONS
+from apps.source.activity.util import get_active_multiplier
 from apps.source.activity.models import ActivityMultiplier, ActivityController
 
 
@@ -21,22 +17,31 @@ class VoiceCog(commands.Cog):
     @tasks.loop(seconds=1)
     async def on_tick(self):
         self.active_multiplier = await sync_to_async(get_active_multiplier)(self.activity_controller)
-        all_trackers = await sync_to_async(get_activity_tracker_list)()
-        for tracker in all_trackers:
-            await sync_to_async(tick_member_activity_tracker)(tracker, self.activity_controller, self.active_multiplier)
+        await sync_to_async(VOICE_SESSIONS.tick)(self.activity_controller, self.active_multiplier)
 
     @on_tick.before_loop
     async def before_on_tick(self):
         await self.bot.wait_until_ready()
-
-    def cog_unload(self):
+        # Catch up with voice changes missed while offline, then credit members who stayed in their channel
+        voice_states = {
+            str(member.id): (member, member.voice)
+            for guild in self.bot.guilds
+            for channel in guild.voice_channels
+            for member in channel.members
+            if member.voice is not None
+        }
+        await sync_to_async(VOICE_SESSIONS.reconcile)(voice_states, self.activity_controller, self.active_multiplier)
+        await sync_to_async(VOICE_SESSIONS.credit_downtime)(self.activity_controller, self.active_multiplier)
+
+    async def cog_unload(self):
         self.on_tick.cancel()
+        await sync_to_async(VOICE_SESSIONS.shutdown)(self.activity_controller, self.active_multiplier)
 
     @commands.Cog.listener()
     async def on_voice_state_update(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState):
-        await sync_to_async(update_voice_activity_from_discord_member_voice_state)(member, after, self.active_multiplier)
+        await sync_to_async(VOICE_SESSIONS.update_from_voice_state)(member, after, self.activity_controller, self.active_multiplier, before=before)
 
 async def setup(bot: commands.Bot):
     activity_controller = await sync_to_async(ActivityController.objects.get)(client__id=bot.user.id)
-    active_multiplier = await sync_to_async(get_active_multiplier)(activity_controller)
+    active_multiplier = await sync_to_async(VOICE_SESSIONS.warm_up)(activity_controller)
     await bot.add_cog(VoiceCog(bot, activity_controller, active_multiplier))
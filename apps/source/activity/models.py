@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import date, datetime
 
 from django.db import models
 from django.core.validators import MinLengthValidator
@@ -7,7 +7,9 @@ from django.utils import timezone
 
 from apps.source.discord.models import Client, Member, VoiceChannel
 from apps.source.holiday.models import WeekdayHoliday, FixedHoliday
+from apps.source.holiday.schedule import HOLIDAY_CALENDARS, HolidayCalendar
 from apps.source.bank.models import Currency
+from apps.source.activity.snapshot import MULTIPLIER_SNAPSHOTS, ActivityMultiplierSnapshot
 
 
 class ActivityMultiplier(models.Model):
@@ -45,12 +47,11 @@ class ActivityController(models.Model):
             self.is_holiday = False
         self.save()
 
+    def get_multiplier_snapshot(self) -> ActivityMultiplierSnapshot:
+        return MULTIPLIER_SNAPSHOTS.get(self)
+
     def get_global_multiplier(self):
-        if self.is_weekend == False:
-            return 0
-        if self.active_multiplier:
-            return self.active_multiplier.weekend
-        return self.base_multiplier.weekend
+        return self.get_multiplier_snapshot().global_multiplier
 
     def __str__(self):
         return f'ActivityController {self.id}'
@@ -83,18 +84,32 @@ class ControllerHoliday(models.Model):
     weekday_holidays = models.ManyToManyField(WeekdayHoliday, blank=True)
     fixed_holidays = models.ManyToManyField(FixedHoliday, blank=True)
 
+    def get_calendar_key(self):
+        return ('controller', self.controller_id)
+
+    def get_calendar_holidays(self):
+        # Multipliers are loaded with the holidays so set_is_holiday does not query per holiday
+        weekday_holidays = self.weekday_holidays.select_related('multiplier__multiplier')
+        fixed_holidays = self.fixed_holidays.select_related('multiplier__multiplier')
+        return list(weekday_holidays) + list(fixed_holidays)
+
+    def get_calendar(self) -> HolidayCalendar:
+        return HOLIDAY_CALENDARS.get(self.get_calendar_key(), self.get_calendar_holidays)
+
     def get_weekday_holidays_today(self):
-        today = timezone.datetime.today()
-        weekday_holidays = WeekdayHoliday.objects.filter(month=today.month, day=today.weekday())
-        return [holiday for holiday in weekday_holidays if holiday.is_on(today)]
+        return [holiday for holiday in self.get_holidays_today() if isinstance(holiday, WeekdayHoliday)]
 
     def get_fixed_holidays_today(self):
-        today = timezone.datetime.today()
-        fixed_holidays = FixedHoliday.objects.filter(date__month=today.month, date__day=today.day)
-        return [holiday for holiday in fixed_holidays if holiday.is_on(today)]
+        return [holiday for holiday in self.get_holidays_today() if isinstance(holiday, FixedHoliday)]
 
     def get_holidays_today(self):
-        return self.get_weekday_holidays_today() + self.get_fixed_holidays_today()
+        return self.get_calendar().get_holidays_on(timezone.localdate())
+
+    def get_holidays_between(self, start: date, end: date):
+        return self.get_calendar().get_holidays_between(start, end)
+
+    def get_next_holiday(self, after: date = None):
+        return self.get_calendar().get_next_holiday(timezone.localdate() if after is None else after)
 
     def __str__(self):
         return f'Controller Holidays {self.id}'
@@ -118,6 +133,7 @@ class VoiceActivityTracker(models.Model):
     deafened = models.BooleanField(default=False)
 
     current_channel = models.ForeignKey(VoiceChannel, null=True, blank=True, related_name='voice_activity_trackers', on_delete=models.SET_NULL)
+    last_state_change = models.DateTimeField(null=True, blank=True) # Time the tracker was last settled, used by elapsed accounting
 
     # Reward trackers
     ticks_till_reward = models.IntegerField(default=0) # Saved only when user leaves voice channel
@@ -130,11 +146,16 @@ class VoiceActivityTracker(models.Model):
     points_earned = models.FloatField(default=0) # Points earned today
 
     multipliers_data = JSONField(default=dict, blank=True)
+    last_reset = models.DateTimeField(null=True, blank=True) # Reset time of the last daily reset applied to this tracker
 
     def daily_reset(self):
         self.is_birthday = False
         self.rewards_left = 0
         self.ticks_spent_in_call = 0
+        self.ticks_spent_video_on = 0
+        self.ticks_spent_streaming = 0
+        self.ticks_spent_deafened = 0
+        self.ticks_spent_muted = 0
         self.points_earned = 0
         self.multipliers_data = dict()
 
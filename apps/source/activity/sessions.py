@@ -0,0 +1,322 @@
+import json
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+import discord
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from apps.source.activity.models import ActivityMultiplier, ActivityController, VoiceActivityTracker
+from apps.source.activity.settings import VOICE_CONFIG
+from apps.source.bank.cache import CURRENCY_CACHE
+from apps.source.discord.cache import DISCORD_IDENTITIES
+from apps.source.discord.models import Member, VoiceChannel
+from economy.event import EVENT_MANAGER
+from economy.versions import MODEL_VERSIONS
+from apps.source.activity.util import (
+    advance_member_activity_tracker,
+    get_activity_tracker_list,
+    update_voice_activity_from_discord_member_voice_state,
+    get_voice_state_changes,
+    is_same_voice_state,
+    tick_activity_trackers_batch,
+    settle_member_activity_tracker,
+    bulk_daily_activity_tracker_reset,
+)
+
+
+# Fields changed by ticking, written back on every flush
+TRACKER_TICK_FIELDS = [
+    'ticks_till_reward',
+    'rewards_left',
+    'ticks_spent_in_call',
+    'ticks_spent_video_on',
+    'ticks_spent_streaming',
+    'ticks_spent_deafened',
+    'ticks_spent_muted',
+    'points_earned',
+    'multipliers_data',
+    'last_state_change',
+]
+# The only fields a tick changes for trackers that were not rewarded
+TRACKER_COUNTER_FIELDS = ['ticks_till_reward', 'ticks_spent_in_call']
+
+def is_elapsed_accounting():
+    return VOICE_CONFIG['ACCOUNTING_MODE'] == 'elapsed'
+
+class VoiceSessionEngine():
+    def __init__(self):
+        self.trackers: dict[str, VoiceActivityTracker] = {}
+        self.channel_occupancy: Counter[str] = Counter()
+        self.channel_trackers: dict[str, set[str]] = {}
+        self.dirty: set[str] = set()
+        # Dirty trackers with changes beyond the tick counters
+        self.reward_dirty: set[str] = set()
+        self.ticks_since_flush = 0
+        self.loaded = False
+        # Snapshot read at warm up, kept until downtime has been credited
+        self.snapshot: dict = None
+
+    def load(self):
+        self.trackers = {tracker.id: tracker for tracker in get_activity_tracker_list()}
+        self.channel_occupancy = Counter(tracker.current_channel_id for tracker in self.trackers.values())
+        self.channel_trackers = {}
+        for tracker_id, tracker in self.trackers.items():
+            self.channel_trackers.setdefault(tracker.current_channel_id, set()).add(tracker_id)
+        self.dirty = set()
+        self.reward_dirty = set()
+        self.ticks_since_flush = 0
+        self.loaded = True
+
+    def tick(self, activity_controller: ActivityController, activity_multiplier: ActivityMultiplier):
+        if not self.loaded:
+            self.load()
+
+        # Elapsed accounting settles trackers on state changes instead, idle calls cost nothing
+        if is_elapsed_accounting():
+            return
+
+        rewarded_trackers = tick_activity_trackers_batch(list(self.trackers.values()), activity_controller, activity_multiplier, self.channel_occupancy)
+        # Every tracker in call moves its counters, only rewarded ones need the full write
+        self.dirty.update(self.trackers.keys())
+        self.reward_dirty.update(tracker.id for tracker in rewarded_trackers)
+
+        self.ticks_since_flush += 1
+        if self.ticks_since_flush >= VOICE_CONFIG['FLUSH_RATE']:
+            self.flush()
+
+    def flush(self, tracker_ids=None):
+        if tracker_ids is None:
+            tracker_ids = list(self.dirty)
+            self.ticks_since_flush = 0
+        else:
+            tracker_ids = [tracker_id for tracker_id in tracker_ids if tracker_id in self.dirty]
+
+        trackers = [self.trackers[tracker_id] for tracker_id in tracker_ids if tracker_id in self.trackers]
+        rewarded_trackers = [tracker for tracker in trackers if tracker.id in self.reward_dirty]
+        counter_trackers = [tracker for tracker in trackers if tracker.id not in self.reward_dirty]
+        if rewarded_trackers:
+            VoiceActivityTracker.objects.bulk_update(rewarded_trackers, TRACKER_TICK_FIELDS)
+        if counter_trackers:
+            VoiceActivityTracker.objects.bulk_update(counter_trackers, TRACKER_COUNTER_FIELDS)
+        if trackers:
+            MODEL_VERSIONS.bump(VoiceActivityTracker)
+            EVENT_MANAGER.source.activity.trigger('on_trackers_flushed', trackers=trackers)
+
+        self.dirty.difference_update(tracker_ids)
+        self.reward_dirty.difference_update(tracker_ids)
+        return len(trackers)
+
+    def mark_dirty(self, tracker_id, rewarded=True):
+        self.dirty.add(tracker_id)
+        if rewarded:
+            self.reward_dirty.add(tracker_id)
+
+    def settle(self, activity_controller: ActivityController, activity_multiplier: ActivityMultiplier, tracker_ids=None, now: datetime = None):
+        now = timezone.now() if now is None else now
+        tracker_ids = list(self.trackers.keys()) if tracker_ids is None else tracker_ids
+
+        for tracker_id in tracker_ids:
+            tracker = self.trackers.get(tracker_id)
+            if tracker is None:
+                continue
+            settle_member_activity_tracker(tracker, activity_controller, activity_multiplier, now, save=False, channel_occupancy=self.channel_occupancy)
+            self.mark_dirty(tracker_id)
+
+    def get_channel_tracker_ids(self, channel_id):
+        return list(self.channel_trackers.get(channel_id, ()))
+
+    def update_from_voice_state(self, member: discord.Member, voice_state: discord.VoiceState, activity_controller: ActivityController, activity_multiplier: ActivityMultiplier, before: discord.VoiceState = None):
+        tracker_id = str(member.id)
+        tracker = self.trackers.get(tracker_id)
+
+        # Server mutes, suppression and other untracked changes
+        if before is not None and is_same_voice_state(before, voice_state):
+            return tracker
+
+        channel_id = str(voice_state.channel.id) if voice_state.channel else None
+        if tracker is not None and tracker.current_channel_id == channel_id:
+            return self.update_tracker_flags(tracker, voice_state, activity_controller, activity_multiplier)
+
+        if is_elapsed_accounting():
+            previous_channel_id = tracker.current_channel_id if tracker else None
+            # A roster change alters the group bonus of everyone in both channels
+            settled_ids = self.get_channel_tracker_ids(previous_channel_id) + self.get_channel_tracker_ids(channel_id)
+            self.settle(activity_controller, activity_multiplier, settled_ids)
+            self.flush(settled_ids)
+
+        # Persist in-memory progress and release the old channel before the tracker is moved
+        self.flush([tracker_id])
+        self.set_tracker(tracker_id, None)
+
+        tracker = update_voice_activity_from_discord_member_voice_state(member, voice_state, activity_multiplier, tracker)
+        self.set_tracker(tracker_id, tracker if tracker.current_channel_id else None)
+        return tracker
+
+    def update_tracker_flags(self, tracker: VoiceActivityTracker, voice_state: discord.VoiceState, activity_controller: ActivityController, activity_multiplier: ActivityMultiplier):
+        changes = get_voice_state_changes(tracker, voice_state)
+        if not changes:
+            return tracker
+
+        if is_elapsed_accounting():
+            # Time before the change is accounted for with the old flags
+            self.settle(activity_controller, activity_multiplier, [tracker.id])
+        for field, value in changes.items():
+            setattr(tracker, field, value)
+
+        # Pending tick progress goes out in the same narrow update
+        update_fields = list(changes)
+        if tracker.id in self.reward_dirty:
+            update_fields += TRACKER_TICK_FIELDS
+        elif tracker.id in self.dirty:
+            update_fields += TRACKER_COUNTER_FIELDS
+        self.dirty.discard(tracker.id)
+        self.reward_dirty.discard(tracker.id)
+        tracker.save(update_fields=update_fields)
+        if 'points_earned' in update_fields:
+            EVENT_MANAGER.source.activity.trigger('on_trackers_flushed', trackers=[tracker])
+        return tracker
+
+    def set_tracker(self, tracker_id, tracker: VoiceActivityTracker = None):
+        previous_tracker = self.trackers.pop(tracker_id, None)
+        if previous_tracker is not None:
+            self.channel_occupancy[previous_tracker.current_channel_id] -= 1
+            if self.channel_occupancy[previous_tracker.current_channel_id] <= 0:
+                del self.channel_occupancy[previous_tracker.current_channel_id]
+            channel_tracker_ids = self.channel_trackers.get(previous_tracker.current_channel_id, set())
+            channel_tracker_ids.discard(tracker_id)
+            if not channel_tracker_ids:
+                self.channel_trackers.pop(previous_tracker.current_channel_id, None)
+
+        if tracker is not None:
+            self.trackers[tracker_id] = tracker
+            self.channel_occupancy[tracker.current_channel_id] += 1
+            self.channel_trackers.setdefault(tracker.current_channel_id, set()).add(tracker_id)
+
+    def daily_reset(self, activity_controller: ActivityController, activity_multiplier: ActivityMultiplier, catch_up=False):
+        if not self.loaded:
+            self.load()
+
+        if is_elapsed_accounting():
+            self.settle(activity_controller, activity_multiplier)
+        self.flush()
+        try:
+            return bulk_daily_activity_tracker_reset(list(self.trackers.values()), activity_multiplier, catch_up=catch_up)
+        except Exception:
+            # Batches that were rolled back leave reset trackers in memory, reload them from the database
+            self.load()
+            raise
+
+    def warm_up(self, activity_controller: ActivityController):
+        # Everything the first ticks and voice state updates read, loaded up front in a few queries
+        CURRENCY_CACHE.load()
+        DISCORD_IDENTITIES.load(Member)
+        DISCORD_IDENTITIES.load(VoiceChannel)
+        activity_multiplier = activity_controller.get_multiplier_snapshot()
+        self.load()
+        self.snapshot = self.read_snapshot()
+        if self.snapshot is not None and not self.snapshot['flushed']:
+            self.apply_snapshot(self.snapshot)
+        if is_elapsed_accounting():
+            # Time in call up to the shutdown is settled, the downtime after it is only credited by credit_downtime
+            if self.snapshot is not None:
+                self.settle(activity_controller, activity_multiplier, now=self.snapshot['saved_at'])
+            now = timezone.now()
+            for tracker_id, tracker in self.trackers.items():
+                tracker.last_state_change = now
+                self.mark_dirty(tracker_id)
+            self.flush()
+        return activity_multiplier
+
+    def shutdown(self, activity_controller: ActivityController, activity_multiplier: ActivityMultiplier):
+        if is_elapsed_accounting():
+            # Warm up starts the clock again, time in call up to now has to be settled first
+            self.settle(activity_controller, activity_multiplier)
+        try:
+            self.flush()
+        except Exception:
+            # Progress that could not be written is restored from the snapshot on the next start
+            self.save_snapshot(flushed=False)
+            raise
+        return self.save_snapshot()
+
+    def save_snapshot(self, flushed=True, path=None):
+        path = path or VOICE_CONFIG['SNAPSHOT_PATH']
+        if not path:
+            return False
+        snapshot = {
+            'saved_at': timezone.now(),
+            'flushed': flushed,
+            'trackers': {
+                tracker_id: {field: getattr(tracker, field) for field in TRACKER_TICK_FIELDS + ['current_channel_id']}
+                for tracker_id, tracker in self.trackers.items()
+            },
+        }
+        # Written next to the target first so a crash mid-write never leaves a partial snapshot
+        path = Path(path)
+        temporary_path = path.with_suffix(path.suffix + '.tmp')
+        temporary_path.write_text(json.dumps(snapshot, cls=DjangoJSONEncoder))
+        temporary_path.replace(path)
+        return True
+
+    def read_snapshot(self, path=None):
+        path = path or VOICE_CONFIG['SNAPSHOT_PATH']
+        if not path or not Path(path).exists():
+            return None
+        snapshot = json.loads(Path(path).read_text())
+        # A snapshot is only ever restored once
+        Path(path).unlink()
+        snapshot['saved_at'] = datetime.fromisoformat(snapshot['saved_at'])
+        for tracker_data in snapshot['trackers'].values():
+            if tracker_data['last_state_change'] is not None:
+                tracker_data['last_state_change'] = datetime.fromisoformat(tracker_data['last_state_change'])
+        return snapshot
+
+    def apply_snapshot(self, snapshot: dict):
+        # Progress that could not be flushed at shutdown, for trackers still in the same channel in the database
+        for tracker_id, tracker_data in snapshot['trackers'].items():
+            tracker = self.trackers.get(tracker_id)
+            if tracker is None or tracker.current_channel_id != tracker_data['current_channel_id']:
+                continue
+            for field in TRACKER_TICK_FIELDS:
+                setattr(tracker, field, tracker_data[field])
+            self.mark_dirty(tracker_id)
+        self.flush()
+
+    def reconcile(self, voice_states: dict, activity_controller: ActivityController, activity_multiplier: ActivityMultiplier):
+        # voice_states maps member ids to (member, voice state) for everyone the gateway sees in voice
+        for tracker_id in [tracker_id for tracker_id in self.trackers if tracker_id not in voice_states]:
+            # Left while the bot was offline, the time they spent is unknown and not credited
+            self.flush([tracker_id])
+            tracker = self.trackers[tracker_id]
+            self.set_tracker(tracker_id, None)
+            tracker.current_channel_id = None
+            tracker.save(update_fields=['current_channel'])
+
+        for member_id, (member, voice_state) in voice_states.items():
+            if DISCORD_IDENTITIES.exists(Member, member_id):
+                self.update_from_voice_state(member, voice_state, activity_controller, activity_multiplier)
+
+    def credit_downtime(self, activity_controller: ActivityController, activity_multiplier: ActivityMultiplier, snapshot: dict = None, now: datetime = None):
+        now = timezone.now() if now is None else now
+        snapshot = self.snapshot if snapshot is None else snapshot
+        self.snapshot = None
+
+        gap = (now - snapshot['saved_at']).total_seconds() if snapshot else None
+        restorable = gap is not None and 0 <= gap <= VOICE_CONFIG['MAX_RESTORE_GAP']
+        credited = 0
+        for tracker_id, tracker in self.trackers.items():
+            tracker_data = snapshot['trackers'].get(tracker_id) if restorable else None
+            if tracker_data is None or tracker_data['current_channel_id'] != tracker.current_channel_id:
+                continue
+            advance_member_activity_tracker(tracker, int(gap // VOICE_CONFIG['TICK_RATE']), activity_controller, activity_multiplier, self.channel_occupancy, count_voice_states=is_elapsed_accounting())
+            if is_elapsed_accounting():
+                tracker.last_state_change = now
+            self.mark_dirty(tracker_id)
+            credited += 1
+
+        self.flush()
+        return credited
+
+VOICE_SESSIONS = VoiceSessionEngine()
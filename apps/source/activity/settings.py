@@ -3,4 +3,10 @@ VOICE_CONFIG = {
     'TICKS_PER_REWARD': 60,     # Ticks until user gets points. Default: 60 ticks (1 minute) until user gets a point
     'BASE_POINT_REWARD': 1,     # Value of reward. Default: 1 base point per reward
     'REWARD_RESET_HOUR': 0,     # Time in hour when rewards reset. Uses TIME_ZONE from economy/settings.py. Default: 0 (Midnight)
+    'FLUSH_RATE': 30,           # Ticks between each write of in-memory voice trackers to the database. Default: 30 ticks
+    'RESET_BATCH_SIZE': 1000,   # Trackers reset per transaction by the daily reset. Default: 1000 trackers
+    'ACCOUNTING_MODE': 'tick',  # 'tick' advances trackers every tick, 'elapsed' settles them only when their voice state changes. Default: 'tick'
+    'SNAPSHOT_PATH': None,      # File voice sessions are written to on shutdown and restored from on startup, None disables it. Default: None
+    'MAX_RESTORE_GAP': 300,     # Longest downtime in seconds credited to members still in the same channel after a restart. Default: 300 seconds
+    'MULTIPLIER_SNAPSHOT_TIMEOUT': 60,  # Time in seconds before the cached active multiplier is rebuilt from the database. Default: 60 seconds
 }
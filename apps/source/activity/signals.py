@@ -0,0 +1,35 @@
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from apps.source.bank.models import Currency
+from apps.source.holiday.schedule import HOLIDAY_CALENDARS
+from apps.source.activity.snapshot import MULTIPLIER_SNAPSHOTS
+from apps.source.activity.models import ActivityMultiplier, ActivityController, ControllerHoliday, WeekdayHolidayMultiplier, FixedHolidayMultiplier
+
+
+@receiver(m2m_changed, sender=ControllerHoliday.weekday_holidays.through)
+@receiver(m2m_changed, sender=ControllerHoliday.fixed_holidays.through)
+def invalidate_controller_holiday_calendar(sender, instance, action, **kwargs):
+    if not action.startswith('post_'):
+        return
+    # Changes made from the holiday side of the relation can touch any controller
+    HOLIDAY_CALENDARS.invalidate(instance.get_calendar_key() if isinstance(instance, ControllerHoliday) else None)
+
+@receiver(post_delete, sender=ControllerHoliday)
+def remove_controller_holiday_calendar(sender, instance, **kwargs):
+    HOLIDAY_CALENDARS.invalidate(instance.get_calendar_key())
+
+@receiver([post_save, post_delete], sender=ActivityMultiplier)
+@receiver([post_save, post_delete], sender=WeekdayHolidayMultiplier)
+@receiver([post_save, post_delete], sender=FixedHolidayMultiplier)
+def invalidate_holiday_multiplier(sender, **kwargs):
+    HOLIDAY_CALENDARS.invalidate()
+
+@receiver([post_save, post_delete], sender=ActivityController)
+def invalidate_controller_multiplier_snapshot(sender, instance, **kwargs):
+    MULTIPLIER_SNAPSHOTS.invalidate(instance.id)
+
+@receiver([post_save, post_delete], sender=ActivityMultiplier)
+@receiver([post_save, post_delete], sender=Currency)
+def invalidate_multiplier_snapshots(sender, **kwargs):
+    MULTIPLIER_SNAPSHOTS.invalidate()
@@ -0,0 +1,69 @@
+from dataclasses import dataclass
+from time import monotonic
+
+from apps.source.activity.settings import VOICE_CONFIG
+from apps.source.bank.cache import CURRENCY_CACHE
+from apps.source.bank.models import Currency
+
+
+@dataclass(frozen=True)
+class ActivityMultiplierSnapshot():
+    # Mirrors the ActivityMultiplier fields so it can be passed wherever an ActivityMultiplier is read
+    id: int
+    priority: int
+    currency: Currency
+    rewards_per_day: int
+    base: float
+    weekend: float
+    birthday: float
+    video: float
+    streaming: float
+    muted: float
+    deafened: float
+    group: float
+    group_max: float
+    # Weekend bonus of the controller, 0 on weekdays
+    global_multiplier: float
+
+def build_multiplier_snapshot(activity_controller) -> ActivityMultiplierSnapshot:
+    # Read from the database since cogs hold their own, possibly stale, controller instances
+    activity_controller = type(activity_controller).objects.select_related('base_multiplier', 'active_multiplier').get(id=activity_controller.id)
+    multiplier = activity_controller.base_multiplier if activity_controller.active_multiplier_id is None else activity_controller.active_multiplier
+    return ActivityMultiplierSnapshot(
+        id=multiplier.id,
+        priority=multiplier.priority,
+        currency=CURRENCY_CACHE.get_by_id(multiplier.currency_id),
+        rewards_per_day=multiplier.rewards_per_day,
+        base=multiplier.base,
+        weekend=multiplier.weekend,
+        birthday=multiplier.birthday,
+        video=multiplier.video,
+        streaming=multiplier.streaming,
+        muted=multiplier.muted,
+        deafened=multiplier.deafened,
+        group=multiplier.group,
+        group_max=multiplier.group_max,
+        global_multiplier=multiplier.weekend if activity_controller.is_weekend else 0,
+    )
+
+class MultiplierSnapshotCache():
+    def __init__(self):
+        # Snapshots and their build time by controller id
+        self.snapshots: dict[int, tuple[ActivityMultiplierSnapshot, float]] = {}
+
+    def get(self, activity_controller) -> ActivityMultiplierSnapshot:
+        entry = self.snapshots.get(activity_controller.id)
+        # Signals only reach this process, the timeout bounds how long edits made by another process can go unnoticed
+        if entry is None or monotonic() - entry[1] > VOICE_CONFIG['MULTIPLIER_SNAPSHOT_TIMEOUT']:
+            entry = (build_multiplier_snapshot(activity_controller), monotonic())
+            # Replaced as a whole, readers see either the old or the new snapshot
+            self.snapshots[activity_controller.id] = entry
+        return entry[0]
+
+    def invalidate(self, controller_id: int = None):
+        if controller_id is None:
+            self.snapshots = {}
+            return
+        self.snapshots.pop(controller_id, None)
+
+MULTIPLIER_SNAPSHOTS = MultiplierSnapshotCache()
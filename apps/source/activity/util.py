@@ -1,40 +1,92 @@
+from datetime import datetime, timedelta
+
 import discord
+import numpy as np
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
 
+from apps.source.discord.cache import DISCORD_IDENTITIES
 from apps.source.discord.models import VoiceChannel, Member
 from apps.source.activity.models import ActivityMultiplier, ActivityController, VoiceActivityTracker, VoiceActivityLongTermTracker
 from apps.source.activity.settings import VOICE_CONFIG
 
 from apps.source.bank.models import Account
-
-
-def update_voice_activity_from_discord_member_voice_state(member: discord.Member, voice_state: discord.VoiceState, activity_multiplier: ActivityMultiplier):
-    db_member = Member.objects.get(id=str(member.id))
-    voice_activity_tracker, created = VoiceActivityTracker.objects.get_or_create(id=member.id, member=db_member)
+from apps.source.bank.util import bulk_deposit
+from economy.event import EVENT_MANAGER
+from economy.util import get_or_create_in_bulk
+from economy.versions import MODEL_VERSIONS
+
+
+# Tracker flags paired with the VoiceState attribute they mirror
+VOICE_STATE_FIELDS = [
+    ('video_on',    'self_video'),
+    ('streaming',   'self_stream'),
+    ('muted',       'self_mute'),
+    ('deafened',    'self_deaf'),
+]
+
+def get_voice_state_changes(tracker: VoiceActivityTracker, voice_state: discord.VoiceState):
+    return {
+        field: getattr(voice_state, attribute)
+        for field, attribute in VOICE_STATE_FIELDS
+        if getattr(tracker, field) != getattr(voice_state, attribute)
+    }
+
+def is_same_voice_state(before: discord.VoiceState, after: discord.VoiceState):
+    before_channel_id = before.channel.id if before.channel else None
+    after_channel_id = after.channel.id if after.channel else None
+    return before_channel_id == after_channel_id and all(getattr(before, attribute) == getattr(after, attribute) for _, attribute in VOICE_STATE_FIELDS)
+
+def update_voice_activity_from_discord_member_voice_state(member: discord.Member, voice_state: discord.VoiceState, activity_multiplier: ActivityMultiplier, voice_activity_tracker: VoiceActivityTracker = None):
+    created = False
+    if voice_activity_tracker is None:
+        if not DISCORD_IDENTITIES.exists(Member, member.id):
+            raise Member.DoesNotExist(f"Member matching id '{member.id}' does not exist.")
+        voice_activity_tracker, created = VoiceActivityTracker.objects.get_or_create(id=str(member.id), member_id=str(member.id))
 
     if created:
         voice_activity_tracker.rewards_left = activity_multiplier.base
-
-    if voice_state.channel is None:
-        voice_activity_tracker.current_channel = None
+        voice_activity_tracker.last_reset = timezone.now()
+
+    channel_id = None
+    if voice_state.channel is not None and DISCORD_IDENTITIES.exists(VoiceChannel, voice_state.channel.id):
+        channel_id = str(voice_state.channel.id)
+
+    update_fields = []
+    if voice_activity_tracker.current_channel_id != channel_id:
+        if channel_id is not None:
+            voice_activity_tracker.last_state_change = timezone.now()
+            update_fields.append('last_state_change')
+        voice_activity_tracker.current_channel_id = channel_id
+        update_fields.append('current_channel')
+
+    if voice_state.channel is not None:
+        for field, value in get_voice_state_changes(voice_activity_tracker, voice_state).items():
+            setattr(voice_activity_tracker, field, value)
+            update_fields.append(field)
+
+    # Only changed columns are written, an unchanged voice state costs no query
+    if created:
         voice_activity_tracker.save()
-        return
-
-    voice_activity_tracker.current_channel = VoiceChannel.objects.filter(id=str(voice_state.channel.id)).first()
-    voice_activity_tracker.video_on = voice_state.self_video
-    voice_activity_tracker.streaming = voice_state.self_stream
-    voice_activity_tracker.muted = voice_state.self_mute
-    voice_activity_tracker.deafened = voice_state.self_deaf
-
-    voice_activity_tracker.save()
-    return
+    elif update_fields:
+        voice_activity_tracker.save(update_fields=update_fields)
+    return voice_activity_tracker
 
 def get_activity_tracker_list():
     return list(VoiceActivityTracker.objects.filter(current_channel__isnull=False))
 
-def get_activity_tracker_multiplier(tracker: VoiceActivityTracker, activity_controller: ActivityController, activity_multiplier: ActivityMultiplier):
+def get_channel_occupancy():
+    occupancy = VoiceActivityTracker.objects.filter(current_channel__isnull=False).values('current_channel').annotate(count=Count('id'))
+    return {row['current_channel']: row['count'] for row in occupancy}
+
+def get_activity_tracker_multiplier(tracker: VoiceActivityTracker, activity_controller: ActivityController, activity_multiplier: ActivityMultiplier, channel_occupancy: dict = None):
     multiplier = activity_multiplier.base
 
-    group_multiplier = VoiceActivityTracker.objects.filter(current_channel=tracker.current_channel).count() - 1
+    if channel_occupancy is None:
+        group_multiplier = VoiceActivityTracker.objects.filter(current_channel=tracker.current_channel).count() - 1
+    else:
+        group_multiplier = channel_occupancy.get(tracker.current_channel_id, 0) - 1
     group_multiplier = min(group_multiplier * activity_multiplier.group, activity_multiplier.group_max)
 
     multiplier_mapping = [
@@ -50,50 +102,216 @@ def get_activity_tracker_multiplier(tracker: VoiceActivityTracker, activity_cont
 
     return round(multiplier, activity_multiplier.currency.decimal_places)
 
+# Tracker flags paired with the ActivityMultiplier weight they add, in the order the scalar path sums them
+ACTIVITY_FLAG_WEIGHTS = [
+    ('is_birthday', 'birthday'),
+    ('video_on',    'video'),
+    ('streaming',   'streaming'),
+    ('muted',       'muted'),
+    ('deafened',    'deafened'),
+]
+
+def get_activity_tracker_columns(trackers: list[VoiceActivityTracker], channel_occupancy: dict = None):
+    channel_occupancy = get_channel_occupancy() if channel_occupancy is None else channel_occupancy
+    columns = {
+        flag: np.fromiter((getattr(tracker, flag) for tracker in trackers), dtype=bool, count=len(trackers))
+        for flag, _ in ACTIVITY_FLAG_WEIGHTS
+    }
+    columns['occupancy'] = np.fromiter((channel_occupancy.get(tracker.current_channel_id, 0) for tracker in trackers), dtype=np.int64, count=len(trackers))
+    columns['ticks_till_reward'] = np.fromiter((tracker.ticks_till_reward for tracker in trackers), dtype=np.int64, count=len(trackers))
+    columns['rewards_left'] = np.fromiter((tracker.rewards_left for tracker in trackers), dtype=np.float64, count=len(trackers))
+    columns['minimum_multiplier'] = np.fromiter(
+        (float(get_minimum_multiplier(tracker)) if tracker.multipliers_data else np.nan for tracker in trackers),
+        dtype=np.float64,
+        count=len(trackers),
+    )
+    return columns
+
+def round_activity_batch(values, mask, decimal_places):
+    # np.round scales before rounding and disagrees with round() on halves, the scalar path uses round()
+    rounded = np.full(len(values), np.nan)
+    rounded[mask] = [round(value, decimal_places) for value in values[mask].tolist()]
+    return rounded
+
+def get_activity_tracker_multipliers_batch(columns: dict, activity_controller: ActivityController, activity_multiplier: ActivityMultiplier, mask=None):
+    flag_multiplier = np.zeros(len(columns['occupancy']))
+    for flag, weight in ACTIVITY_FLAG_WEIGHTS:
+        flag_multiplier = flag_multiplier + np.where(columns[flag], getattr(activity_multiplier, weight), 0.0)
+
+    group_multiplier = np.minimum((columns['occupancy'] - 1) * activity_multiplier.group, activity_multiplier.group_max)
+
+    multipliers = activity_multiplier.base + flag_multiplier
+    multipliers = multipliers + (group_multiplier + activity_controller.get_global_multiplier())
+    # Only the masked multipliers are rounded, the rest are left as NaN
+    mask = np.ones(len(multipliers), dtype=bool) if mask is None else mask
+    return round_activity_batch(multipliers, mask, activity_multiplier.currency.decimal_places)
+
+def compute_activity_batch(columns: dict, activity_controller: ActivityController, activity_multiplier: ActivityMultiplier):
+    decimal_places = activity_multiplier.currency.decimal_places
+    eligible = columns['ticks_till_reward'] - 1 <= 0
+    multipliers = get_activity_tracker_multipliers_batch(columns, activity_controller, activity_multiplier, eligible)
+
+    paid = eligible & (columns['rewards_left'] > 0)
+    minimum_multipliers = round_activity_batch(columns['minimum_multiplier'], eligible, decimal_places)
+    # NaN minimums (no multipliers earned yet) never compare greater, so nothing is replaced
+    replaced = eligible & ~paid & (multipliers > minimum_multipliers)
+
+    real_multipliers = np.where(paid, multipliers, np.where(replaced, multipliers - minimum_multipliers, 0.0))
+    return {
+        'multipliers': multipliers,
+        'minimum_multipliers': minimum_multipliers,
+        'eligible': eligible,
+        'paid': paid,
+        'replaced': replaced,
+        # Left unrounded, the tracker total is rounded once like the scalar path
+        'points': VOICE_CONFIG['BASE_POINT_REWARD'] * real_multipliers,
+    }
+
 def get_minimum_multiplier(tracker: VoiceActivityTracker):
     return min(tracker.multipliers_data.keys())
 
-def tick_member_activity_tracker(tracker: VoiceActivityTracker, activity_controller: ActivityController, activity_multiplier: ActivityMultiplier):
+def reward_member_activity_tracker(tracker: VoiceActivityTracker, multiplier: float, activity_multiplier: ActivityMultiplier, rewards=1):
+    decimal_places = activity_multiplier.currency.decimal_places
+
+    paid_rewards = min(rewards, max(int(tracker.rewards_left), 0))
+    if paid_rewards > 0:
+        tracker.rewards_left -= paid_rewards
+        tracker.multipliers_data[str(multiplier)] = tracker.multipliers_data.get(str(multiplier), 0) + paid_rewards
+        tracker.points_earned = round(tracker.points_earned + (VOICE_CONFIG['BASE_POINT_REWARD'] * multiplier * paid_rewards), decimal_places)
+
+    # Out of rewards, each further reward replaces the lowest multiplier earned today if it beats it
+    for _ in range(rewards - paid_rewards):
+        minimum_multiplier = round(float(get_minimum_multiplier(tracker)), decimal_places)
+
+        if multiplier <= minimum_multiplier:
+            return
+
+        tracker.multipliers_data[str(minimum_multiplier)] -= 1
+
+        if tracker.multipliers_data[str(minimum_multiplier)] <= 0:
+            tracker.multipliers_data.pop(str(minimum_multiplier))
+
+        real_multiplier = multiplier - minimum_multiplier
+        tracker.multipliers_data[str(multiplier)] = tracker.multipliers_data.get(str(multiplier), 0) + 1
+        tracker.points_earned = round(tracker.points_earned + (VOICE_CONFIG['BASE_POINT_REWARD'] * real_multiplier), decimal_places)
+
+def add_activity_tracker_ticks_spent(tracker: VoiceActivityTracker, ticks: int):
+    tracker.ticks_spent_in_call += ticks
+    if tracker.video_on:
+        tracker.ticks_spent_video_on += ticks
+    if tracker.streaming:
+        tracker.ticks_spent_streaming += ticks
+    if tracker.deafened:
+        tracker.ticks_spent_deafened += ticks
+    if tracker.muted:
+        tracker.ticks_spent_muted += ticks
+
+def tick_member_activity_tracker(tracker: VoiceActivityTracker, activity_controller: ActivityController, activity_multiplier: ActivityMultiplier, save=True, channel_occupancy: dict = None):
     tracker.ticks_till_reward -= 1
     tracker.ticks_spent_in_call += 1
 
     if tracker.ticks_till_reward > 0:
-        tracker.save()
+        if save:
+            tracker.save()
         return
 
     tracker.ticks_till_reward = VOICE_CONFIG['TICKS_PER_REWARD']
 
-    multiplier = get_activity_tracker_multiplier(tracker, activity_controller, activity_multiplier)
-    real_multiplier = multiplier
+    multiplier = get_activity_tracker_multiplier(tracker, activity_controller, activity_multiplier, channel_occupancy)
+    reward_member_activity_tracker(tracker, multiplier, activity_multiplier)
 
-    if tracker.rewards_left <= 0:
-        minimum_multiplier = round(float(get_minimum_multiplier(tracker)), activity_multiplier.currency.decimal_places)
+    if save:
+        tracker.save()
+    return
 
-        if multiplier <= minimum_multiplier:
-            tracker.save()
-            return
+def tick_activity_trackers_batch(trackers: list[VoiceActivityTracker], activity_controller: ActivityController, activity_multiplier: ActivityMultiplier, channel_occupancy: dict = None):
+    if not trackers:
+        return []
+
+    decimal_places = activity_multiplier.currency.decimal_places
+    columns = get_activity_tracker_columns(trackers, channel_occupancy)
+    batch = compute_activity_batch(columns, activity_controller, activity_multiplier)
+    ticks_till_reward = np.where(batch['eligible'], VOICE_CONFIG['TICKS_PER_REWARD'], columns['ticks_till_reward'] - 1)
+
+    # Only the write back to the tracker objects is left to Python, the arithmetic is done above
+    rewarded_trackers = []
+    for tracker, ticks, eligible, paid, replaced, multiplier, minimum_multiplier, points in zip(
+        trackers,
+        ticks_till_reward.tolist(),
+        batch['eligible'].tolist(),
+        batch['paid'].tolist(),
+        batch['replaced'].tolist(),
+        batch['multipliers'].tolist(),
+        batch['minimum_multipliers'].tolist(),
+        batch['points'].tolist(),
+    ):
+        tracker.ticks_spent_in_call += 1
+        tracker.ticks_till_reward = ticks
+        if not eligible:
+            continue
+
+        rewarded_trackers.append(tracker)
+        if paid:
+            tracker.rewards_left -= 1
+        elif replaced:
+            tracker.multipliers_data[str(minimum_multiplier)] -= 1
+            if tracker.multipliers_data[str(minimum_multiplier)] <= 0:
+                tracker.multipliers_data.pop(str(minimum_multiplier))
+        else:
+            continue
+
+        tracker.multipliers_data[str(multiplier)] = tracker.multipliers_data.get(str(multiplier), 0) + 1
+        tracker.points_earned = round(tracker.points_earned + points, decimal_places)
+    return rewarded_trackers
+
+def advance_member_activity_tracker(tracker: VoiceActivityTracker, ticks: int, activity_controller: ActivityController, activity_multiplier: ActivityMultiplier, channel_occupancy: dict = None, count_voice_states=True):
+    # Closed form of calling tick_member_activity_tracker `ticks` times while the voice state stays the same
+    if ticks <= 0:
+        return
 
-        tracker.multipliers_data[str(minimum_multiplier)] -= 1
+    # Elapsed accounting also knows how long each voice state lasted, tick mode only counts time in call
+    if count_voice_states:
+        add_activity_tracker_ticks_spent(tracker, ticks)
+    else:
+        tracker.ticks_spent_in_call += ticks
 
-        if tracker.multipliers_data[str(minimum_multiplier)] <= 0:
-            tracker.multipliers_data.pop(str(minimum_multiplier))
+    ticks_till_first_reward = max(tracker.ticks_till_reward, 1)
+    if ticks < ticks_till_first_reward:
+        tracker.ticks_till_reward -= ticks
+        return
 
-        real_multiplier = multiplier - minimum_multiplier
+    ticks_after_first_reward = ticks - ticks_till_first_reward
+    rewards = 1 + ticks_after_first_reward // VOICE_CONFIG['TICKS_PER_REWARD']
+    tracker.ticks_till_reward = VOICE_CONFIG['TICKS_PER_REWARD'] - ticks_after_first_reward % VOICE_CONFIG['TICKS_PER_REWARD']
+
+    multiplier = get_activity_tracker_multiplier(tracker, activity_controller, activity_multiplier, channel_occupancy)
+    reward_member_activity_tracker(tracker, multiplier, activity_multiplier, rewards)
+
+def settle_member_activity_tracker(tracker: VoiceActivityTracker, activity_controller: ActivityController, activity_multiplier: ActivityMultiplier, now: datetime = None, save=True, channel_occupancy: dict = None):
+    now = timezone.now() if now is None else now
+
+    if tracker.current_channel_id is None or tracker.last_state_change is None:
+        tracker.last_state_change = now
+        ticks = 0
     else:
-        tracker.rewards_left -= 1
+        ticks = int((now - tracker.last_state_change).total_seconds() // VOICE_CONFIG['TICK_RATE'])
+        if ticks > 0:
+            # Only whole ticks are settled, the remainder carries over to the next settlement
+            tracker.last_state_change += timedelta(seconds=ticks * VOICE_CONFIG['TICK_RATE'])
+            advance_member_activity_tracker(tracker, ticks, activity_controller, activity_multiplier, channel_occupancy)
 
-    tracker.multipliers_data[str(multiplier)] = tracker.multipliers_data.get(str(multiplier), 0) + 1
-    tracker.points_earned = round(tracker.points_earned + (VOICE_CONFIG['BASE_POINT_REWARD'] * real_multiplier), activity_multiplier.currency.decimal_places)
-    tracker.save()
-    return
+    if save:
+        tracker.save()
+    return ticks
 
-def updated_long_term_tracker_from_daily_tracker(long_term_tracker: VoiceActivityLongTermTracker, daily_tracker: VoiceActivityTracker):
+def updated_long_term_tracker_from_daily_tracker(long_term_tracker: VoiceActivityLongTermTracker, daily_tracker: VoiceActivityTracker, save=True):
     long_term_tracker.points_earned += daily_tracker.points_earned
 
     for multiplier, count in daily_tracker.multipliers_data.items():
         long_term_tracker.multipliers_data[multiplier] = long_term_tracker.multipliers_data.get(multiplier, 0) + count
 
-    long_term_tracker.highest_multiplier = max(long_term_tracker.multipliers_data.keys())
+    if long_term_tracker.multipliers_data:
+        long_term_tracker.highest_multiplier = max(long_term_tracker.multipliers_data.keys())
 
     if daily_tracker.points_earned > long_term_tracker.highest_points_earned:
         long_term_tracker.highest_points_earned = daily_tracker.points_earned
@@ -113,7 +331,8 @@ def updated_long_term_tracker_from_daily_tracker(long_term_tracker: VoiceActivit
     long_term_tracker.time_spent_deafened += seconds_spent_deafened_today
     long_term_tracker.time_spent_muted += seconds_spent_muted_today
 
-    long_term_tracker.save()
+    if save:
+        long_term_tracker.save()
 
 def daily_activity_tracker_reset(tracker: VoiceActivityTracker, activity_multiplier: ActivityMultiplier):
     long_term_tracker, created = VoiceActivityLongTermTracker.objects.get_or_create(id=tracker.member.id, member=tracker.member)
@@ -126,7 +345,84 @@ def daily_activity_tracker_reset(tracker: VoiceActivityTracker, activity_multipl
     tracker.daily_reset()
 
     tracker.rewards_left = activity_multiplier.rewards_per_day
+    tracker.last_reset = timezone.now()
     tracker.save()
-
-def get_active_multiplier(activity_controller):
-    return activity_controller.base_multiplier if activity_controller.active_multiplier is None else activity_controller.active_multiplier
+    EVENT_MANAGER.source.activity.trigger_on_commit('on_trackers_reset', trackers=[tracker], long_term_trackers={tracker.member_id: long_term_tracker})
+
+LONG_TERM_TRACKER_RESET_FIELDS = [
+    'time_spent_in_call',
+    'time_spent_video_on',
+    'time_spent_streaming',
+    'time_spent_deafened',
+    'time_spent_muted',
+    'points_earned',
+    'highest_multiplier',
+    'highest_points_earned',
+    'highest_time_spent_in_call',
+    'multipliers_data',
+]
+
+TRACKER_RESET_FIELDS = [
+    'is_birthday',
+    'rewards_left',
+    'ticks_spent_in_call',
+    'ticks_spent_video_on',
+    'ticks_spent_streaming',
+    'ticks_spent_deafened',
+    'ticks_spent_muted',
+    'points_earned',
+    'multipliers_data',
+    'last_reset',
+]
+
+def get_last_reset_time(now: datetime = None):
+    now = timezone.localtime(now)
+    reset_time = now.replace(hour=VOICE_CONFIG['REWARD_RESET_HOUR'], minute=0, second=0, microsecond=0)
+    if reset_time > now:
+        reset_time -= timedelta(days=1)
+    return reset_time
+
+def reset_activity_tracker_batch(trackers: list[VoiceActivityTracker], activity_multiplier: ActivityMultiplier, reset_time: datetime):
+    currency = activity_multiplier.currency
+    citizen_ids = dict(Member.objects.filter(id__in=[tracker.member_id for tracker in trackers]).values_list('id', 'citizen_id'))
+
+    long_term_trackers = get_or_create_in_bulk(VoiceActivityLongTermTracker, 'member_id', [tracker.member_id for tracker in trackers], lambda member_id: {'id': member_id})
+    accounts = get_or_create_in_bulk(Account, 'owner_id', list(citizen_ids.values()))
+    payouts = {}
+
+    for tracker in trackers:
+        updated_long_term_tracker_from_daily_tracker(long_term_trackers[tracker.member_id], tracker, save=False)
+
+        account_id = accounts[citizen_ids[tracker.member_id]].id
+        payouts[account_id] = payouts.get(account_id, 0) + currency.to_minor_units(tracker.points_earned)
+
+        tracker.daily_reset()
+        tracker.rewards_left = activity_multiplier.rewards_per_day
+        tracker.last_reset = reset_time
+
+    VoiceActivityLongTermTracker.objects.bulk_update(long_term_trackers.values(), LONG_TERM_TRACKER_RESET_FIELDS)
+    bulk_deposit(payouts, currency, minor_units=True)
+    VoiceActivityTracker.objects.bulk_update(trackers, TRACKER_RESET_FIELDS)
+    MODEL_VERSIONS.bump(VoiceActivityLongTermTracker, VoiceActivityTracker)
+    EVENT_MANAGER.source.activity.trigger_on_commit('on_trackers_reset', trackers=trackers, long_term_trackers=long_term_trackers)
+
+def bulk_daily_activity_tracker_reset(trackers: list[VoiceActivityTracker], activity_multiplier: ActivityMultiplier, reset_time: datetime = None, catch_up=False):
+    reset_time = get_last_reset_time() if reset_time is None else reset_time
+    if catch_up:
+        # Trackers saved before last_reset was recorded were reset by the daily loop running then, they count as reset for this reset time
+        unstamped_trackers = [tracker for tracker in trackers if tracker.last_reset is None]
+        for tracker in unstamped_trackers:
+            tracker.last_reset = reset_time
+        VoiceActivityTracker.objects.bulk_update(unstamped_trackers, ['last_reset'])
+
+    # Trackers already reset for this reset time are skipped, so an interrupted reset can be run again
+    pending_trackers = [tracker for tracker in trackers if tracker.last_reset is None or tracker.last_reset < reset_time]
+
+    batch_size = VOICE_CONFIG['RESET_BATCH_SIZE']
+    for start in range(0, len(pending_trackers), batch_size):
+        with transaction.atomic():
+            reset_activity_tracker_batch(pending_trackers[start:start + batch_size], activity_multiplier, reset_time)
+    return len(pending_trackers)
+
+def get_active_multiplier(activity_controller: ActivityController):
+    return activity_controller.get_multiplier_snapshot()
@@ -1,4 +1,4 @@
 from django.contrib import admin
-from .models import Account, Currency, AccountCurrencyBalance
+from .models import Account, Currency, AccountCurrencyBalance, LedgerEntry
 
-admin.site.register([Account, Currency, AccountCurrencyBalance])
+admin.site.register([Account, Currency, AccountCurrencyBalance, LedgerEntry])
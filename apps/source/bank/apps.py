@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from economy.util import AppEventManager
+from .events import register_events, register_functions
 
 
 class BankConfig(AppConfig):
     dependencies = ['apps.source.community']
     name = 'apps.source.bank'
+    event_manager = AppEventManager()
+
+    def ready(self):
+        from . import signals
+
+        register_events(self.event_manager)
+        register_functions(self.event_manager)
@@ -0,0 +1,56 @@
+from time import monotonic
+
+from apps.source.bank.settings import BANK_CONFIG
+
+
+class CurrencyCache():
+    def __init__(self):
+        # (currencies by name, currencies by id, load time), swapped as a whole so readers never see a partial load
+        self.currencies = None
+
+    def load(self):
+        from apps.source.bank.models import Currency
+        currencies = list(Currency.objects.all())
+        self.currencies = (
+            {currency.name: currency for currency in currencies},
+            {currency.id: currency for currency in currencies},
+            monotonic(),
+        )
+        return currencies
+
+    def clear(self):
+        self.currencies = None
+
+    def get_currencies(self):
+        currencies = self.currencies
+        # Bounds how long edits made by another process can go unnoticed
+        if currencies is None or monotonic() - currencies[2] > BANK_CONFIG['CURRENCY_CACHE_TIMEOUT']:
+            self.load()
+            currencies = self.currencies
+        return currencies
+
+    def get(self, name: str):
+        currency = self.get_currencies()[0].get(name)
+        if currency is None:
+            # Currencies created since the last load are picked up on the first miss
+            self.load()
+            currency = self.currencies[0].get(name)
+        if currency is None:
+            from apps.source.bank.models import Currency
+            raise Currency.DoesNotExist(f"Currency matching name '{name}' does not exist.")
+        return currency
+
+    def get_by_id(self, currency_id: int):
+        currency = self.get_currencies()[1].get(currency_id)
+        if currency is None:
+            self.load()
+            currency = self.currencies[1].get(currency_id)
+        if currency is None:
+            from apps.source.bank.models import Currency
+            raise Currency.DoesNotExist(f"Currency matching id '{currency_id}' does not exist.")
+        return currency
+
+    def resolve(self, currency):
+        return self.get(currency) if isinstance(currency, str) else currency
+
+CURRENCY_CACHE = CurrencyCache()
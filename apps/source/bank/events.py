@@ -0,0 +1,7 @@
+from economy.util import AppEventManager
+
+def register_events(event_manager: AppEventManager):
+    event_manager.register_event('on_balances_changed')
+
+def register_functions(event_manager: AppEventManager):
+    pass
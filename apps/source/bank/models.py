@@ -1,6 +1,11 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 
 from apps.source.community.models import Citizen
+from apps.source.bank.settings import BANK_CONFIG
+from apps.source.bank.cache import CURRENCY_CACHE
+from economy.event import EVENT_MANAGER
+from economy.versions import MODEL_VERSIONS
 
 
 class Currency(models.Model):
@@ -16,6 +21,33 @@ class Currency(models.Model):
             self.plural = f"{self.name}s"
         super().save(*args, **kwargs)
 
+    def to_minor_units(self, amount) -> int:
+        return round(amount * 10 ** self.decimal_places)
+
+    def from_minor_units(self, amount_minor: int) -> float:
+        return amount_minor / 10 ** self.decimal_places
+
+    def format_minor_units(self, amount_minor: int) -> str:
+        # Whole amounts are shown without a fractional part
+        amount = f"{self.from_minor_units(amount_minor):.{self.decimal_places}f}"
+        return amount.rstrip('0').rstrip('.') if self.decimal_places > 0 else amount
+
+    def convert_minor_units(self, amount_minor: int, currency: 'str|Currency') -> int:
+        if (amount_minor < 0):
+            raise ValueError("Please use positive integers only for conversions")
+        currency_obj = CURRENCY_CACHE.resolve(currency)
+        if (self.name == currency_obj.name):
+            return amount_minor
+        if (self.value == 0):
+            raise ValueError("Cannot convert to a currency with a value of 0")
+        numerator = amount_minor * currency_obj.value * 10 ** currency_obj.decimal_places
+        denominator = self.value * 10 ** self.decimal_places
+        converted_minor, remainder = divmod(numerator, denominator)
+        # Round half to even, like round() does for the float conversion
+        if (remainder * 2 > denominator or (remainder * 2 == denominator and converted_minor % 2 == 1)):
+            converted_minor += 1
+        return converted_minor
+
     def convert(self, amount: int, currency: str, round_to_decimal_place: bool = True):
         if (amount < 0):
             raise ValueError("Please use positive integers only for conversions")
@@ -23,11 +55,10 @@ class Currency(models.Model):
             return amount
         if (self.value == 0):
             raise ValueError("Cannot convert to a currency with a value of 0")
-        currency_obj = Currency.objects.get(name=currency)
-        converted_value = (amount / self.value) * currency_obj.value
+        currency_obj = CURRENCY_CACHE.get(currency)
         if (round_to_decimal_place):
-            converted_value = round(converted_value, currency_obj.decimal_places)
-        return converted_value
+            return currency_obj.from_minor_units(self.convert_minor_units(self.to_minor_units(amount), currency_obj))
+        return (amount / self.value) * currency_obj.value
 
     def __str__(self):
         return f"({self.symbol}){self.name}" if self.symbol_as_prefix else f"{self.name}({self.symbol})"
@@ -41,25 +72,25 @@ class Account(models.Model):
     def deposit(self, amount: int, currency: str|Currency):
         if (amount < 0):
             raise ValueError("Please use positive integers only for deposits")
-        currency_object = Currency.objects.get(name=currency) if isinstance(currency, str) else currency
+        currency_object = CURRENCY_CACHE.resolve(currency)
         account_currency, created = AccountCurrencyBalance.objects.get_or_create(
             account=self,
             currency=currency_object
         )
-        account_currency.deposit(amount)
+        account_currency.deposit_minor_units(currency_object.to_minor_units(amount))
 
     def withdraw(self, amount: int, currency: str|Currency):
         if (amount < 0):
             raise ValueError("Please use positive integers only for withdrawals")
-        currency_object = Currency.objects.get(name=currency) if isinstance(currency, str) else currency
+        currency_object = CURRENCY_CACHE.resolve(currency)
         account_currency = AccountCurrencyBalance.objects.get(
             account=self,
             currency=currency_object
         )
-        account_currency.withdraw(amount)
+        account_currency.withdraw_minor_units(currency_object.to_minor_units(amount))
 
     def check_balance(self, currency: str|Currency):
-        currency_object = Currency.objects.get(name=currency) if isinstance(currency, str) else currency
+        currency_object = CURRENCY_CACHE.resolve(currency)
         account_currency, created = AccountCurrencyBalance.objects.get_or_create(
             account=self,
             currency=currency_object
@@ -75,24 +106,91 @@ class Account(models.Model):
 class AccountCurrencyBalance(models.Model):
     account = models.ForeignKey(Account, on_delete=models.CASCADE)
     currency = models.ForeignKey(Currency, on_delete=models.CASCADE)
-    balance = models.FloatField(default=0)
+    balance_minor = models.BigIntegerField(default=0, help_text="Balance in the currency's smallest unit (1050 for 10.50 with 2 decimal places)")
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['account', 'currency'], name='unique_account_currency_balance')]
+
+    def get_currency(self) -> Currency:
+        # A joined currency is used as is, otherwise the currency cache saves the foreign key query
+        if AccountCurrencyBalance.currency.is_cached(self):
+            return self.currency
+        return CURRENCY_CACHE.get_by_id(self.currency_id)
+
+    @property
+    def balance(self):
+        return self.get_currency().from_minor_units(self.balance_minor)
+
+    @balance.setter
+    def balance(self, amount):
+        self.balance_minor = self.get_currency().to_minor_units(amount)
 
     def deposit(self, amount: int):
         if (amount < 0):
             raise ValueError("Please use positive integers only for deposits")
-        self.balance = round(self.balance + amount, self.currency.decimal_places)
-        self.save()
+        self.deposit_minor_units(self.get_currency().to_minor_units(amount))
 
     def withdraw(self, amount: int):
         if (amount < 0):
             raise ValueError("Please use positive integers only for withdrawals")
-        if (amount > self.balance):
-            raise ValueError("You cannot withdraw more than the balance")
-        self.balance = round(self.balance - amount, self.currency.decimal_places)
-        self.save()
+        self.withdraw_minor_units(self.get_currency().to_minor_units(amount))
+
+    def deposit_minor_units(self, amount_minor: int):
+        if (amount_minor < 0):
+            raise ValueError("Please use positive integers only for deposits")
+        with transaction.atomic():
+            AccountCurrencyBalance.objects.filter(pk=self.pk).update(balance_minor=F('balance_minor') + amount_minor)
+            MODEL_VERSIONS.bump(AccountCurrencyBalance)
+            LedgerEntry.record(self, amount_minor)
+            EVENT_MANAGER.source.bank.trigger_on_commit('on_balances_changed', balance_ids=[self.pk])
+        self.refresh_from_db(fields=['balance_minor'])
+
+    def withdraw_minor_units(self, amount_minor: int):
+        if (amount_minor < 0):
+            raise ValueError("Please use positive integers only for withdrawals")
+        with transaction.atomic():
+            # The overdraft check is part of the update so concurrent withdrawals cannot overdraw
+            updated = AccountCurrencyBalance.objects.filter(pk=self.pk, balance_minor__gte=amount_minor).update(balance_minor=F('balance_minor') - amount_minor)
+            if not updated:
+                raise ValueError("You cannot withdraw more than the balance")
+            MODEL_VERSIONS.bump(AccountCurrencyBalance)
+            LedgerEntry.record(self, -amount_minor)
+            EVENT_MANAGER.source.bank.trigger_on_commit('on_balances_changed', balance_ids=[self.pk])
+        self.refresh_from_db(fields=['balance_minor'])
 
     def __str__(self):
-        return f"{self.account} - {self.currency}: {self.balance}"
+        return f"{self.account} - {self.currency}: {self.get_currency().format_minor_units(self.balance_minor)}"
 
     def __repr__(self):
         return f"AccountCurrencyBalance({self.account} - {self.currency})"
+
+class LedgerEntry(models.Model):
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='ledger_entries')
+    currency = models.ForeignKey(Currency, on_delete=models.CASCADE, related_name='ledger_entries')
+    amount_minor = models.BigIntegerField(help_text="Change in balance in the currency's smallest unit, negative for withdrawals")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['account', 'created_at'])]
+
+    def get_currency(self) -> Currency:
+        if LedgerEntry.currency.is_cached(self):
+            return self.currency
+        return CURRENCY_CACHE.get_by_id(self.currency_id)
+
+    @property
+    def amount(self):
+        return self.get_currency().from_minor_units(self.amount_minor)
+
+    @classmethod
+    def record(cls, account_currency: AccountCurrencyBalance, amount_minor: int):
+        # Zero amounts move nothing, journal_in_bulk skips them too
+        if not BANK_CONFIG['JOURNAL_TRANSACTIONS'] or amount_minor == 0:
+            return None
+        return cls.objects.create(account_id=account_currency.account_id, currency_id=account_currency.currency_id, amount_minor=amount_minor)
+
+    def __str__(self):
+        return f"{self.account} - {self.currency}: {self.get_currency().format_minor_units(self.amount_minor)}"
+
+    def __repr__(self):
+        return f"LedgerEntry({self.account} - {self.currency}: {self.get_currency().format_minor_units(self.amount_minor)})"
@@ -0,0 +1,4 @@
+BANK_CONFIG = {
+    'JOURNAL_TRANSACTIONS': True,   # Record every balance change as a LedgerEntry. Default: True
+    'CURRENCY_CACHE_TIMEOUT': 60,   # Time in seconds before cached currencies are reloaded. Default: 60 seconds
+}
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.source.bank.cache import CURRENCY_CACHE
+from apps.source.bank.models import Currency
+
+
+@receiver([post_save, post_delete], sender=Currency)
+def invalidate_currency_cache(sender, **kwargs):
+    CURRENCY_CACHE.clear()
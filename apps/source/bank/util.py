@@ -0,0 +1,105 @@
+from django.db import transaction
+from django.db.models import F
+
+from apps.source.bank.models import Currency, Account, AccountCurrencyBalance, LedgerEntry
+from apps.source.bank.settings import BANK_CONFIG
+from apps.source.bank.cache import CURRENCY_CACHE
+from economy.event import EVENT_MANAGER
+from economy.util import get_or_create_in_bulk
+from economy.versions import MODEL_VERSIONS
+
+
+def get_account_id(account: int|Account) -> int:
+    return account.id if isinstance(account, Account) else account
+
+def journal_in_bulk(entries: list[tuple[int, int, int]]):
+    if not BANK_CONFIG['JOURNAL_TRANSACTIONS']:
+        return []
+    ledger_entries = LedgerEntry.objects.bulk_create([
+        LedgerEntry(account_id=account_id, currency_id=currency_id, amount_minor=amount_minor)
+        for account_id, currency_id, amount_minor in entries if amount_minor != 0
+    ])
+    MODEL_VERSIONS.bump(LedgerEntry)
+    return ledger_entries
+
+def bulk_deposit(deposits: dict[int|Account, int], currency: str|Currency, minor_units: bool = False) -> int:
+    currency_object = CURRENCY_CACHE.resolve(currency)
+
+    amounts_minor = {}
+    for account, amount in deposits.items():
+        if (amount < 0):
+            raise ValueError("Please use positive integers only for deposits")
+        account_id = get_account_id(account)
+        amount_minor = amount if minor_units else currency_object.to_minor_units(amount)
+        amounts_minor[account_id] = amounts_minor.get(account_id, 0) + amount_minor
+    amounts_minor = {account_id: amount_minor for account_id, amount_minor in amounts_minor.items() if amount_minor > 0}
+    if not amounts_minor:
+        return 0
+
+    with transaction.atomic():
+        balances = get_or_create_in_bulk(AccountCurrencyBalance, 'account_id', list(amounts_minor.keys()), currency=currency_object)
+        for account_id, amount_minor in amounts_minor.items():
+            # Added in the database so concurrent deposits to the same balance are not lost
+            balances[account_id].balance_minor = F('balance_minor') + amount_minor
+        AccountCurrencyBalance.objects.bulk_update(balances.values(), ['balance_minor'])
+        MODEL_VERSIONS.bump(AccountCurrencyBalance)
+        journal_in_bulk([(account_id, currency_object.id, amount_minor) for account_id, amount_minor in amounts_minor.items()])
+        EVENT_MANAGER.source.bank.trigger_on_commit('on_balances_changed', balance_ids=[balance.pk for balance in balances.values()])
+
+    return len(amounts_minor)
+
+def bulk_transfer(transfers: list[tuple], minor_units: bool = False) -> int:
+    # Each transfer is (sender, receiver, amount, currency) or (sender, receiver, amount, currency, receiver_currency)
+    movements = []
+    for sender, receiver, amount, currency, *receiver_currency in transfers:
+        if (amount < 0):
+            raise ValueError("Please use positive integers only for transfers")
+        currency_object = CURRENCY_CACHE.resolve(currency)
+        receiver_currency_object = CURRENCY_CACHE.resolve(receiver_currency[0]) if receiver_currency else currency_object
+        amount_minor = amount if minor_units else currency_object.to_minor_units(amount)
+        movements.append((
+            (get_account_id(sender), currency_object.id), amount_minor,
+            (get_account_id(receiver), receiver_currency_object.id), currency_object.convert_minor_units(amount_minor, receiver_currency_object),
+        ))
+    if not movements:
+        return 0
+
+    keys = {sender_key for sender_key, _, _, _ in movements} | {receiver_key for _, _, receiver_key, _ in movements}
+
+    with transaction.atomic():
+        existing_keys = set(
+            AccountCurrencyBalance.objects
+            .filter(account_id__in={account_id for account_id, _ in keys}, currency_id__in={currency_id for _, currency_id in keys})
+            .values_list('account_id', 'currency_id')
+        )
+        # Senders may be funded earlier in the same batch, missing balances start empty
+        # Rows a concurrent batch created first are picked up by the locking select below
+        AccountCurrencyBalance.objects.bulk_create([
+            AccountCurrencyBalance(account_id=account_id, currency_id=currency_id)
+            for account_id, currency_id in keys - existing_keys
+        ], ignore_conflicts=True)
+
+        # Rows are always locked in primary key order so concurrent batches cannot deadlock
+        balances = {
+            (balance.account_id, balance.currency_id): balance
+            for balance in AccountCurrencyBalance.objects.select_for_update()
+            .filter(account_id__in={account_id for account_id, _ in keys}, currency_id__in={currency_id for _, currency_id in keys})
+            .order_by('pk')
+            if (balance.account_id, balance.currency_id) in keys
+        }
+
+        entries = []
+        for sender_key, amount_minor, receiver_key, received_minor in movements:
+            if balances[sender_key].balance_minor < amount_minor:
+                raise ValueError("You cannot withdraw more than the balance")
+            balances[sender_key].balance_minor -= amount_minor
+            balances[receiver_key].balance_minor += received_minor
+            entries.append((*sender_key, -amount_minor))
+            entries.append((*receiver_key, received_minor))
+
+        AccountCurrencyBalance.objects.bulk_update(balances.values(), ['balance_minor'])
+        MODEL_VERSIONS.bump(AccountCurrencyBalance)
+        journal_in_bulk(entries)
+        EVENT_MANAGER.source.bank.trigger_on_commit('on_balances_changed', balance_ids=[balance.pk for balance in balances.values()])
+
+    return len(movements)
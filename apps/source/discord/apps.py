@@ -9,6 +9,7 @@ class DiscordConfig(AppConfig):
     event_manager = AppEventManager()
 
     def ready(self):
+        from . import signals
         from . import urls
         self.urlpatterns = urls.urlpatterns
 
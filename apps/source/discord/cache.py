@@ -0,0 +1,27 @@
+class IdentityCache():
+    def __init__(self):
+        # Known primary keys per model, only rows confirmed to exist are kept
+        self.ids: dict[type, set[str]] = {}
+
+    def load(self, model):
+        self.ids[model] = set(model.objects.values_list('id', flat=True))
+        return self.ids[model]
+
+    def exists(self, model, object_id) -> bool:
+        object_id = str(object_id)
+        ids = self.ids.setdefault(model, set())
+        if object_id in ids:
+            return True
+        # Rows created since they were last seen are picked up on a miss
+        if model.objects.filter(id=object_id).exists():
+            ids.add(object_id)
+            return True
+        return False
+
+    def discard(self, model, object_id):
+        self.ids.get(model, set()).discard(str(object_id))
+
+    def clear(self):
+        self.ids = {}
+
+DISCORD_IDENTITIES = IdentityCache()
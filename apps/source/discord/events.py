@@ -2,11 +2,23 @@ from economy.util import AppEventManager
 
 
 class ClientEvent():
-    def __init__(self, client, **kwargs):
+    __slots__ = ('client', 'payload', 'payload_factory')
+
+    def __init__(self, client, payload_factory=None, **kwargs):
         self.client = client
+        # A payload factory is only called the first time a payload value is read
+        self.payload = None if payload_factory is not None else kwargs
+        self.payload_factory = payload_factory
 
-        for key in kwargs:
-            setattr(self, key, kwargs[key])
+    def __getattr__(self, name):
+        # Only reached for names that are not slots, payload values are looked up on access
+        payload = object.__getattribute__(self, 'payload')
+        if payload is None:
+            payload = self.payload = object.__getattribute__(self, 'payload_factory')()
+        try:
+            return payload[name]
+        except KeyError:
+            raise AttributeError(name) from None
 
 def register_events(event_manager: AppEventManager):
     # Models
@@ -1,7 +1,11 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from asgiref.sync import sync_to_async
+from django.db import transaction
 
+from economy.event import EVENT_MANAGER
+from economy.util import chunked
+from economy.versions import MODEL_VERSIONS
 from apps.source.community.models import Citizen
 from apps.source.discord.models import (
     Guild,
@@ -12,6 +16,8 @@ from apps.source.discord.models import (
     StageChannel,
     ForumChannel,
 )
+from apps.source.discord.settings import SYNC_CONFIG, WRITE_BEHIND_CONFIG
+from apps.source.discord.writes import DISCORD_WRITES
 
 
 # Guilds
@@ -31,6 +37,7 @@ def sync_guilds_with_db(bot: commands.Bot):
             guilds_synced += 1
 
     guilds_in_db.exclude(id__in=[str(guild.id) for guild in bot.guilds]).update(active=False)
+    MODEL_VERSIONS.bump(Guild)
     return guilds_synced
 
 def remove_inactive_guilds():
@@ -63,31 +70,88 @@ def create_or_update_member(member: discord.Member, leaving_guild=False):
     db_member.save()
     return False
 
+def bulk_sync_members_with_db(members: list[discord.Member]):
+    batch_size = SYNC_CONFIG['BATCH_SIZE']
+    gateway_members = {}
+    gateway_memberships = set()
+    for member in members:
+        if member.bot:
+            continue
+        gateway_members[str(member.id)] = member
+        gateway_memberships.add((str(member.id), str(member.guild.id)))
+
+    member_ids = list(gateway_members)
+    db_members = {}
+    db_memberships = set()
+    Membership = Member.guilds.through
+    for batch in chunked(member_ids, batch_size):
+        db_members.update({
+            db_member.id: db_member
+            for db_member in Member.objects.filter(id__in=batch).select_related('citizen').only('name', 'citizen__name')
+        })
+        db_memberships.update(Membership.objects.filter(member_id__in=batch).values_list('member_id', 'guild_id'))
+    guild_ids = set(Guild.objects.filter(id__in={guild_id for _, guild_id in gateway_memberships}).values_list('id', flat=True))
+
+    new_members = [gateway_members[member_id] for member_id in member_ids if member_id not in db_members]
+    changed_members = []
+    changed_citizens = []
+    for member_id, db_member in db_members.items():
+        member = gateway_members[member_id]
+        if db_member.name != member.name:
+            db_member.name = member.name
+            changed_members.append(db_member)
+        if db_member.citizen.name != member.display_name:
+            db_member.citizen.name = member.display_name
+            changed_citizens.append(db_member.citizen)
+    new_memberships = [
+        Membership(member_id=member_id, guild_id=guild_id)
+        for member_id, guild_id in gateway_memberships - db_memberships if guild_id in guild_ids
+    ]
+
+    with transaction.atomic():
+        new_citizens = Citizen.objects.bulk_create([Citizen(name=member.display_name) for member in new_members], batch_size=batch_size)
+        Member.objects.bulk_create([
+            Member(id=str(member.id), name=member.name, citizen=citizen)
+            for member, citizen in zip(new_members, new_citizens)
+        ], batch_size=batch_size)
+        Member.objects.bulk_update(changed_members, ['name'], batch_size=batch_size)
+        Citizen.objects.bulk_update(changed_citizens, ['name'], batch_size=batch_size)
+        Membership.objects.bulk_create(new_memberships, batch_size=batch_size, ignore_conflicts=True)
+        # Bulk writes skip the signals that keep item list versions current
+        MODEL_VERSIONS.bump(Citizen, Member, Membership, Guild)
+
+    # Bulk writes skip Citizen.save, so its events are triggered here instead
+    for citizen in new_citizens:
+        EVENT_MANAGER.source.community.trigger('on_citizen_created', citizen=citizen)
+    for citizen in changed_citizens:
+        EVENT_MANAGER.source.community.trigger('on_citizen_updated', citizen=citizen)
+
+    return len(new_members)
+
 def sync_members_with_db(bot: commands.Bot):
-    members_synced = 0
-    for member in bot.get_all_members():
-        created = create_or_update_member(member)
-        if created:
-            members_synced += 1
-    return members_synced
+    return bulk_sync_members_with_db(list(bot.get_all_members()))
 
 # Channels
+CHANNEL_MODELS = [
+    (discord.TextChannel, TextChannel),
+    (discord.VoiceChannel, VoiceChannel),
+    (discord.CategoryChannel, Category),
+    (discord.StageChannel, StageChannel),
+    (discord.ForumChannel, ForumChannel),
+]
+
+def get_channel_model(channel: discord.abc.GuildChannel):
+    for channel_class, channel_model in CHANNEL_MODELS:
+        if isinstance(channel, channel_class):
+            return channel_model
+    return None
+
 def create_or_update_channel(channel: discord.abc.GuildChannel, guild_id: int, remove=False):
     if not channel.permissions_for(channel.guild.me).view_channel:
         return None
 
-    channel_model = None
-    if isinstance(channel, discord.TextChannel):
-        channel_model = TextChannel
-    elif isinstance(channel, discord.VoiceChannel):
-        channel_model = VoiceChannel
-    elif isinstance(channel, discord.CategoryChannel):
-        channel_model = Category
-    elif isinstance(channel, discord.StageChannel):
-        channel_model = StageChannel
-    elif isinstance(channel, discord.ForumChannel):
-        channel_model = ForumChannel
-    else:
+    channel_model = get_channel_model(channel)
+    if channel_model is None:
         return None
     
     db_guild = Guild.objects.get(id=str(guild_id))
@@ -107,22 +171,70 @@ def create_or_update_channel(channel: discord.abc.GuildChannel, guild_id: int, r
     db_channel.save()
     return False
 
-def sync_channels_with_db(bot: commands.Bot):
-    channels_synced = 0
-    for guild in bot.guilds:
+def bulk_sync_channels_with_db(guilds: list[discord.Guild]):
+    batch_size = SYNC_CONFIG['BATCH_SIZE']
+    guild_ids = set(Guild.objects.filter(id__in=[str(guild.id) for guild in guilds]).values_list('id', flat=True))
+
+    gateway_channels = {channel_model: {} for _, channel_model in CHANNEL_MODELS}
+    for guild in guilds:
+        if str(guild.id) not in guild_ids:
+            continue
         for channel in guild.channels:
-            if create_or_update_channel(channel, guild.id):
-                channels_synced += 1
+            channel_model = get_channel_model(channel)
+            if channel_model is None or not channel.permissions_for(channel.guild.me).view_channel:
+                continue
+            gateway_channels[channel_model][str(channel.id)] = (channel.name, str(guild.id))
+
+    channels_synced = 0
+    with transaction.atomic():
+        for channel_model, channels in gateway_channels.items():
+            db_channels = {
+                db_channel.id: db_channel
+                for db_channel in channel_model.objects.filter(guild_id__in=guild_ids).only('name', 'guild_id')
+            }
+
+            new_channels = [
+                channel_model(id=channel_id, name=name, guild_id=guild_id)
+                for channel_id, (name, guild_id) in channels.items() if channel_id not in db_channels
+            ]
+            renamed_channels = []
+            for channel_id, db_channel in db_channels.items():
+                if channel_id in channels and db_channel.name != channels[channel_id][0]:
+                    db_channel.name = channels[channel_id][0]
+                    renamed_channels.append(db_channel)
+            # Channels that were deleted or are no longer visible to the client
+            removed_channel_ids = [channel_id for channel_id in db_channels if channel_id not in channels]
+
+            channel_model.objects.bulk_create(new_channels, batch_size=batch_size)
+            channel_model.objects.bulk_update(renamed_channels, ['name'], batch_size=batch_size)
+            for batch in chunked(removed_channel_ids, batch_size):
+                channel_model.objects.filter(id__in=batch).delete()
+            channels_synced += len(new_channels)
+        MODEL_VERSIONS.bump(*gateway_channels.keys())
+
     return channels_synced
 
+def sync_channels_with_db(bot: commands.Bot):
+    return bulk_sync_channels_with_db(bot.guilds)
+
 class DiscordDBCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.flush_writes.start()
+
+    @tasks.loop(seconds=WRITE_BEHIND_CONFIG['FLUSH_INTERVAL'])
+    async def flush_writes(self):
+        await DISCORD_WRITES.flush()
+
+    async def cog_unload(self):
+        self.flush_writes.cancel()
+        await DISCORD_WRITES.flush()
 
     @discord.app_commands.command(name='db_sync', description='Syncs discord related information with the database.')
     @discord.app_commands.default_permissions(administrator=True)
     async def db_sync(self, interaction: discord.Interaction):
         await interaction.response.send_message('Syncing discord information with the database...')
+        await DISCORD_WRITES.flush()
         guilds_synced = await sync_to_async(sync_guilds_with_db)(self.bot)
         members_synced = await sync_to_async(sync_members_with_db)(self.bot)
         channels_synced = await sync_to_async(sync_channels_with_db)(self.bot)
@@ -138,44 +250,45 @@ class DiscordDBCog(commands.Cog):
     @discord.app_commands.default_permissions(administrator=True)
     async def db_remove_inactive_guilds(self, interaction: discord.Interaction):
         await interaction.response.send_message('Removing inactive guilds from the database...')
+        await DISCORD_WRITES.flush()
         guilds_removed = await sync_to_async(remove_inactive_guilds)()
         await interaction.followup.send(f'Done! `{guilds_removed}` guild{"" if guilds_removed == 1 else "s"} removed.')
 
     @commands.Cog.listener()
     async def on_guild_join(self, guild: discord.Guild):
-        await sync_to_async(create_or_update_guild)(guild)
+        DISCORD_WRITES.enqueue(('guild', guild.id), create_or_update_guild, guild)
 
     @commands.Cog.listener()
     async def on_guild_remove(self, guild: discord.Guild):
-        create_or_update_guild(guild, active=False)
+        DISCORD_WRITES.enqueue(('guild', guild.id), create_or_update_guild, guild, active=False)
 
     @commands.Cog.listener()
     async def on_guild_update(self, before: discord.Guild, after: discord.Guild):
-        await sync_to_async(create_or_update_guild)(after)
+        DISCORD_WRITES.enqueue(('guild', after.id), create_or_update_guild, after)
 
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member):
-        await sync_to_async(create_or_update_member)(member)
+        DISCORD_WRITES.enqueue(('member', member.id, member.guild.id), create_or_update_member, member)
 
     @commands.Cog.listener()
     async def on_member_remove(self, member: discord.Member):
-        await sync_to_async(create_or_update_member)(member, leaving_guild=True)
+        DISCORD_WRITES.enqueue(('member', member.id, member.guild.id), create_or_update_member, member, leaving_guild=True)
 
     @commands.Cog.listener()
     async def on_member_update(self, before: discord.Member, after: discord.Member):
-        await sync_to_async(create_or_update_member)(after)
+        DISCORD_WRITES.enqueue(('member', after.id, after.guild.id), create_or_update_member, after)
 
     @commands.Cog.listener()
     async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
-        await sync_to_async(create_or_update_channel)(channel, channel.guild.id)
+        DISCORD_WRITES.enqueue(('channel', channel.id), create_or_update_channel, channel, channel.guild.id)
 
     @commands.Cog.listener()
     async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
-        await sync_to_async(create_or_update_channel)(channel, channel.guild.id, remove=True)
+        DISCORD_WRITES.enqueue(('channel', channel.id), create_or_update_channel, channel, channel.guild.id, remove=True)
 
     @commands.Cog.listener()
     async def on_guild_channel_update(self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
-        await sync_to_async(create_or_update_channel)(after, after.guild.id)
+        DISCORD_WRITES.enqueue(('channel', after.id), create_or_update_channel, after, after.guild.id)
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(DiscordDBCog(bot))
@@ -1,121 +1,139 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
+from django.conf import settings
 
 from economy.event import EVENT_MANAGER
+from economy.metrics import EVENT_METRICS
 from apps.source.discord.events import ClientEvent
 
 class EventsCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        if EVENT_METRICS.enabled and settings.EVENTS['METRICS_PATH']:
+            self.save_metrics.start()
+
+    @tasks.loop(seconds=settings.EVENTS['METRICS_SAVE_INTERVAL'])
+    async def save_metrics(self):
+        EVENT_METRICS.save()
+
+    async def cog_unload(self):
+        if self.save_metrics.is_running():
+            self.save_metrics.cancel()
+            EVENT_METRICS.save()
+
+    async def trigger_event(self, event_name: str, payload_factory=None):
+        # Unsubscribed events cost one lookup, the payload is only built once a handler reads it
+        if EVENT_MANAGER.source.discord.has_subscribers(event_name):
+            await EVENT_MANAGER.source.discord.trigger_async(event_name, ClientEvent(self, payload_factory))
 
     # Gateway Events
     @commands.Cog.listener()
     async def on_ready(self):
-        EVENT_MANAGER.source.discord.trigger('on_client_ready', ClientEvent(self))
+        await self.trigger_event('on_client_ready')
 
     # Guild Events
     @commands.Cog.listener()
     async def on_guild_join(self, guild: discord.Guild):
-        EVENT_MANAGER.source.discord.trigger('on_guild_join', ClientEvent(self, guild=guild))
+        await self.trigger_event('on_guild_join', lambda: {'guild': guild})
 
     @commands.Cog.listener()
     async def on_guild_remove(self, guild: discord.Guild):
-        EVENT_MANAGER.source.discord.trigger('on_guild_remove', ClientEvent(self, guild=guild))
+        await self.trigger_event('on_guild_remove', lambda: {'guild': guild})
 
     @commands.Cog.listener()
     async def on_guild_update(self, before: discord.Guild, after: discord.Guild):
-        EVENT_MANAGER.source.discord.trigger('on_guild_update', ClientEvent(self, before=before, after=after))
+        await self.trigger_event('on_guild_update', lambda: {'before': before, 'after': after})
 
     @commands.Cog.listener()
     async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
-        EVENT_MANAGER.source.discord.trigger('on_channel_create', ClientEvent(self, guild=channel.guild, channel=channel))
+        await self.trigger_event('on_channel_create', lambda: {'guild': channel.guild, 'channel': channel})
 
     @commands.Cog.listener()
     async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
-        EVENT_MANAGER.source.discord.trigger('on_channel_delete', ClientEvent(self, guild=channel.guild, channel=channel))
+        await self.trigger_event('on_channel_delete', lambda: {'guild': channel.guild, 'channel': channel})
 
     @commands.Cog.listener()
     async def on_guild_channel_update(self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
-        EVENT_MANAGER.source.discord.trigger('on_channel_update', ClientEvent(self, before=before, after=after))
+        await self.trigger_event('on_channel_update', lambda: {'before': before, 'after': after})
 
     @commands.Cog.listener()
     async def on_thread_create(self, thread: discord.Thread):
-        EVENT_MANAGER.source.discord.trigger('on_thread_create', ClientEvent(self, thread=thread))
+        await self.trigger_event('on_thread_create', lambda: {'thread': thread})
 
     @commands.Cog.listener()
     async def on_thread_join(self, thread: discord.Thread):
-        EVENT_MANAGER.source.discord.trigger('on_thread_join', ClientEvent(self, thread=thread))
+        await self.trigger_event('on_thread_join', lambda: {'thread': thread})
 
     @commands.Cog.listener()
     async def on_thread_update(self, before: discord.Thread, after: discord.Thread):
-        EVENT_MANAGER.source.discord.trigger('on_thread_update', ClientEvent(self, before=before, after=after))
+        await self.trigger_event('on_thread_update', lambda: {'before': before, 'after': after})
 
     @commands.Cog.listener()
     async def on_thread_delete(self, thread: discord.Thread):
-        EVENT_MANAGER.source.discord.trigger('on_thread_delete', ClientEvent(self, thread=thread))
+        await self.trigger_event('on_thread_delete', lambda: {'thread': thread})
 
     # Interaction Events
     @commands.Cog.listener()
     async def on_interaction(self, interaction: discord.Interaction):
-        EVENT_MANAGER.source.discord.trigger('on_interaction', ClientEvent(self, interaction=interaction))
+        await self.trigger_event('on_interaction', lambda: {'interaction': interaction})
 
     # Member Events
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member):
-        EVENT_MANAGER.source.discord.trigger('on_member_join', ClientEvent(self, member=member))
+        await self.trigger_event('on_member_join', lambda: {'member': member})
 
     @commands.Cog.listener()
     async def on_member_remove(self, member: discord.Member):
-        EVENT_MANAGER.source.discord.trigger('on_member_remove', ClientEvent(self, member=member))
+        await self.trigger_event('on_member_remove', lambda: {'member': member})
 
     @commands.Cog.listener()
     async def on_member_update(self, before: discord.Member, after: discord.Member):
-        EVENT_MANAGER.source.discord.trigger('on_member_update', ClientEvent(self, before=before, after=after))
+        await self.trigger_event('on_member_update', lambda: {'before': before, 'after': after})
 
     @commands.Cog.listener()
     async def on_user_update(self, before: discord.User, after: discord.User):
-        EVENT_MANAGER.source.discord.trigger('on_user_update', ClientEvent(self, before=before, after=after))
+        await self.trigger_event('on_user_update', lambda: {'before': before, 'after': after})
 
     @commands.Cog.listener()
     async def on_thread_member_join(self, member: discord.Member):
-        EVENT_MANAGER.source.discord.trigger('on_thread_member_join', ClientEvent(self, member=member))
+        await self.trigger_event('on_thread_member_join', lambda: {'member': member})
 
     @commands.Cog.listener()
     async def on_thread_member_remove(self, member: discord.Member):
-        EVENT_MANAGER.source.discord.trigger('on_thread_member_remove', ClientEvent(self, member=member))
+        await self.trigger_event('on_thread_member_remove', lambda: {'member': member})
 
     # Invite Events
     @commands.Cog.listener()
     async def on_invite_created(self, invite: discord.Invite):
-        EVENT_MANAGER.source.discord.trigger('on_invite_created', ClientEvent(self, invite=invite))
+        await self.trigger_event('on_invite_created', lambda: {'invite': invite})
 
     @commands.Cog.listener()
     async def on_invite_deleted(self, invite: discord.Invite):
-        EVENT_MANAGER.source.discord.trigger('on_invite_deleted', ClientEvent(self, invite=invite))
+        await self.trigger_event('on_invite_deleted', lambda: {'invite': invite})
 
     # Voice State Events
     @commands.Cog.listener()
     async def on_voice_state_update(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState):
-        EVENT_MANAGER.source.discord.trigger('on_voice_state_update', ClientEvent(self, member=member, before=before, after=after))
+        await self.trigger_event('on_voice_state_update', lambda: {'member': member, 'before': before, 'after': after})
 
     # Presence Events
     @commands.Cog.listener()
     async def on_presence_update(self, before: discord.Member, after: discord.Member):
-        EVENT_MANAGER.source.discord.trigger('on_presence_update', ClientEvent(self, before=before, after=after))
+        await self.trigger_event('on_presence_update', lambda: {'before': before, 'after': after})
 
     # Message Events
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
-        EVENT_MANAGER.source.discord.trigger('on_message', ClientEvent(self, message=message))
+        await self.trigger_event('on_message', lambda: {'message': message})
 
     # Reaction Events
     @commands.Cog.listener()
     async def on_reaction_add(self, reaction: discord.Reaction, user: discord.User):
-        EVENT_MANAGER.source.discord.trigger('on_reaction_add', ClientEvent(self, reaction=reaction, user=user))
+        await self.trigger_event('on_reaction_add', lambda: {'reaction': reaction, 'user': user})
 
     @commands.Cog.listener()
     async def on_reaction_remove(self, reaction: discord.Reaction, user: discord.User):
-        EVENT_MANAGER.source.discord.trigger('on_reaction_remove', ClientEvent(self, reaction=reaction, user=user))
+        await self.trigger_event('on_reaction_remove', lambda: {'reaction': reaction, 'user': user})
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(EventsCog(bot))
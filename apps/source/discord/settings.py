@@ -12,7 +12,17 @@ COMMAND_EXTENSIONS = [
     'apps.source.discord.extensions.events',
     'apps.source.activity.extensions.activity',
     'apps.source.activity.extensions.voice',
+    'apps.source.leaderboard.extensions.leaderboard',
 ]
 
 # Where slash commands will be locally synced to for testing
 TEST_SERVER_ID = config("TEST_SERVER_ID")
+
+SYNC_CONFIG = {
+    'BATCH_SIZE': 900,  # Rows per query when syncing with the database, kept under SQLite's variable limit. Default: 900
+}
+
+WRITE_BEHIND_CONFIG = {
+    'FLUSH_INTERVAL': 1,    # Time in seconds between flushes of queued gateway writes. Default: 1 second
+    'MAX_PENDING': 500,     # Number of queued writes that triggers an immediate flush. Default: 500
+}
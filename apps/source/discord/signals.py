@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from apps.source.discord.cache import DISCORD_IDENTITIES
+from apps.source.discord.models import Member, VoiceChannel
+
+
+@receiver(post_delete, sender=Member)
+@receiver(post_delete, sender=VoiceChannel)
+def forget_deleted_identity(sender, instance, **kwargs):
+    DISCORD_IDENTITIES.discard(sender, instance.id)
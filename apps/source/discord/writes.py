@@ -0,0 +1,44 @@
+import asyncio
+import logging
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+
+from apps.source.discord.settings import WRITE_BEHIND_CONFIG
+
+
+logger = logging.getLogger(__name__)
+
+def apply_writes(writes: list[tuple]):
+    with transaction.atomic():
+        for function, args, kwargs in writes:
+            # A savepoint per write so one failure does not roll back the rest of the batch
+            try:
+                with transaction.atomic():
+                    function(*args, **kwargs)
+            except Exception:
+                logger.exception('Queued write %s failed', getattr(function, '__name__', function))
+    return len(writes)
+
+class WriteBehindQueue():
+    def __init__(self):
+        self.pending: dict[tuple, tuple] = {}
+        self.flush_lock = asyncio.Lock()
+        self.flush_task: asyncio.Task = None
+
+    def enqueue(self, key: tuple, function, *args, **kwargs):
+        # The last write to an entity replaces any earlier one but keeps its place, so a write never runs before one it depends on
+        self.pending[key] = (function, args, kwargs)
+
+        if len(self.pending) >= WRITE_BEHIND_CONFIG['MAX_PENDING'] and (self.flush_task is None or self.flush_task.done()):
+            self.flush_task = asyncio.get_running_loop().create_task(self.flush())
+
+    async def flush(self):
+        async with self.flush_lock:
+            writes = list(self.pending.values())
+            self.pending = {}
+            if not writes:
+                return 0
+            return await sync_to_async(apply_writes)(writes)
+
+DISCORD_WRITES = WriteBehindQueue()
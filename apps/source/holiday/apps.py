@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class HolidayConfig(AppConfig):
     name = 'apps.source.holiday'
+
+    def ready(self):
+        from . import signals
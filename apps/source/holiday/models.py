@@ -1,10 +1,9 @@
 from datetime import date, datetime
 
-from dateutil.relativedelta import relativedelta
 from django.db import models
 from django.utils import timezone
 
-from apps.source.holiday.util import int_to_dateutil_weekday
+from apps.source.holiday.util import get_weekday_date
 
 
 class Holiday(models.Model):
@@ -48,12 +47,8 @@ class WeekdayHoliday(Holiday):
     ))
 
     def get_date(self, year):
-        if self.week >= 0:
-            day = 1
-        else:
-            day = 31
-        weekday = int_to_dateutil_weekday(self.day)
-        return timezone.datetime.today() + relativedelta(year=year, month=self.month, day=day, weekday=weekday(+self.week), hour=0, minute=0, second=0, microsecond=0)
+        holiday_date = get_weekday_date(year, self.month, self.day, self.week)
+        return timezone.datetime(holiday_date.year, holiday_date.month, holiday_date.day)
 
     def __str__(self):
         week_str = f'{self.week}th'
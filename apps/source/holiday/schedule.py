@@ -0,0 +1,114 @@
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+
+import numpy as np
+
+from apps.source.holiday.models import WeekdayHoliday, FixedHoliday
+from apps.source.holiday.util import get_weekday_dates, get_fixed_dates
+
+
+class HolidayCalendar():
+    def __init__(self, holidays: list):
+        self.holidays = list(holidays)
+        # year -> (sorted dates, holidays by date), each year is built on first use
+        self.years: dict[int, tuple[list[date], dict[date, list]]] = {}
+
+    def get_year(self, year: int):
+        if year not in self.years:
+            holidays_by_date = {}
+            for holiday in self.holidays:
+                try:
+                    holiday_date = holiday.get_date(year).date()
+                except ValueError:
+                    # Dates like February 29th do not exist every year
+                    continue
+                holidays_by_date.setdefault(holiday_date, []).append(holiday)
+            self.years[year] = (sorted(holidays_by_date), holidays_by_date)
+        return self.years[year]
+
+    def get_holidays_on(self, day: date) -> list:
+        # Weekday holidays can spill into the next year, so the year before is checked as well
+        holidays = []
+        for year in (day.year - 1, day.year):
+            holidays += self.get_year(year)[1].get(day, [])
+        return holidays
+
+    def get_holidays_between(self, start: date, end: date) -> dict[date, list]:
+        holidays_between = {}
+        for year in range(start.year - 1, end.year + 1):
+            dates, holidays_by_date = self.get_year(year)
+            for holiday_date in dates[bisect_left(dates, start):bisect_right(dates, end)]:
+                holidays_between.setdefault(holiday_date, []).extend(holidays_by_date[holiday_date])
+        return dict(sorted(holidays_between.items()))
+
+    def get_next_holiday(self, after: date, max_years: int = 8):
+        # Returns (date, holidays) of the first holiday strictly after the given date
+        if not self.holidays:
+            return None
+        for year in range(after.year, after.year + max_years):
+            holidays_between = self.get_holidays_between(after + timedelta(days=1), date(year, 12, 31))
+            if holidays_between:
+                return next(iter(holidays_between.items()))
+        return None
+
+def iter_holiday_occurrences(start: date, end: date, holidays: list = None, years_per_batch: int = 10):
+    # Yields (date, holiday) for every occurrence between start and end inclusive, in date order
+    if holidays is None:
+        holidays = list(WeekdayHoliday.objects.all()) + list(FixedHoliday.objects.all())
+    weekday_holidays = [holiday for holiday in holidays if isinstance(holiday, WeekdayHoliday)]
+    fixed_holidays = [holiday for holiday in holidays if isinstance(holiday, FixedHoliday)]
+    holidays = weekday_holidays + fixed_holidays
+    if not holidays or start > end:
+        return
+
+    weekday_months = np.array([holiday.month for holiday in weekday_holidays], dtype=np.int64)
+    weekday_days = np.array([holiday.day for holiday in weekday_holidays], dtype=np.int64)
+    weekday_weeks = np.array([holiday.week for holiday in weekday_holidays], dtype=np.int64)
+    fixed_months = np.array([holiday.date.month for holiday in fixed_holidays], dtype=np.int64)
+    fixed_days = np.array([holiday.date.day for holiday in fixed_holidays], dtype=np.int64)
+    holiday_indexes = np.arange(len(holidays))
+
+    start_date, end_date = np.datetime64(start, 'D'), np.datetime64(end, 'D')
+    carried_dates = np.array([], dtype='datetime64[D]')
+    carried_indexes = np.array([], dtype=np.int64)
+    # Weekday holidays of the year before can spill into the first year
+    for first_year in range(start.year - 1, end.year + 1, years_per_batch):
+        years = np.arange(first_year, min(first_year + years_per_batch, end.year + 1), dtype=np.int64)[:, None]
+        weekday_dates = get_weekday_dates(years, weekday_months, weekday_days, weekday_weeks)
+        fixed_dates, fixed_exists = get_fixed_dates(years, fixed_months, fixed_days)
+
+        dates = np.concatenate([carried_dates, weekday_dates.ravel(), fixed_dates[fixed_exists]])
+        indexes = np.concatenate([
+            carried_indexes,
+            np.broadcast_to(holiday_indexes[:len(weekday_holidays)], weekday_dates.shape).ravel(),
+            np.broadcast_to(holiday_indexes[len(weekday_holidays):], fixed_dates.shape)[fixed_exists],
+        ])
+        order = np.argsort(dates, kind='stable')
+        dates, indexes = dates[order], indexes[order]
+
+        # Occurrences past this batch are carried over so the next batch can yield them in order
+        next_batch_start = np.datetime64(f'{int(years[-1, 0]) + 1:04d}-01-01', 'D')
+        ready = dates < next_batch_start
+        in_range = ready & (dates >= start_date) & (dates <= end_date)
+        for holiday_date, index in zip(dates[in_range].tolist(), indexes[in_range].tolist()):
+            yield holiday_date, holidays[index]
+        carried_dates, carried_indexes = dates[~ready], indexes[~ready]
+
+class HolidayCalendarCache():
+    def __init__(self):
+        self.calendars: dict = {}
+
+    def get(self, key, get_holidays) -> HolidayCalendar:
+        calendar = self.calendars.get(key)
+        if calendar is None:
+            calendar = HolidayCalendar(get_holidays())
+            self.calendars[key] = calendar
+        return calendar
+
+    def invalidate(self, key=None):
+        if key is None:
+            self.calendars = {}
+            return
+        self.calendars.pop(key, None)
+
+HOLIDAY_CALENDARS = HolidayCalendarCache()
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.source.holiday.schedule import HOLIDAY_CALENDARS
+from apps.source.holiday.models import WeekdayHoliday, FixedHoliday
+
+
+@receiver([post_save, post_delete], sender=WeekdayHoliday)
+@receiver([post_save, post_delete], sender=FixedHoliday)
+def invalidate_holiday_calendars(sender, **kwargs):
+    HOLIDAY_CALENDARS.invalidate()
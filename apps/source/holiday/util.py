@@ -1,14 +1,31 @@
-from dateutil.relativedelta import MO, TU, WE, TH, FR, SA, SU
-
-
-def int_to_dateutil_weekday(day_int):
-    int_to_weekday = {
-        0: MO,
-        1: TU,
-        2: WE,
-        3: TH,
-        4: FR,
-        5: SA,
-        6: SU
-    }
-    return int_to_weekday[day_int]
+from calendar import monthrange
+from datetime import date, timedelta
+
+import numpy as np
+
+
+def get_weekday_date(year: int, month: int, day: int, week: int) -> date:
+    # Nth weekday counted from the start of the month, or from the end for negative weeks
+    if week >= 0:
+        first_day = date(year, month, 1)
+        return first_day + timedelta(days=(day - first_day.weekday()) % 7 + (max(week, 1) - 1) * 7)
+    last_day = date(year, month, monthrange(year, month)[1])
+    return last_day - timedelta(days=(last_day.weekday() - day) % 7 + (-week - 1) * 7)
+
+def get_weekday_dates(years: np.ndarray, months: np.ndarray, days: np.ndarray, weeks: np.ndarray) -> np.ndarray:
+    # Same rules as get_weekday_date, broadcast over arrays of years and holidays
+    month_index = (years - 1970) * 12 + (months - 1)
+    first_days = month_index.astype('datetime64[M]').astype('datetime64[D]')
+    last_days = (month_index + 1).astype('datetime64[M]').astype('datetime64[D]') - np.timedelta64(1, 'D')
+    # 1970-01-01 was a Thursday, the weekday of day 0 is 3
+    first_weekdays = (first_days.astype(np.int64) + 3) % 7
+    last_weekdays = (last_days.astype(np.int64) + 3) % 7
+    from_start = first_days + ((days - first_weekdays) % 7 + (np.maximum(weeks, 1) - 1) * 7).astype('timedelta64[D]')
+    from_end = last_days - ((last_weekdays - days) % 7 + (-weeks - 1) * 7).astype('timedelta64[D]')
+    return np.where(weeks >= 0, from_start, from_end)
+
+def get_fixed_dates(years: np.ndarray, months: np.ndarray, days: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # Returns the dates and a mask of the ones that exist, February 29th only exists on leap years
+    month_index = (years - 1970) * 12 + (months - 1)
+    dates = month_index.astype('datetime64[M]').astype('datetime64[D]') + (days - 1).astype('timedelta64[D]')
+    return dates, dates.astype('datetime64[M]') == month_index.astype('datetime64[M]')
@@ -0,0 +1,14 @@
+from django.apps import AppConfig
+
+
+class LeaderboardConfig(AppConfig):
+    dependencies = ['apps.source.community', 'apps.source.bank', 'apps.source.discord', 'apps.source.activity']
+    name = 'apps.source.leaderboard'
+
+    def ready(self):
+        from economy.event import EVENT_MANAGER
+        from . import urls
+        from .events import register_functions
+        self.urlpatterns = urls.urlpatterns
+
+        register_functions(EVENT_MANAGER)
@@ -0,0 +1,9 @@
+from economy.util import EventManager
+
+from .leaderboards import LEADERBOARDS
+
+
+def register_functions(event_manager: EventManager):
+    event_manager.source.activity.event('on_trackers_flushed')(LEADERBOARDS.record_trackers)
+    event_manager.source.activity.event('on_trackers_reset')(LEADERBOARDS.record_reset)
+    event_manager.source.bank.event('on_balances_changed')(LEADERBOARDS.record_balances)
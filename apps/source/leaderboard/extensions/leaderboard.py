@@ -0,0 +1,37 @@
+import discord
+from discord import app_commands
+from discord.ext import commands, tasks
+from asgiref.sync import sync_to_async
+
+from apps.source.leaderboard.leaderboards import LEADERBOARDS, DAILY_POINTS
+from apps.source.leaderboard.settings import LEADERBOARD_CONFIG
+from apps.source.leaderboard.util import get_top_message
+
+
+class LeaderboardCog(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.save_leaderboards.start()
+
+    async def cog_unload(self):
+        self.save_leaderboards.cancel()
+        await sync_to_async(LEADERBOARDS.save)()
+
+    @tasks.loop(seconds=LEADERBOARD_CONFIG['SAVE_INTERVAL'])
+    async def save_leaderboards(self):
+        await sync_to_async(LEADERBOARDS.save)()
+
+    @app_commands.command(name='top', description='Shows the top members of a leaderboard and your rank on it.')
+    @app_commands.describe(board='Leaderboard to show', size='Number of members to show')
+    async def top(self, interaction: discord.Interaction, board: str = DAILY_POINTS, size: app_commands.Range[int, 1, 25] = None):
+        message = await sync_to_async(get_top_message)(board, size, str(interaction.user.id))
+        await interaction.response.send_message(message)
+
+    @top.autocomplete('board')
+    async def board_autocomplete(self, interaction: discord.Interaction, current: str):
+        boards = await sync_to_async(LEADERBOARDS.get_boards)()
+        return [app_commands.Choice(name=board, value=board) for board in boards if current.lower() in board.lower()][:25]
+
+async def setup(bot: commands.Bot):
+    await sync_to_async(LEADERBOARDS.load)()
+    await bot.add_cog(LeaderboardCog(bot))
@@ -0,0 +1,163 @@
+from time import monotonic
+
+from django.db import transaction
+
+from apps.source.activity.models import VoiceActivityTracker, VoiceActivityLongTermTracker
+from apps.source.activity.settings import VOICE_CONFIG
+from apps.source.bank.cache import CURRENCY_CACHE
+from apps.source.bank.models import AccountCurrencyBalance
+from apps.source.discord.models import Member
+from apps.source.leaderboard.models import LeaderboardEntry
+from apps.source.leaderboard.ranking import Ranking
+from apps.source.leaderboard.settings import LEADERBOARD_CONFIG
+from economy.util import chunked
+from economy.versions import MODEL_VERSIONS
+
+
+DAILY_POINTS = 'daily_points'
+LIFETIME_POINTS = 'lifetime_points'
+TIME_IN_CALL = 'time_in_call'
+ACTIVITY_BOARDS = [DAILY_POINTS, LIFETIME_POINTS, TIME_IN_CALL]
+
+def get_balance_board(currency) -> str:
+    return f'balance:{currency.name}'
+
+def get_activity_scores(points_earned: float, ticks_spent_in_call: int, bases: dict = None) -> dict:
+    # Board -> (score, base), lifetime boards add today's activity to what was settled at the last reset
+    bases = bases or {}
+    return {
+        DAILY_POINTS: (points_earned, 0),
+        LIFETIME_POINTS: (bases.get(LIFETIME_POINTS, 0) + points_earned, bases.get(LIFETIME_POINTS, 0)),
+        TIME_IN_CALL: (bases.get(TIME_IN_CALL, 0) + ticks_spent_in_call * VOICE_CONFIG['TICK_RATE'], bases.get(TIME_IN_CALL, 0)),
+    }
+
+class Leaderboards():
+    def __init__(self):
+        self.rankings: dict[str, Ranking] = {}
+        self.bases: dict[str, dict[int, float]] = {}
+        self.citizen_ids: dict[str, int] = {}
+        # Daily activity per member id, written by save so tick flushes stay free of extra queries
+        self.pending: dict[str, tuple[float, int]] = {}
+        self.version = None
+        self.loaded_at = None
+
+    def clear(self):
+        self.rankings, self.bases, self.citizen_ids, self.pending = {}, {}, {}, {}
+        self.version = None
+        self.loaded_at = None
+
+    def load(self):
+        self.version = MODEL_VERSIONS.get(LeaderboardEntry)
+        self.loaded_at = monotonic()
+        scores, bases = {}, {}
+        for board, citizen_id, score, base in LeaderboardEntry.objects.values_list('board', 'citizen_id', 'score', 'base').iterator():
+            scores.setdefault(board, {})[citizen_id] = score
+            bases.setdefault(board, {})[citizen_id] = base
+        # Replaced as a whole, readers see either the old or the new rankings
+        self.rankings = {board: Ranking(board_scores) for board, board_scores in scores.items()}
+        self.bases = bases
+
+    def refresh(self):
+        # Entries written by other processes, like deposits made through the API, change the version when the cache is shared
+        # The reload interval bounds how long they go unnoticed when it is not
+        if self.loaded_at is None or monotonic() - self.loaded_at > LEADERBOARD_CONFIG['RELOAD_INTERVAL'] or MODEL_VERSIONS.get(LeaderboardEntry) != self.version:
+            self.load()
+
+    def get_boards(self) -> list[str]:
+        self.refresh()
+        balance_boards = {get_balance_board(currency) for currency in CURRENCY_CACHE.get_currencies()[0].values()}
+        return ACTIVITY_BOARDS + sorted(balance_boards | {board for board in self.rankings if board not in ACTIVITY_BOARDS})
+
+    def get_ranking(self, board: str) -> Ranking:
+        self.refresh()
+        return self.rankings.get(board, Ranking())
+
+    def get_citizen_ids(self, member_ids: list[str]) -> dict[str, int]:
+        # A member keeps the citizen it was created with, so known ids never go stale
+        missing = [member_id for member_id in member_ids if member_id not in self.citizen_ids]
+        for batch in chunked(missing, LEADERBOARD_CONFIG['BATCH_SIZE']):
+            self.citizen_ids.update(Member.objects.filter(id__in=batch).values_list('id', 'citizen_id'))
+        return {member_id: self.citizen_ids[member_id] for member_id in member_ids if member_id in self.citizen_ids}
+
+    def get_bases(self, citizen_id: int) -> dict:
+        return {board: self.bases.get(board, {}).get(citizen_id, 0) for board in (LIFETIME_POINTS, TIME_IN_CALL)}
+
+    def write(self, scores: dict[tuple[str, int], tuple[float, float]]):
+        # (board, citizen id) -> (score, base)
+        if not scores:
+            return
+        for (board, citizen_id), (score, base) in scores.items():
+            self.rankings.setdefault(board, Ranking()).update(citizen_id, score)
+            self.bases.setdefault(board, {})[citizen_id] = base
+        LeaderboardEntry.objects.bulk_create(
+            [LeaderboardEntry(board=board, citizen_id=citizen_id, score=score, base=base) for (board, citizen_id), (score, base) in scores.items()],
+            batch_size=LEADERBOARD_CONFIG['BATCH_SIZE'],
+            update_conflicts=True,
+            unique_fields=['board', 'citizen'],
+            update_fields=['score', 'base'],
+        )
+        # Our own writes are already in memory, only other processes' writes should cause a reload
+        self.version = MODEL_VERSIONS.bump(LeaderboardEntry, force=True)[0]
+
+    def record_trackers(self, trackers: list[VoiceActivityTracker]):
+        for tracker in trackers:
+            self.pending[tracker.member_id] = (tracker.points_earned, tracker.ticks_spent_in_call)
+
+    def save(self):
+        pending, self.pending = self.pending, {}
+        if not pending:
+            return 0
+        try:
+            self.refresh()
+            scores = {}
+            for member_id, citizen_id in self.get_citizen_ids(list(pending)).items():
+                for board, score in get_activity_scores(*pending[member_id], self.get_bases(citizen_id)).items():
+                    scores[(board, citizen_id)] = score
+            self.write(scores)
+        except Exception:
+            # Scores are absolute, anything recorded since is newer and wins
+            self.pending = {**pending, **self.pending}
+            raise
+        return len(pending)
+
+    def record_reset(self, trackers: list[VoiceActivityTracker], long_term_trackers: dict[str, VoiceActivityLongTermTracker]):
+        # Long term trackers already hold today's activity, they become the new lifetime bases
+        self.refresh()
+        scores = {}
+        for member_id, citizen_id in self.get_citizen_ids([tracker.member_id for tracker in trackers]).items():
+            self.pending.pop(member_id, None)
+            long_term_tracker = long_term_trackers.get(member_id)
+            bases = {} if long_term_tracker is None else {LIFETIME_POINTS: long_term_tracker.points_earned, TIME_IN_CALL: long_term_tracker.time_spent_in_call}
+            for board, score in get_activity_scores(0, 0, bases).items():
+                scores[(board, citizen_id)] = score
+        self.write(scores)
+
+    def record_balances(self, balance_ids: list[int]):
+        self.refresh()
+        scores = {}
+        for batch in chunked(list(balance_ids), LEADERBOARD_CONFIG['BATCH_SIZE']):
+            for balance in AccountCurrencyBalance.objects.filter(pk__in=batch, account__owner__isnull=False).select_related('account', 'currency'):
+                scores[(get_balance_board(balance.currency), balance.account.owner_id)] = (balance.balance, 0)
+        self.write(scores)
+
+    def rebuild(self):
+        # Full scan of the source tables, only needed once when the leaderboards are first set up
+        with transaction.atomic():
+            LeaderboardEntry.objects.all().delete()
+            self.clear()
+            long_term_trackers = {tracker.member_id: tracker for tracker in VoiceActivityLongTermTracker.objects.all()}
+            daily_activity = {
+                member_id: (points_earned, ticks_spent_in_call)
+                for member_id, points_earned, ticks_spent_in_call in VoiceActivityTracker.objects.values_list('member_id', 'points_earned', 'ticks_spent_in_call')
+            }
+            scores = {}
+            for member_id, citizen_id in self.get_citizen_ids(list(long_term_trackers.keys() | daily_activity.keys())).items():
+                long_term_tracker = long_term_trackers.get(member_id)
+                bases = {} if long_term_tracker is None else {LIFETIME_POINTS: long_term_tracker.points_earned, TIME_IN_CALL: long_term_tracker.time_spent_in_call}
+                for board, score in get_activity_scores(*daily_activity.get(member_id, (0, 0)), bases).items():
+                    scores[(board, citizen_id)] = score
+            self.write(scores)
+            self.record_balances(AccountCurrencyBalance.objects.values_list('pk', flat=True))
+        return LeaderboardEntry.objects.count()
+
+LEADERBOARDS = Leaderboards()
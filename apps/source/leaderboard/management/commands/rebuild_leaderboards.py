@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.source.leaderboard.leaderboards import LEADERBOARDS
+
+
+class Command(BaseCommand):
+    help = "Rebuilds every leaderboard from the voice trackers and balances"
+
+    def handle(self, *args, **options):
+        entries = LEADERBOARDS.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt leaderboards with {entries} entr{"y" if entries == 1 else "ies"}'))
@@ -0,0 +1,20 @@
+from django.db import models
+
+from apps.source.community.models import Citizen
+
+
+class LeaderboardEntry(models.Model):
+    board = models.CharField(max_length=80, help_text="daily_points, lifetime_points, time_in_call or balance:<currency name>")
+    citizen = models.ForeignKey(Citizen, on_delete=models.CASCADE, related_name='leaderboard_entries')
+    score = models.FloatField(default=0)
+    base = models.FloatField(default=0, help_text="Part of the score settled by the last daily reset, lifetime boards only")
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['board', 'citizen'], name='unique_leaderboard_citizen')]
+        indexes = [models.Index(fields=['board', '-score'], name='leaderboard_board_score')]
+
+    def __str__(self):
+        return f'{self.board} - {self.citizen}: {self.score}'
+
+    def __repr__(self):
+        return f'LeaderboardEntry({self.board} - {self.citizen}: {self.score})'
@@ -0,0 +1,42 @@
+from bisect import bisect_left, insort
+
+
+class Ranking():
+    def __init__(self, scores: dict[int, float] = None):
+        # (-score, key) in ascending order, the highest score first and ties broken by key
+        self.scores: dict[int, float] = dict(scores or {})
+        self.entries: list[tuple[float, int]] = sorted((-score, key) for key, score in self.scores.items())
+
+    def __len__(self):
+        return len(self.scores)
+
+    def update(self, key: int, score: float):
+        previous_score = self.scores.get(key)
+        if previous_score == score:
+            return
+        if previous_score is not None:
+            del self.entries[bisect_left(self.entries, (-previous_score, key))]
+        self.scores[key] = score
+        insort(self.entries, (-score, key))
+
+    def remove(self, key: int):
+        score = self.scores.pop(key, None)
+        if score is not None:
+            del self.entries[bisect_left(self.entries, (-score, key))]
+
+    def get_score(self, key: int):
+        return self.scores.get(key)
+
+    def get_rank(self, key: int):
+        score = self.scores.get(key)
+        if score is None:
+            return None
+        # Tied scores share the rank of the first of them
+        return bisect_left(self.entries, (-score,)) + 1
+
+    def get_top(self, size: int, offset: int = 0) -> list[tuple[int, int, float]]:
+        top = []
+        for negative_score, key in self.entries[offset:offset + size]:
+            rank = top[-1][0] if top and top[-1][2] == -negative_score else bisect_left(self.entries, (negative_score,)) + 1
+            top.append((rank, key, -negative_score))
+        return top
@@ -0,0 +1,7 @@
+LEADERBOARD_CONFIG = {
+    'DEFAULT_SIZE': 10,     # Entries shown by /top and the leaderboard API when no size is given. Default: 10
+    'MAX_SIZE': 100,        # Most entries a single leaderboard read can return. Default: 100
+    'SAVE_INTERVAL': 30,    # Time in seconds between writes of pending voice scores to the database. Default: 30 seconds
+    'BATCH_SIZE': 200,      # Entries written per query. Default: 200
+    'RELOAD_INTERVAL': 60,  # Time in seconds before rankings are reloaded from the database to pick up other processes' writes. Default: 60 seconds
+}
@@ -0,0 +1,9 @@
+from rest_framework import routers
+
+from . import views
+
+
+router = routers.SimpleRouter()
+router.register(r'', views.LeaderboardViewSet, basename='leaderboard')
+
+urlpatterns = router.urls
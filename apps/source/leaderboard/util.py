@@ -0,0 +1,55 @@
+from apps.source.community.models import Citizen
+from apps.source.leaderboard.leaderboards import LEADERBOARDS, DAILY_POINTS, LIFETIME_POINTS, TIME_IN_CALL
+from apps.source.leaderboard.settings import LEADERBOARD_CONFIG
+
+
+BOARD_TITLES = {
+    DAILY_POINTS: 'Daily points',
+    LIFETIME_POINTS: 'Lifetime points',
+    TIME_IN_CALL: 'Time in call',
+}
+
+def get_board_title(board: str) -> str:
+    if board.startswith('balance:'):
+        return f'Richest in {board.split(":", 1)[1]}'
+    return BOARD_TITLES.get(board, board)
+
+def format_score(board: str, score: float) -> str:
+    if board == TIME_IN_CALL:
+        hours, seconds = divmod(int(score), 3600)
+        return f'{hours}h {seconds // 60}m'
+    return f'{score:g}'
+
+def get_leaderboard_size(size: int = None) -> int:
+    return max(1, min(size or LEADERBOARD_CONFIG['DEFAULT_SIZE'], LEADERBOARD_CONFIG['MAX_SIZE']))
+
+def get_top_entries(board: str, size: int = None, offset: int = 0) -> list[dict]:
+    if board not in LEADERBOARDS.get_boards():
+        raise LookupError(f"Leaderboard '{board}' does not exist.")
+    top = LEADERBOARDS.get_ranking(board).get_top(get_leaderboard_size(size), offset)
+    # Only the names of the entries shown are looked up
+    names = dict(Citizen.objects.filter(id__in=[citizen_id for _, citizen_id, _ in top]).values_list('id', 'name'))
+    return [{'rank': rank, 'citizen': citizen_id, 'name': names.get(citizen_id), 'score': score} for rank, citizen_id, score in top]
+
+def get_member_entry(board: str, member_id: str) -> dict:
+    citizen_id = LEADERBOARDS.get_citizen_ids([member_id]).get(member_id)
+    ranking = LEADERBOARDS.get_ranking(board)
+    if citizen_id is None or ranking.get_rank(citizen_id) is None:
+        return None
+    return {'rank': ranking.get_rank(citizen_id), 'citizen': citizen_id, 'score': ranking.get_score(citizen_id), 'total': len(ranking)}
+
+def get_top_message(board: str, size: int = None, member_id: str = None) -> str:
+    try:
+        entries = get_top_entries(board, size)
+    except LookupError as error:
+        return str(error)
+
+    lines = [f'**{get_board_title(board)}**']
+    lines += [f'`#{entry["rank"]}` {entry["name"]} - {format_score(board, entry["score"])}' for entry in entries]
+    if not entries:
+        lines.append('Nobody is on this leaderboard yet.')
+
+    member_entry = get_member_entry(board, member_id) if member_id is not None else None
+    if member_entry is not None:
+        lines.append(f'You are `#{member_entry["rank"]}` of {member_entry["total"]} with {format_score(board, member_entry["score"])}.')
+    return '\n'.join(lines)
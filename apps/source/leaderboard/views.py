@@ -0,0 +1,38 @@
+from rest_framework import viewsets
+from rest_framework import permissions
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
+
+from .leaderboards import LEADERBOARDS
+from .util import get_top_entries, get_member_entry
+
+
+# ViewSet for /apps/source/leaderboard endpoint
+class LeaderboardViewSet(viewsets.ViewSet):
+    permission_classes = [permissions.IsAuthenticated]
+    lookup_value_regex = '[^/]+'
+
+    def list(self, request):
+        response = {}
+        for board in LEADERBOARDS.get_boards():
+            response[board] = request.build_absolute_uri(f'{board}/')
+
+        return Response(response)
+
+    # ?size=, ?offset= and ?member=<discord member id> to include that member's rank
+    def retrieve(self, request, pk=None):
+        try:
+            size = int(request.query_params.get('size', 0)) or None
+            offset = max(int(request.query_params.get('offset', 0)), 0)
+        except ValueError:
+            raise ValidationError({'size': ['size and offset must be integers']})
+
+        try:
+            results = get_top_entries(pk, size, offset)
+        except LookupError as error:
+            raise NotFound(str(error))
+
+        response = {'board': pk, 'results': results}
+        if 'member' in request.query_params:
+            response['member'] = get_member_entry(pk, request.query_params['member'])
+        return Response(response)
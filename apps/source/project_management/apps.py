@@ -2,3 +2,7 @@ from django.apps import AppConfig
 
 class ProjectManagementConfig(AppConfig):
     name = 'apps.source.project_management'
+
+    def ready(self):
+        from . import signals
+        signals.connect_version_signals()
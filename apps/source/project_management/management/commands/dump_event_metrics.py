@@ -0,0 +1,44 @@
+import json
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from economy.metrics import EVENT_METRICS
+
+
+class Command(BaseCommand):
+    help = "Dumps event bus metrics, slowest events first"
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument('--path', help='Metrics snapshot file to read instead of EVENTS["METRICS_PATH"]')
+        parser.add_argument('--json', action='store_true', help='Prints the raw snapshot as JSON')
+
+    def format_latency(self, metrics):
+        latencies = []
+        for name in ('p50', 'p95', 'p99'):
+            latency = metrics[f'{name}_ms']
+            latencies.append(f'{name}=-' if latency is None else f'{name}={latency:.2f}ms')
+        return ' '.join(latencies)
+
+    def handle(self, *args, **options):
+        snapshot = EVENT_METRICS.read(options['path'])
+        if options['json']:
+            self.stdout.write(json.dumps(snapshot, indent=4))
+            return
+
+        events = snapshot['events']
+        if not events:
+            self.stdout.write(self.style.WARNING('No event metrics recorded, is EVENTS["METRICS"] enabled?'))
+            return
+
+        self.stdout.write(self.style.SUCCESS(f'Event metrics as of {datetime.fromtimestamp(snapshot["saved_at"]):%Y-%m-%d %H:%M:%S}'))
+        for event_name, event in sorted(events.items(), key=lambda item: item[1]['p99_ms'] or 0, reverse=True):
+            self.stdout.write(
+                f'{event_name}: triggers={event["triggers"]} handler_calls={event["handler_calls"]} '
+                f'errors={event["errors"]} {self.format_latency(event)}'
+            )
+            for handler_name, handler in sorted(event['handlers'].items(), key=lambda item: item[1]['p99_ms'] or 0, reverse=True):
+                self.stdout.write(f'    {handler_name}: calls={handler["calls"]} errors={handler["errors"]} {self.format_latency(handler)}')
+
+if __name__ == "__main__":
+    Command().handle()
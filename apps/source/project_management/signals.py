@@ -0,0 +1,53 @@
+from django.apps import apps
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import models
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from economy.versions import MODEL_VERSIONS
+
+
+# (signal, sender, dispatch_uid) of every receiver connected for the versioned models
+VERSION_RECEIVERS = []
+
+def bump_model_version(sender, **kwargs):
+    MODEL_VERSIONS.bump(sender)
+
+def bump_relation_versions(sender, instance, action, model, **kwargs):
+    if not action.startswith('post_'):
+        return
+    # Both sides serialize the relation, bump only keeps the versioned ones
+    MODEL_VERSIONS.bump(sender, type(instance), model)
+
+def get_through_models(model: type[models.Model]):
+    # Forward and reverse many to many relations, either side may change the relation
+    for field in model._meta.get_fields():
+        if isinstance(field, models.ManyToManyField):
+            yield field.remote_field.through
+        elif isinstance(field, models.ManyToManyRel):
+            yield field.through
+
+def connect_version_signals():
+    disconnect_version_signals()
+    # Receivers are connected per model, a receiver without a sender would disable fast deletes of every model
+    for label in settings.ITEM_API['VERSIONED_MODELS']:
+        model = apps.get_model(label)
+        receivers = [
+            (post_save, model, bump_model_version),
+            (post_delete, model, bump_model_version),
+        ] + [(m2m_changed, through, bump_relation_versions) for through in get_through_models(model)]
+        for signal, sender, handler in receivers:
+            dispatch_uid = f'{handler.__name__}:{sender._meta.label_lower}'
+            signal.connect(handler, sender=sender, dispatch_uid=dispatch_uid)
+            VERSION_RECEIVERS.append((signal, sender, dispatch_uid))
+
+def disconnect_version_signals():
+    for signal, sender, dispatch_uid in VERSION_RECEIVERS:
+        signal.disconnect(sender=sender, dispatch_uid=dispatch_uid)
+    VERSION_RECEIVERS.clear()
+
+@receiver(setting_changed)
+def reconnect_version_signals(setting, **kwargs):
+    if setting == 'ITEM_API':
+        connect_version_signals()
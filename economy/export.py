@@ -0,0 +1,37 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+EXPORT_CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+# File-like object for csv.writer that hands back each row instead of buffering it
+class Echo():
+    def write(self, value):
+        return value
+
+def get_csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, cls=DjangoJSONEncoder)
+    return value
+
+def iter_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+def iter_csv(rows, fields: list[str]):
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([get_csv_value(row[field]) for field in fields])
+
+def iter_export(rows, fields: list[str], output: str):
+    if output == 'csv':
+        return iter_csv(rows, fields)
+    return iter_ndjson(rows)
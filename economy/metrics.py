@@ -0,0 +1,124 @@
+import json
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import partial
+from pathlib import Path
+
+from django.conf import settings
+
+
+def percentile(sorted_samples: list, fraction: float):
+    if not sorted_samples:
+        return None
+    index = min(len(sorted_samples) - 1, max(0, math.ceil(fraction * len(sorted_samples)) - 1))
+    return sorted_samples[index]
+
+def summarize_latency(samples: deque) -> dict:
+    sorted_samples = sorted(samples)
+    return {
+        'p50_ms': percentile(sorted_samples, 0.50),
+        'p95_ms': percentile(sorted_samples, 0.95),
+        'p99_ms': percentile(sorted_samples, 0.99),
+    }
+
+class EventMetrics():
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events = {}
+
+    @property
+    def enabled(self):
+        return settings.EVENTS['METRICS']
+
+    def get_event(self, event_name: str) -> dict:
+        if event_name not in self.events:
+            self.events[event_name] = {
+                'triggers': 0,
+                'handler_calls': 0,
+                'errors': 0,
+                'latency': deque(maxlen=settings.EVENTS['METRICS_SAMPLE_SIZE']),
+                'handlers': {},
+            }
+        return self.events[event_name]
+
+    def record_trigger(self, event_name: str):
+        with self.lock:
+            self.get_event(event_name)['triggers'] += 1
+
+    def record_handler(self, event_name: str, handler_name: str, seconds: float, failed: bool = False):
+        milliseconds = seconds * 1000
+        with self.lock:
+            event = self.get_event(event_name)
+            if handler_name not in event['handlers']:
+                event['handlers'][handler_name] = {
+                    'calls': 0,
+                    'errors': 0,
+                    'latency': deque(maxlen=settings.EVENTS['METRICS_SAMPLE_SIZE']),
+                }
+            handler = event['handlers'][handler_name]
+            for metrics in (event, handler):
+                metrics['latency'].append(milliseconds)
+                if failed:
+                    metrics['errors'] += 1
+            event['handler_calls'] += 1
+            handler['calls'] += 1
+
+    @contextmanager
+    def measure(self, event_name: str, handler_name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.record_handler(event_name, handler_name, time.perf_counter() - start, failed=True)
+            raise
+        self.record_handler(event_name, handler_name, time.perf_counter() - start)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                event_name: {
+                    'triggers': event['triggers'],
+                    'handler_calls': event['handler_calls'],
+                    'errors': event['errors'],
+                    **summarize_latency(event['latency']),
+                    'handlers': {
+                        handler_name: {
+                            'calls': handler['calls'],
+                            'errors': handler['errors'],
+                            **summarize_latency(handler['latency']),
+                        }
+                        for handler_name, handler in event['handlers'].items()
+                    },
+                }
+                for event_name, event in self.events.items()
+            }
+
+    def reset(self):
+        with self.lock:
+            self.events = {}
+
+    def save(self, path=None):
+        path = Path(path or settings.EVENTS['METRICS_PATH'])
+        # Written to a temporary file first so readers never see a partial snapshot
+        temporary_path = path.with_suffix(path.suffix + '.tmp')
+        temporary_path.write_text(json.dumps({'saved_at': time.time(), 'events': self.snapshot()}))
+        temporary_path.replace(path)
+
+    def read(self, path=None) -> dict:
+        path = path or settings.EVENTS['METRICS_PATH']
+        if path and Path(path).exists():
+            return json.loads(Path(path).read_text())
+        return {'saved_at': time.time(), 'events': self.snapshot()}
+
+def get_handler_name(handler) -> str:
+    # Partials and callable objects are named after the function or class behind them
+    while isinstance(handler, partial):
+        handler = handler.func
+    if not hasattr(handler, '__qualname__'):
+        handler = type(handler)
+    return f'{handler.__module__}.{handler.__qualname__}'
+
+EVENT_METRICS = EventMetrics()
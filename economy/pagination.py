@@ -0,0 +1,13 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+# Keyset pagination on the primary key, every page costs the same no matter how deep it is
+class ItemCursorPagination(CursorPagination):
+    ordering = 'pk'
+    page_size_query_param = 'page_size'
+
+    def get_page_size(self, request):
+        self.page_size = settings.ITEM_API['PAGE_SIZE']
+        self.max_page_size = settings.ITEM_API['MAX_PAGE_SIZE']
+        return super().get_page_size(request)
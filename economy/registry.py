@@ -0,0 +1,68 @@
+from typing import Callable
+
+from django.apps import apps
+from django.db import models
+
+from .serializers import DynamicFieldsModelSerializer, get_model_serializer_class, get_expandable_relations, get_expanded_serializer_fields
+
+
+# Models, serializer classes and querysets served by ItemViewSet, built once per model instead of on every request
+class ItemRegistry():
+    def __init__(self):
+        self.models: dict[tuple[str, str], type[models.Model]] = {}
+        self.relations: dict[type[models.Model], dict] = {}
+        self.serializer_classes: dict[tuple[type[models.Model], tuple[str, ...]], type] = {}
+        # Per model overrides, for example read optimized serializers or querysets with extra joins
+        self.serializer_overrides: dict[type[models.Model], type] = {}
+        self.queryset_factories: dict[type[models.Model], Callable] = {}
+
+    def register(self, model: type[models.Model], serializer_class: type = None, queryset: Callable = None):
+        if serializer_class is not None:
+            self.serializer_overrides[model] = serializer_class
+        if queryset is not None:
+            self.queryset_factories[model] = queryset
+        self.serializer_classes = {key: value for key, value in self.serializer_classes.items() if key[0] is not model}
+
+    def get_model(self, app_label: str, model_name: str) -> type[models.Model]:
+        key = (app_label, model_name.lower())
+        model = self.models.get(key)
+        if model is None:
+            model = apps.get_app_config(app_label).get_model(model_name)
+            self.models[key] = model
+        return model
+
+    def get_relations(self, model: type[models.Model]) -> dict:
+        relations = self.relations.get(model)
+        if relations is None:
+            relations = get_expandable_relations(model)
+            self.relations[model] = relations
+        return relations
+
+    def get_queryset(self, model: type[models.Model]):
+        queryset_factory = self.queryset_factories.get(model)
+        return queryset_factory() if queryset_factory is not None else model.objects.all()
+
+    def get_serializer_class(self, model: type[models.Model], expand: list[str] = None):
+        key = (model, tuple(expand or ()))
+        serializer_class = self.serializer_classes.get(key)
+        if serializer_class is not None:
+            return serializer_class
+
+        # Unknown relations raise before anything is memoized
+        expanded_fields = get_expanded_serializer_fields(model, list(key[1]), self.get_relations(model))
+        override = self.serializer_overrides.get(model)
+        if override is None:
+            serializer_class = get_model_serializer_class(model, DynamicFieldsModelSerializer, expanded_fields)
+        else:
+            # Overrides keep their own Meta and fields, projection and expansion are layered on top
+            bases = (override,) if issubclass(override, DynamicFieldsModelSerializer) else (DynamicFieldsModelSerializer, override)
+            serializer_class = type(override.__name__, bases, expanded_fields)
+        self.serializer_classes[key] = serializer_class
+        return serializer_class
+
+    def clear(self):
+        self.models = {}
+        self.relations = {}
+        self.serializer_classes = {}
+
+ITEM_REGISTRY = ItemRegistry()
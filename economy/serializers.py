@@ -0,0 +1,51 @@
+from django.db import models
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+
+# ModelSerializer that only keeps the fields it is constructed with, for ?fields= projections
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is None:
+            return
+        unknown_fields = [field_name for field_name in fields if field_name not in self.fields]
+        if unknown_fields:
+            raise ValidationError({'fields': [f"Unknown field '{field_name}'" for field_name in unknown_fields]})
+        for field_name in set(self.fields) - set(fields):
+            self.fields.pop(field_name)
+
+def get_model_serializer_class(model: type[models.Model], base=serializers.ModelSerializer, attrs: dict = None):
+    class Meta:
+        pass
+    Meta.model = model
+    Meta.fields = '__all__'
+    return type(model.__name__ + 'Serializer', (base,), {'Meta': Meta, **(attrs or {})})
+
+def get_expandable_relations(model: type[models.Model]) -> dict:
+    # Name used in ?expand= mapped to (related model, is to-many, can be joined with select_related)
+    relations = {}
+    for field in model._meta.get_fields():
+        if not field.is_relation or field.related_model is None:
+            continue
+        if field.concrete:
+            relations[field.name] = (field.related_model, field.many_to_many, not field.many_to_many)
+        else:
+            relations[field.get_accessor_name()] = (field.related_model, not field.one_to_one, field.one_to_one)
+    return relations
+
+def validate_expand(model: type[models.Model], expand: list[str], relations: dict = None):
+    relations = get_expandable_relations(model) if relations is None else relations
+    unknown_relations = [name for name in expand if name not in relations]
+    if unknown_relations:
+        raise ValidationError({'expand': [f"Unknown relation '{name}'" for name in unknown_relations]})
+    return relations
+
+def get_expanded_serializer_fields(model: type[models.Model], expand: list[str], relations: dict = None) -> dict:
+    relations = validate_expand(model, expand, relations)
+    expanded_fields = {}
+    for name in expand:
+        related_model, many, _ = relations[name]
+        serializer_class = get_model_serializer_class(related_model)
+        expanded_fields[name] = serializer_class(many=many, read_only=True, allow_null=not many)
+    return expanded_fields
@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     'apps.source.discord',
     'apps.source.holiday',
     'apps.source.activity',
+    'apps.source.leaderboard',
 
     # Django
     'django.contrib.admin',
@@ -137,6 +138,14 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static/')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Local to each process by default, a cache shared by the bot and API processes is needed before ITEM_API['VERSIONED_MODELS'] is set
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+
 REST_FRAMEWORK = {
     # Use Django's standard `django.contrib.auth` permissions,
     # or allow read-only access for unauthenticated users.
@@ -146,3 +155,31 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10
 }
+
+EVENTS = {
+    # Threads shared by synchronous handlers when events are dispatched asynchronously
+    'MAX_WORKERS': 8,
+    # Seconds a single handler is waited for. A sync handler that times out keeps its thread until it returns
+    'HANDLER_TIMEOUT': 10,
+    # Record trigger counts, handler latency and errors per event
+    'METRICS': False,
+    # Latest handler latencies kept per event and handler for percentiles
+    'METRICS_SAMPLE_SIZE': 1024,
+    # File the bot process writes its metrics to so the API and commands can read them
+    'METRICS_PATH': None,
+    # Seconds between metric snapshot writes
+    'METRICS_SAVE_INTERVAL': 60,
+}
+
+ITEM_API = {
+    # Rows per page of /api/apps/{domain}/{app_label}/{model_name} listings
+    'PAGE_SIZE': 100,
+    # Largest page a client may ask for with ?page_size=
+    'MAX_PAGE_SIZE': 1000,
+    # Rows fetched from the database at a time by the streaming export
+    'EXPORT_CHUNK_SIZE': 2000,
+    # Cache holding per model versions for item list ETags
+    'VERSION_CACHE': 'default',
+    # Models whose item lists are served with ETags, as 'app_label.model_name'. Every write to them updates their version
+    'VERSIONED_MODELS': [],
+}
@@ -1,12 +1,13 @@
 from django.contrib import admin
 from django.urls import include, path
 from rest_framework import routers
-from .views import DomainViewSet, AppViewSet, ModelViewSet, ItemViewSet
+from .views import DomainViewSet, AppViewSet, ModelViewSet, ItemViewSet, EventMetricsViewSet
 from .util import get_installed_app_urls
 
 
 router = routers.DefaultRouter()
 router.register(r'apps', DomainViewSet, basename='domains')
+router.register(r'events', EventMetricsViewSet, basename='events')
 router.register(r'apps/(?P<domain>[^/.]+)', AppViewSet, basename='domain-apps')
 router.register(r'apps/(?P<domain>[^/.]+)/(?P<app_label>[^/.]+)', ModelViewSet, basename='app-models')
 router.register(r'apps/(?P<domain>[^/.]+)/(?P<app_label>[^/.]+)/(?P<model_name>[^/.]+)', ItemViewSet, basename='model-items')
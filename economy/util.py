@@ -1,6 +1,29 @@
+import asyncio
+import inspect
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
 from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections, transaction
 from django.urls import path, include
 
+from .metrics import EVENT_METRICS, get_handler_name
+from .versions import MODEL_VERSIONS
+
+
+logger = logging.getLogger(__name__)
+
+EVENT_EXECUTOR: ThreadPoolExecutor = None
+
+def get_event_executor() -> ThreadPoolExecutor:
+    global EVENT_EXECUTOR
+    if EVENT_EXECUTOR is None:
+        EVENT_EXECUTOR = ThreadPoolExecutor(max_workers=settings.EVENTS['MAX_WORKERS'], thread_name_prefix='event')
+    return EVENT_EXECUTOR
+
 class EventManager:
     def __init__(self):
         self.installed_apps = get_installed_apps_by_domain()
@@ -13,12 +36,17 @@ class DomainEventManager:
         for app_label in self.installed_apps:
             app_config = apps.get_app_config(app_label)
             app_event_manager = getattr(app_config, 'event_manager', AppEventManager())
+            app_event_manager.name = f'{domain}.{app_label}'
             setattr(self, app_label, app_event_manager)
 
 class AppEventManager():
-    def __init__(self):
+    def __init__(self, name=None):
+        self.name = name
         self.event_handlers = {}
 
+    def get_metric_name(self, event_name):
+        return event_name if self.name is None else f'{self.name}.{event_name}'
+
     def register_event(self, event_name):
         if event_name not in self.event_handlers:
             self.event_handlers[event_name] = []
@@ -38,11 +66,78 @@ class AppEventManager():
             if handler_function in handlers:
                 handlers.remove(handler_function)
 
+    def has_subscribers(self, event_name):
+        return bool(self.event_handlers.get(event_name))
+
     def trigger(self, event_name, *args, **kwargs):
         if event_name in self.event_handlers:
             handlers = self.event_handlers[event_name]
+            if not EVENT_METRICS.enabled:
+                for handler in handlers:
+                    handler(*args, **kwargs)
+                return
+
+            metric_name = self.get_metric_name(event_name)
+            EVENT_METRICS.record_trigger(metric_name)
             for handler in handlers:
-                handler(*args, **kwargs)
+                with EVENT_METRICS.measure(metric_name, get_handler_name(handler)):
+                    handler(*args, **kwargs)
+
+    def trigger_on_commit(self, event_name, *args, **kwargs):
+        # Handlers run once the write is committed, they only see committed data and cannot roll it back
+        if self.has_subscribers(event_name):
+            transaction.on_commit(partial(self.trigger, event_name, *args, **kwargs), robust=True)
+
+    async def trigger_async(self, event_name, *args, **kwargs):
+        handlers = list(self.event_handlers.get(event_name, []))
+        if not handlers:
+            return []
+        if EVENT_METRICS.enabled:
+            EVENT_METRICS.record_trigger(self.get_metric_name(event_name))
+        return await asyncio.gather(*(self.run_handler(event_name, handler, *args, **kwargs) for handler in handlers))
+
+    async def run_handler(self, event_name, handler, *args, **kwargs):
+        # Handlers are isolated from each other, a failing or slow handler only loses its own result
+        if inspect.iscoroutinefunction(handler):
+            awaitable = handler(*args, **kwargs)
+        else:
+            awaitable = asyncio.get_running_loop().run_in_executor(get_event_executor(), partial(run_sync_handler, handler, *args, **kwargs))
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = await asyncio.wait_for(awaitable, settings.EVENTS['HANDLER_TIMEOUT'])
+            failed = False
+            return result
+        except asyncio.TimeoutError:
+            logger.warning('Handler %s for %s timed out', get_handler_name(handler), event_name)
+        except Exception:
+            logger.exception('Handler %s for %s failed', get_handler_name(handler), event_name)
+        finally:
+            if EVENT_METRICS.enabled:
+                EVENT_METRICS.record_handler(self.get_metric_name(event_name), get_handler_name(handler), time.perf_counter() - start, failed)
+        return None
+
+def run_sync_handler(handler, *args, **kwargs):
+    # Executor threads never see a request cycle, stale connections are closed around every handler
+    close_old_connections()
+    try:
+        return handler(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+def chunked(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def get_or_create_in_bulk(model, key_field: str, keys: list, defaults=lambda key: {}, **filters):
+    existing = {getattr(obj, key_field): obj for obj in model.objects.filter(**{f'{key_field}__in': keys}, **filters)}
+    missing = [key for key in dict.fromkeys(keys) if key not in existing]
+    if missing:
+        # Rows created concurrently are left alone and read back below with the rest
+        model.objects.bulk_create([model(**{key_field: key}, **filters, **defaults(key)) for key in missing], ignore_conflicts=True)
+        MODEL_VERSIONS.bump(model)
+        existing.update({getattr(obj, key_field): obj for obj in model.objects.filter(**{f'{key_field}__in': missing}, **filters)})
+    return existing
 
 def get_installed_apps_by_domain() -> dict:
     app_configs = apps.get_app_configs()
@@ -0,0 +1,43 @@
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import models, transaction
+
+
+def get_etag(*parts) -> str:
+    return hashlib.sha1('\n'.join(str(part) for part in parts).encode()).hexdigest()
+
+def is_versioned_model(model: type[models.Model]) -> bool:
+    return model._meta.label_lower in settings.ITEM_API['VERSIONED_MODELS']
+
+# Version tokens per model, changed on every write so item lists can be revalidated without touching the database
+class ModelVersions():
+    def get_cache(self):
+        return caches[settings.ITEM_API['VERSION_CACHE']]
+
+    def get_key(self, model: type[models.Model]) -> str:
+        return f'item-version:{model._meta.label_lower}'
+
+    def get(self, model: type[models.Model]) -> str:
+        cache = self.get_cache()
+        key = self.get_key(model)
+        # A random token instead of a counter, concurrent bumps from several processes never collide
+        cache.add(key, uuid.uuid4().hex, None)
+        return cache.get(key)
+
+    def get_many(self, models: list[type[models.Model]]) -> list[str]:
+        return [self.get(model) for model in models]
+
+    def bump(self, *models: type[models.Model], force=False):
+        # Writes to models without ETags cost nothing, force is for callers using the version as their own change token
+        models = [model for model in models if force or is_versioned_model(model)]
+        if not models:
+            return []
+        # After commit, a reader must never pair the new version with data from before the write
+        versions = {self.get_key(model): uuid.uuid4().hex for model in models}
+        transaction.on_commit(lambda: self.get_cache().set_many(versions, None))
+        return list(versions.values())
+
+MODEL_VERSIONS = ModelVersions()
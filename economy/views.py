@@ -1,17 +1,62 @@
+from functools import wraps
+
 from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from rest_framework import viewsets
 from rest_framework import permissions
-from rest_framework import serializers
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from .util import get_installed_apps_by_domain
+from .metrics import EVENT_METRICS
+from .export import EXPORT_CONTENT_TYPES, iter_export
+from .pagination import ItemCursorPagination
+from .registry import ITEM_REGISTRY
+from .serializers import validate_expand
+from .versions import MODEL_VERSIONS, get_etag, is_versioned_model
 
 installed_apps = get_installed_apps_by_domain()
+# Discovery responses only change when the installed apps do, which takes a deploy
+installed_apps_version = get_etag(*[f'{domain}.{app_label}' for domain in sorted(installed_apps) for app_label in sorted(installed_apps[domain])])
+discovery_responses = {}
+
+def get_discovery_etag(request, *args, **kwargs):
+    return get_etag(installed_apps_version, request.build_absolute_uri(request.path), request.META.get('HTTP_ACCEPT', ''))
+
+def cache_discovery_response(view_method):
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.build_absolute_uri(request.path)
+        if key not in discovery_responses:
+            discovery_responses[key] = view_method(self, request, *args, **kwargs).data
+        return Response(discovery_responses[key])
+    return wrapper
+
+def get_item_list_etag(request, app_label=None, model_name=None, **kwargs):
+    try:
+        model = ITEM_REGISTRY.get_model(app_label, model_name)
+    except LookupError:
+        return None
+    # Expanded relations are part of the response, so are their versions
+    relations = ITEM_REGISTRY.get_relations(model)
+    expand = [value.strip() for value in request.GET.get('expand', '').split(',') if value.strip() in relations]
+    versioned_models = [model] + [relations[name][0] for name in expand]
+    if not all(is_versioned_model(versioned_model) for versioned_model in versioned_models):
+        return None
+    versions = MODEL_VERSIONS.get_many(versioned_models)
+    return get_etag(*versions, request.build_absolute_uri(), request.META.get('HTTP_ACCEPT', ''))
 
 # ViewSet for /api/apps endpoint
 class DomainViewSet(viewsets.ViewSet):
     permission_classes = [permissions.IsAuthenticated]
     apps = installed_apps
 
+    @method_decorator(condition(etag_func=get_discovery_etag))
+    @cache_discovery_response
     def list(self, request):
         response = {}
         for domain in self.apps:
@@ -20,11 +65,20 @@ class DomainViewSet(viewsets.ViewSet):
 
         return Response(response)
 
+# ViewSet for /api/events endpoint
+class EventMetricsViewSet(viewsets.ViewSet):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def list(self, request):
+        return Response(EVENT_METRICS.read())
+
 # ViewSet for /api/apps/{domain} endpoint
 class AppViewSet(viewsets.ViewSet):
     permission_classes = [permissions.IsAuthenticated]
     apps = installed_apps
 
+    @method_decorator(condition(etag_func=get_discovery_etag))
+    @cache_discovery_response
     def list(self, request, domain=None):
         response = {}
         for app_label in self.apps.get(domain, []):
@@ -38,6 +92,8 @@ class AppViewSet(viewsets.ViewSet):
 class ModelViewSet(viewsets.ViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
+    @method_decorator(condition(etag_func=get_discovery_etag))
+    @cache_discovery_response
     def list(self, request, domain=None, app_label=None):
         response = {}
         app_config = apps.get_app_config(app_label)
@@ -52,22 +108,84 @@ class ModelViewSet(viewsets.ViewSet):
 # ViewSet for /api/apps/{domain}/{app_label}/{model_name} endpoint
 class ItemViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = ItemCursorPagination
+
+    @method_decorator(condition(etag_func=get_item_list_etag))
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    def get_model(self):
+        return ITEM_REGISTRY.get_model(self.kwargs['app_label'], self.kwargs['model_name'])
+
+    def get_query_list(self, name):
+        # ?fields= and ?expand= only shape reads, writes always go through every field
+        if self.action not in ('list', 'retrieve'):
+            return []
+        return [value.strip() for value in self.request.query_params.get(name, '').split(',') if value.strip()]
+
+    def get_fields(self):
+        fields = self.get_query_list('fields')
+        if not fields:
+            return None
+        return fields + [name for name in self.get_query_list('expand') if name not in fields]
 
     def get_queryset(self):
-        app_label = self.kwargs['app_label']
-        model_name = self.kwargs['model_name']
-        app_config = apps.get_app_config(app_label)
-        model = app_config.get_model(model_name)
-        return model.objects.all().order_by('id')
+        model = self.get_model()
+        queryset = ITEM_REGISTRY.get_queryset(model).order_by('id')
+        expand = self.get_query_list('expand')
+        relations = validate_expand(model, expand, ITEM_REGISTRY.get_relations(model))
+        fields = self.get_fields()
+
+        for name in expand:
+            _, _, joined = relations[name]
+            queryset = queryset.select_related(name) if joined else queryset.prefetch_related(name)
+
+        # Many to many ids are serialized too, fetched in one query per page instead of one per row
+        many_to_many = [field.name for field in model._meta.many_to_many if field.name not in expand and (fields is None or field.name in fields)]
+        if many_to_many:
+            queryset = queryset.prefetch_related(*many_to_many)
+
+        if fields is not None:
+            concrete_fields = {field.name for field in model._meta.concrete_fields}
+            queryset = queryset.only(model._meta.pk.name, *[name for name in fields if name in concrete_fields])
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_fields()
+        if fields is not None:
+            kwargs['fields'] = fields
+        return super().get_serializer(*args, **kwargs)
 
     def get_serializer_class(self):
-        app_label = self.kwargs['app_label']
-        model_name = self.kwargs['model_name']
-        app_config = apps.get_app_config(app_label)
-        app_model = app_config.get_model(model_name)
-        class_name = app_model.__name__ + 'Serializer'
-        class Meta:
-            model = app_model
-            fields = '__all__'
-        serializer_class = type(class_name, (serializers.ModelSerializer,), {'Meta': Meta})
-        return serializer_class
+        return ITEM_REGISTRY.get_serializer_class(self.get_model(), self.get_query_list('expand'))
+
+    # Streams every row as NDJSON or CSV, ?output=, ?fields=, ?since=<pk> and ?<field>=<value> filters
+    @action(detail=False, methods=['get'])
+    def export(self, request, **kwargs):
+        model = self.get_model()
+        concrete_fields = [field.name for field in model._meta.concrete_fields]
+        query_params = request.query_params
+
+        output = query_params.get('output', 'ndjson')
+        if output not in EXPORT_CONTENT_TYPES:
+            raise ValidationError({'output': [f"Unknown output '{output}', use one of {', '.join(EXPORT_CONTENT_TYPES)}"]})
+
+        fields = [value.strip() for value in query_params.get('fields', '').split(',') if value.strip()] or concrete_fields
+        unknown_fields = [field_name for field_name in fields if field_name not in concrete_fields]
+        if unknown_fields:
+            raise ValidationError({'fields': [f"Unknown field '{field_name}'" for field_name in unknown_fields]})
+
+        queryset = ITEM_REGISTRY.get_queryset(model).order_by('pk')
+        filters = {field_name: query_params[field_name] for field_name in concrete_fields if field_name in query_params}
+        if 'since' in query_params:
+            # Exclusive, an interrupted export resumes from the last primary key it received
+            filters['pk__gt'] = query_params['since']
+        try:
+            queryset = queryset.filter(**filters)
+        except (ValueError, DjangoValidationError) as error:
+            raise ValidationError({'filters': [str(error)]})
+
+        rows = queryset.values(*fields).iterator(chunk_size=settings.ITEM_API['EXPORT_CHUNK_SIZE'])
+        response = StreamingHttpResponse(iter_export(rows, fields, output), content_type=EXPORT_CONTENT_TYPES[output])
+        response['Content-Disposition'] = f'attachment; filename="{model._meta.model_name}.{output}"'
+        return response
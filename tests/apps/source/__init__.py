@@ -1 +1 @@
-from . import discord, bank, community, holiday
+from . import activity, discord, bank, community, holiday, leaderboard
@@ -0,0 +1 @@
+from . import test_holidays, test_reset, test_sessions, test_snapshot, test_util
@@ -0,0 +1,52 @@
+from datetime import date
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from apps.source.activity.models import ActivityMultiplier, ControllerHoliday, FixedHolidayMultiplier
+from apps.source.holiday.models import FixedHoliday
+from apps.source.holiday.schedule import HOLIDAY_CALENDARS
+from tests.apps.source.activity.utils import create_activity_fixtures
+
+
+@patch('django.utils.timezone.localdate', return_value=date(2020, 12, 25))
+class ControllerHolidayTests(TestCase):
+    def setUp(self):
+        HOLIDAY_CALENDARS.invalidate()
+        create_activity_fixtures(self, member_count=0)
+        self.holiday_multiplier = ActivityMultiplier.objects.create(currency=self.currency, priority=1)
+        self.christmas = FixedHoliday.objects.create(name='Christmas', date=date(2000, 12, 25))
+        self.other_christmas = FixedHoliday.objects.create(name='Other Christmas', date=date(2000, 12, 25))
+        FixedHolidayMultiplier.objects.create(holiday=self.christmas, multiplier=self.holiday_multiplier)
+        self.controller_holiday = ControllerHoliday.objects.create(controller=self.activity_controller)
+        self.controller_holiday.fixed_holidays.add(self.christmas)
+
+    def test_only_controller_holidays_are_used(self, mock_localdate):
+        self.assertListEqual(self.controller_holiday.get_holidays_today(), [self.christmas])
+        self.assertListEqual(self.controller_holiday.get_fixed_holidays_today(), [self.christmas])
+        self.assertListEqual(self.controller_holiday.get_weekday_holidays_today(), [])
+
+    def test_calendar_is_reused(self, mock_localdate):
+        self.controller_holiday.get_holidays_today()
+        with self.assertNumQueries(0):
+            self.controller_holiday.get_holidays_today()
+            self.controller_holiday.get_next_holiday()
+
+    def test_calendar_is_invalidated_on_m2m_change(self, mock_localdate):
+        self.controller_holiday.get_holidays_today()
+        self.controller_holiday.fixed_holidays.add(self.other_christmas)
+        self.assertListEqual(self.controller_holiday.get_holidays_today(), [self.christmas, self.other_christmas])
+        self.other_christmas.controllerholiday_set.clear()
+        self.assertListEqual(self.controller_holiday.get_holidays_today(), [self.christmas])
+
+    def test_next_holiday_and_range(self, mock_localdate):
+        self.assertEqual(self.controller_holiday.get_next_holiday(), (date(2021, 12, 25), [self.christmas]))
+        self.assertDictEqual(self.controller_holiday.get_holidays_between(date(2020, 1, 1), date(2021, 12, 31)), {
+            date(2020, 12, 25): [self.christmas],
+            date(2021, 12, 25): [self.christmas],
+        })
+
+    def test_set_is_holiday(self, mock_localdate):
+        self.activity_controller.set_is_holiday()
+        self.assertTrue(self.activity_controller.is_holiday)
+        self.assertEqual(self.activity_controller.active_multiplier, self.holiday_multiplier)
@@ -0,0 +1,72 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.source.activity.models import VoiceActivityTracker, VoiceActivityLongTermTracker
+from apps.source.activity.util import bulk_daily_activity_tracker_reset, daily_activity_tracker_reset
+from apps.source.bank.models import Account, AccountCurrencyBalance
+from tests.apps.source.activity.utils import create_activity_fixtures
+
+
+class BulkDailyResetTests(TestCase):
+    def setUp(self):
+        create_activity_fixtures(self, member_count=5)
+        for index, tracker in enumerate(self.trackers):
+            tracker.points_earned = 10.25 + index
+            tracker.ticks_spent_in_call = 600
+            tracker.ticks_spent_muted = 60
+            tracker.multipliers_data = {'1.01': 5}
+            tracker.save()
+        Account.objects.create(owner=self.members[0].citizen).deposit(1, self.currency)
+        self.reset_time = timezone.now()
+
+    def test_reset_matches_single_reset(self):
+        expected_tracker = VoiceActivityTracker.objects.get(id=self.trackers[1].id)
+        bulk_daily_activity_tracker_reset(self.trackers[:1], self.activity_multiplier, self.reset_time)
+        daily_activity_tracker_reset(expected_tracker, self.activity_multiplier)
+
+        tracker = VoiceActivityTracker.objects.get(id=self.trackers[0].id)
+        self.assertEqual(tracker.points_earned, 0)
+        self.assertEqual(tracker.ticks_spent_muted, 0)
+        self.assertEqual(tracker.rewards_left, self.activity_multiplier.rewards_per_day)
+        self.assertEqual(tracker.multipliers_data, {})
+
+        long_term_tracker = VoiceActivityLongTermTracker.objects.get(member=self.members[0])
+        expected_long_term_tracker = VoiceActivityLongTermTracker.objects.get(member=self.members[1])
+        self.assertEqual(long_term_tracker.time_spent_in_call, expected_long_term_tracker.time_spent_in_call)
+        self.assertEqual(long_term_tracker.time_spent_muted, 60)
+        self.assertEqual(long_term_tracker.multipliers_data, expected_long_term_tracker.multipliers_data)
+
+    def test_points_are_deposited(self):
+        bulk_daily_activity_tracker_reset(self.trackers, self.activity_multiplier, self.reset_time)
+        balances = [AccountCurrencyBalance.objects.get(account__owner=member.citizen, currency=self.currency).balance for member in self.members]
+        self.assertEqual(balances, [11.25, 11.25, 12.25, 13.25, 14.25])
+
+    def test_query_count_does_not_scale_with_trackers(self):
+        with CaptureQueriesContext(connection) as single_reset_queries:
+            bulk_daily_activity_tracker_reset(self.trackers[1:2], self.activity_multiplier, self.reset_time)
+        with CaptureQueriesContext(connection) as multiple_reset_queries:
+            bulk_daily_activity_tracker_reset(self.trackers[2:], self.activity_multiplier, self.reset_time)
+        self.assertEqual(len(single_reset_queries), len(multiple_reset_queries))
+
+    def test_reset_is_resumable(self):
+        self.assertEqual(bulk_daily_activity_tracker_reset(self.trackers[:2], self.activity_multiplier, self.reset_time), 2)
+        self.assertEqual(bulk_daily_activity_tracker_reset(self.trackers, self.activity_multiplier, self.reset_time), 3)
+        self.assertEqual(bulk_daily_activity_tracker_reset(self.trackers, self.activity_multiplier, self.reset_time), 0)
+        self.assertEqual(bulk_daily_activity_tracker_reset(self.trackers, self.activity_multiplier, self.reset_time + timedelta(days=1)), 5)
+
+    def test_catch_up_counts_unstamped_trackers_as_reset(self):
+        VoiceActivityTracker.objects.update(last_reset=None)
+        trackers = list(VoiceActivityTracker.objects.all())
+        self.assertEqual(bulk_daily_activity_tracker_reset(trackers, self.activity_multiplier, self.reset_time, catch_up=True), 0)
+        self.assertEqual(VoiceActivityTracker.objects.get(id=self.trackers[0].id).points_earned, 10.25)
+        self.assertEqual(VoiceActivityTracker.objects.filter(last_reset=self.reset_time).count(), 5)
+        self.assertEqual(bulk_daily_activity_tracker_reset(trackers, self.activity_multiplier, self.reset_time + timedelta(days=1)), 5)
+
+    def test_scheduled_reset_resets_unstamped_trackers(self):
+        VoiceActivityTracker.objects.update(last_reset=None)
+        trackers = list(VoiceActivityTracker.objects.all())
+        self.assertEqual(bulk_daily_activity_tracker_reset(trackers, self.activity_multiplier, self.reset_time), 5)
@@ -0,0 +1,351 @@
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import discord
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.source.activity.models import VoiceActivityTracker
+from apps.source.discord.models import Member
+from apps.source.activity.sessions import VoiceSessionEngine
+from apps.source.activity.settings import VOICE_CONFIG
+from apps.source.activity.util import tick_member_activity_tracker, get_channel_occupancy
+from apps.source.discord.cache import DISCORD_IDENTITIES
+from tests.apps.source.activity.utils import (
+    MockDiscordVoiceState,
+    create_activity_fixtures,
+    mock_discord_member,
+)
+
+
+class VoiceSessionEngineTests(TestCase):
+    def setUp(self):
+        create_activity_fixtures(self)
+        self.engine = VoiceSessionEngine()
+        self.engine.load()
+
+    def test_load_active_trackers(self):
+        self.assertEqual(set(self.engine.trackers.keys()), {tracker.id for tracker in self.trackers})
+
+    def test_tick_is_kept_in_memory(self):
+        self.engine.tick(self.activity_controller, self.activity_multiplier)
+        tracker = self.engine.trackers[self.trackers[0].id]
+        self.assertEqual(tracker.ticks_spent_in_call, 1)
+        self.assertEqual(VoiceActivityTracker.objects.get(id=tracker.id).ticks_spent_in_call, 0)
+        self.assertEqual(self.engine.dirty, set(self.engine.trackers.keys()))
+        self.assertEqual(self.engine.reward_dirty, set())
+
+    def test_flush_without_rewards_writes_counters_only(self):
+        for _ in range(5):
+            self.engine.tick(self.activity_controller, self.activity_multiplier)
+        with CaptureQueriesContext(connection) as queries:
+            self.engine.flush()
+        self.assertEqual(len(queries.captured_queries), 1)
+        self.assertIn('ticks_spent_in_call', queries.captured_queries[0]['sql'])
+        self.assertNotIn('multipliers_data', queries.captured_queries[0]['sql'])
+
+    def test_rewarded_trackers_are_written_in_full(self):
+        with patch.dict(VOICE_CONFIG, {'FLUSH_RATE': 100}):
+            for _ in range(VOICE_CONFIG['TICKS_PER_REWARD']):
+                self.engine.tick(self.activity_controller, self.activity_multiplier)
+        self.assertEqual(self.engine.reward_dirty, set(self.engine.trackers.keys()))
+        self.engine.flush()
+        self.assertEqual(self.engine.reward_dirty, set())
+        self.assertEqual(VoiceActivityTracker.objects.get(id=self.trackers[0].id).rewards_left, 99)
+
+    def test_flush_writes_dirty_trackers(self):
+        for _ in range(5):
+            self.engine.tick(self.activity_controller, self.activity_multiplier)
+        self.assertEqual(self.engine.flush(), 2)
+        self.assertEqual(self.engine.dirty, set())
+        for tracker in self.trackers:
+            self.assertEqual(VoiceActivityTracker.objects.get(id=tracker.id).ticks_spent_in_call, 5)
+
+    def test_flush_rate(self):
+        with patch.dict(VOICE_CONFIG, {'FLUSH_RATE': 3}):
+            self.engine.tick(self.activity_controller, self.activity_multiplier)
+            self.engine.tick(self.activity_controller, self.activity_multiplier)
+            self.assertEqual(VoiceActivityTracker.objects.get(id=self.trackers[0].id).ticks_spent_in_call, 0)
+            self.engine.tick(self.activity_controller, self.activity_multiplier)
+            self.assertEqual(VoiceActivityTracker.objects.get(id=self.trackers[0].id).ticks_spent_in_call, 3)
+
+    def test_flush_query_count_does_not_scale_with_ticks(self):
+        for _ in range(10):
+            self.engine.tick(self.activity_controller, self.activity_multiplier)
+        with self.assertNumQueries(1):
+            self.engine.flush()
+
+    def test_reward_matches_tick_math(self):
+        for _ in range(60):
+            self.engine.tick(self.activity_controller, self.activity_multiplier)
+        self.engine.flush()
+        tracker = VoiceActivityTracker.objects.get(id=self.trackers[0].id)
+        self.assertEqual(tracker.ticks_till_reward, VOICE_CONFIG['TICKS_PER_REWARD'])
+        self.assertEqual(tracker.rewards_left, 99)
+        self.assertEqual(tracker.points_earned, 1.01)
+        self.assertEqual(tracker.multipliers_data, {'1.01': 1})
+
+    def test_tick_queries_do_not_scale_with_members(self):
+        self.activity_multiplier.currency
+        self.activity_controller.get_multiplier_snapshot()
+        with patch.dict(VOICE_CONFIG, {'FLUSH_RATE': 100}):
+            for _ in range(59):
+                self.engine.tick(self.activity_controller, self.activity_multiplier)
+            with self.assertNumQueries(0):
+                self.engine.tick(self.activity_controller, self.activity_multiplier)
+        self.assertEqual(self.engine.trackers[self.trackers[0].id].points_earned, 1.01)
+
+    def test_channel_occupancy_follows_voice_state(self):
+        self.assertEqual(self.engine.channel_occupancy[self.voice_channel.id], 2)
+        member = mock_discord_member(self.members[0])
+        self.engine.update_from_voice_state(member, MockDiscordVoiceState().get_mock(), self.activity_controller, self.activity_multiplier)
+        self.assertEqual(self.engine.channel_occupancy[self.voice_channel.id], 1)
+        self.assertEqual(get_channel_occupancy(), {self.voice_channel.id: 1})
+
+    def test_channel_index_follows_voice_state(self):
+        self.assertEqual(set(self.engine.get_channel_tracker_ids(self.voice_channel.id)), {tracker.id for tracker in self.trackers})
+        member = mock_discord_member(self.members[0])
+        self.engine.update_from_voice_state(member, MockDiscordVoiceState().get_mock(), self.activity_controller, self.activity_multiplier)
+        self.assertEqual(self.engine.get_channel_tracker_ids(self.voice_channel.id), [self.trackers[1].id])
+        self.engine.update_from_voice_state(member, MockDiscordVoiceState(channel=self.get_voice_channel_mock()).get_mock(), self.activity_controller, self.activity_multiplier)
+        self.assertEqual(set(self.engine.get_channel_tracker_ids(self.voice_channel.id)), {tracker.id for tracker in self.trackers})
+        self.assertEqual(self.engine.get_channel_tracker_ids(None), [])
+
+    def test_leaving_voice_flushes_and_drops_tracker(self):
+        for _ in range(5):
+            self.engine.tick(self.activity_controller, self.activity_multiplier)
+        member = mock_discord_member(self.members[0])
+        self.engine.update_from_voice_state(member, MockDiscordVoiceState().get_mock(), self.activity_controller, self.activity_multiplier)
+        self.assertNotIn(self.trackers[0].id, self.engine.trackers)
+        tracker = VoiceActivityTracker.objects.get(id=self.trackers[0].id)
+        self.assertEqual(tracker.ticks_spent_in_call, 5)
+        self.assertIsNone(tracker.current_channel)
+
+    def test_joining_voice_adds_tracker(self):
+        member = mock_discord_member(self.members[0])
+        self.engine.update_from_voice_state(member, MockDiscordVoiceState().get_mock(), self.activity_controller, self.activity_multiplier)
+        channel = MagicMock(spec=discord.VoiceChannel)
+        channel.id = int(self.voice_channel.id)
+        self.engine.update_from_voice_state(member, MockDiscordVoiceState(channel=channel, self_mute=True).get_mock(), self.activity_controller, self.activity_multiplier)
+        self.assertTrue(self.engine.trackers[self.trackers[0].id].muted)
+
+    def get_voice_channel_mock(self):
+        channel = MagicMock(spec=discord.VoiceChannel)
+        channel.id = int(self.voice_channel.id)
+        return channel
+
+    def test_mute_toggle_is_one_narrow_update(self):
+        member = mock_discord_member(self.members[0])
+        before = MockDiscordVoiceState(channel=self.get_voice_channel_mock()).get_mock()
+        after = MockDiscordVoiceState(channel=self.get_voice_channel_mock(), self_mute=True).get_mock()
+        with CaptureQueriesContext(connection) as queries:
+            self.engine.update_from_voice_state(member, after, self.activity_controller, self.activity_multiplier, before=before)
+        self.assertEqual(len(queries.captured_queries), 1)
+        self.assertTrue(queries.captured_queries[0]['sql'].startswith('UPDATE'))
+        self.assertNotIn('ticks_spent_in_call', queries.captured_queries[0]['sql'])
+        self.assertTrue(VoiceActivityTracker.objects.get(id=self.trackers[0].id).muted)
+
+    def test_mute_toggle_includes_pending_ticks(self):
+        self.engine.tick(self.activity_controller, self.activity_multiplier)
+        member = mock_discord_member(self.members[0])
+        after = MockDiscordVoiceState(channel=self.get_voice_channel_mock(), self_mute=True).get_mock()
+        with self.assertNumQueries(1):
+            self.engine.update_from_voice_state(member, after, self.activity_controller, self.activity_multiplier)
+        self.assertEqual(VoiceActivityTracker.objects.get(id=self.trackers[0].id).ticks_spent_in_call, 1)
+        self.assertNotIn(self.trackers[0].id, self.engine.dirty)
+
+    def test_unchanged_voice_state_costs_no_queries(self):
+        member = mock_discord_member(self.members[0])
+        state = MockDiscordVoiceState(channel=self.get_voice_channel_mock()).get_mock()
+        server_muted = MockDiscordVoiceState(channel=self.get_voice_channel_mock()).get_mock()
+        with self.assertNumQueries(0):
+            self.engine.update_from_voice_state(member, server_muted, self.activity_controller, self.activity_multiplier, before=state)
+            self.engine.update_from_voice_state(member, state, self.activity_controller, self.activity_multiplier)
+
+class ElapsedAccountingTests(TestCase):
+    def setUp(self):
+        create_activity_fixtures(self)
+        self.engine = VoiceSessionEngine()
+        self.now = timezone.now()
+        VoiceActivityTracker.objects.update(last_state_change=self.now)
+        self.engine.load()
+
+    def tick_copy(self, tracker_id, ticks):
+        tracker = VoiceActivityTracker.objects.get(id=tracker_id)
+        for _ in range(ticks):
+            tick_member_activity_tracker(tracker, self.activity_controller, self.activity_multiplier, save=False)
+        return tracker
+
+    def test_settle_matches_ticking(self):
+        tracker_id = self.trackers[0].id
+        expected = self.tick_copy(tracker_id, 185)
+        self.engine.settle(self.activity_controller, self.activity_multiplier, [tracker_id], self.now + timedelta(seconds=185.5))
+        tracker = self.engine.trackers[tracker_id]
+        self.assertEqual(tracker.ticks_spent_in_call, expected.ticks_spent_in_call)
+        self.assertEqual(tracker.ticks_till_reward, expected.ticks_till_reward)
+        self.assertEqual(tracker.rewards_left, expected.rewards_left)
+        self.assertEqual(tracker.points_earned, expected.points_earned)
+        self.assertEqual(tracker.multipliers_data, expected.multipliers_data)
+        self.assertEqual(tracker.last_state_change, self.now + timedelta(seconds=185))
+
+    def test_only_settle_counts_voice_state_ticks(self):
+        tracker_id = self.trackers[0].id
+        VoiceActivityTracker.objects.filter(id=tracker_id).update(muted=True, video_on=True)
+        self.engine.load()
+        expected = self.tick_copy(tracker_id, 30)
+        self.assertEqual(expected.ticks_spent_muted, 0)
+        self.assertEqual(expected.ticks_spent_video_on, 0)
+        self.engine.settle(self.activity_controller, self.activity_multiplier, [tracker_id], self.now + timedelta(seconds=30))
+        tracker = self.engine.trackers[tracker_id]
+        self.assertEqual(tracker.ticks_spent_muted, 30)
+        self.assertEqual(tracker.ticks_spent_video_on, 30)
+        self.assertEqual(tracker.ticks_spent_streaming, 0)
+
+    def test_settle_replaces_lowest_multipliers_when_out_of_rewards(self):
+        tracker_id = self.trackers[0].id
+        VoiceActivityTracker.objects.filter(id=tracker_id).update(rewards_left=1, multipliers_data={'0.5': 3})
+        self.engine.load()
+        expected = self.tick_copy(tracker_id, 300)
+        self.engine.settle(self.activity_controller, self.activity_multiplier, [tracker_id], self.now + timedelta(seconds=300))
+        tracker = self.engine.trackers[tracker_id]
+        self.assertEqual(tracker.points_earned, expected.points_earned)
+        self.assertEqual(tracker.multipliers_data, expected.multipliers_data)
+
+    def test_tick_does_nothing(self):
+        with patch.dict(VOICE_CONFIG, {'ACCOUNTING_MODE': 'elapsed'}):
+            with self.assertNumQueries(0):
+                self.engine.tick(self.activity_controller, self.activity_multiplier)
+        self.assertEqual(self.engine.dirty, set())
+
+    def test_leaving_settles_channel(self):
+        member = mock_discord_member(self.members[0])
+        with patch.dict(VOICE_CONFIG, {'ACCOUNTING_MODE': 'elapsed'}), patch('apps.source.activity.sessions.timezone.now') as mock_now:
+            mock_now.return_value = self.now + timedelta(seconds=120)
+            self.engine.update_from_voice_state(member, MockDiscordVoiceState().get_mock(), self.activity_controller, self.activity_multiplier)
+        for tracker in self.trackers:
+            self.assertEqual(VoiceActivityTracker.objects.get(id=tracker.id).ticks_spent_in_call, 120)
+
+class WarmUpTests(TestCase):
+    def setUp(self):
+        create_activity_fixtures(self)
+        DISCORD_IDENTITIES.clear()
+        self.engine = VoiceSessionEngine()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = str(Path(self.directory.name) / 'voice.json')
+        self.config = patch.dict(VOICE_CONFIG, {'SNAPSHOT_PATH': self.path})
+        self.config.start()
+        self.addCleanup(self.config.stop)
+        self.addCleanup(DISCORD_IDENTITIES.clear)
+
+    def get_voice_states(self, members):
+        channel = MagicMock(spec=discord.VoiceChannel)
+        channel.id = int(self.voice_channel.id)
+        return {member.id: (mock_discord_member(member), MockDiscordVoiceState(channel=channel).get_mock()) for member in members}
+
+    def test_warm_up_loads_trackers_and_identities(self):
+        multiplier = self.engine.warm_up(self.activity_controller)
+        self.assertEqual(multiplier.id, self.activity_multiplier.id)
+        self.assertEqual(set(self.engine.trackers.keys()), {tracker.id for tracker in self.trackers})
+        with self.assertNumQueries(0):
+            self.assertTrue(DISCORD_IDENTITIES.exists(Member, self.members[0].id))
+
+    def test_snapshot_round_trip(self):
+        self.engine.warm_up(self.activity_controller)
+        self.engine.tick(self.activity_controller, self.activity_multiplier)
+        self.assertTrue(self.engine.save_snapshot(flushed=False))
+        snapshot = self.engine.read_snapshot()
+        self.assertFalse(Path(self.path).exists())
+        self.assertFalse(snapshot['flushed'])
+        self.assertEqual(snapshot['trackers'][self.trackers[0].id]['ticks_spent_in_call'], 1)
+        self.assertEqual(snapshot['trackers'][self.trackers[0].id]['current_channel_id'], self.voice_channel.id)
+
+    def test_save_snapshot_without_path(self):
+        with patch.dict(VOICE_CONFIG, {'SNAPSHOT_PATH': None}):
+            self.assertFalse(self.engine.save_snapshot())
+            self.assertIsNone(self.engine.read_snapshot())
+
+    def test_unflushed_snapshot_is_applied(self):
+        self.engine.warm_up(self.activity_controller)
+        for _ in range(5):
+            self.engine.tick(self.activity_controller, self.activity_multiplier)
+        self.engine.save_snapshot(flushed=False)
+        engine = VoiceSessionEngine()
+        engine.warm_up(self.activity_controller)
+        self.assertEqual(VoiceActivityTracker.objects.get(id=self.trackers[0].id).ticks_spent_in_call, 5)
+        self.assertIsNotNone(engine.snapshot)
+
+    def test_downtime_is_credited_within_gap(self):
+        self.engine.warm_up(self.activity_controller)
+        self.engine.save_snapshot()
+        engine = VoiceSessionEngine()
+        engine.warm_up(self.activity_controller)
+        now = engine.snapshot['saved_at'] + timedelta(seconds=120)
+        engine.reconcile(self.get_voice_states(self.members), self.activity_controller, self.activity_multiplier)
+        self.assertEqual(engine.credit_downtime(self.activity_controller, self.activity_multiplier, now=now), 2)
+        self.assertIsNone(engine.snapshot)
+        self.assertEqual(VoiceActivityTracker.objects.get(id=self.trackers[0].id).ticks_spent_in_call, 120)
+
+    def test_tick_mode_downtime_only_counts_time_in_call(self):
+        VoiceActivityTracker.objects.filter(id=self.trackers[0].id).update(muted=True)
+        self.engine.warm_up(self.activity_controller)
+        self.engine.save_snapshot()
+        engine = VoiceSessionEngine()
+        engine.warm_up(self.activity_controller)
+        now = engine.snapshot['saved_at'] + timedelta(seconds=120)
+        engine.credit_downtime(self.activity_controller, self.activity_multiplier, now=now)
+        tracker = VoiceActivityTracker.objects.get(id=self.trackers[0].id)
+        self.assertEqual(tracker.ticks_spent_in_call, 120)
+        self.assertEqual(tracker.ticks_spent_muted, 0)
+
+    def test_downtime_is_not_credited_beyond_gap(self):
+        self.engine.warm_up(self.activity_controller)
+        self.engine.save_snapshot()
+        engine = VoiceSessionEngine()
+        engine.warm_up(self.activity_controller)
+        now = engine.snapshot['saved_at'] + timedelta(seconds=VOICE_CONFIG['MAX_RESTORE_GAP'] + 1)
+        self.assertEqual(engine.credit_downtime(self.activity_controller, self.activity_multiplier, now=now), 0)
+        self.assertEqual(VoiceActivityTracker.objects.get(id=self.trackers[0].id).ticks_spent_in_call, 0)
+
+    def test_reconcile_removes_departed_members(self):
+        self.engine.warm_up(self.activity_controller)
+        self.engine.save_snapshot()
+        engine = VoiceSessionEngine()
+        engine.warm_up(self.activity_controller)
+        engine.reconcile(self.get_voice_states(self.members[1:]), self.activity_controller, self.activity_multiplier)
+        self.assertNotIn(self.trackers[0].id, engine.trackers)
+        self.assertIsNone(VoiceActivityTracker.objects.get(id=self.trackers[0].id).current_channel)
+        self.assertEqual(engine.channel_occupancy[self.voice_channel.id], 1)
+        now = engine.snapshot['saved_at'] + timedelta(seconds=60)
+        self.assertEqual(engine.credit_downtime(self.activity_controller, self.activity_multiplier, now=now), 1)
+
+    def restart_after(self, gap):
+        self.engine.warm_up(self.activity_controller)
+        # In call for half an hour without a voice state change, nothing settled yet
+        for tracker in self.engine.trackers.values():
+            tracker.last_state_change = timezone.now() - timedelta(minutes=30)
+        self.engine.shutdown(self.activity_controller, self.activity_multiplier)
+        engine = VoiceSessionEngine()
+        engine.warm_up(self.activity_controller)
+        engine.reconcile(self.get_voice_states(self.members), self.activity_controller, self.activity_multiplier)
+        if engine.snapshot is not None:
+            engine.credit_downtime(self.activity_controller, self.activity_multiplier, now=engine.snapshot['saved_at'] + timedelta(seconds=gap))
+        engine.settle(self.activity_controller, self.activity_multiplier)
+        engine.flush()
+        return VoiceActivityTracker.objects.get(id=self.trackers[0].id)
+
+    def test_elapsed_restart_keeps_time_before_shutdown(self):
+        with patch.dict(VOICE_CONFIG, {'ACCOUNTING_MODE': 'elapsed'}):
+            tracker = self.restart_after(60)
+        self.assertEqual(tracker.ticks_spent_in_call, 1800 + 60)
+        self.assertGreater(tracker.points_earned, 0)
+
+    def test_elapsed_restart_without_snapshot_keeps_time_before_shutdown(self):
+        with patch.dict(VOICE_CONFIG, {'ACCOUNTING_MODE': 'elapsed', 'SNAPSHOT_PATH': None}):
+            tracker = self.restart_after(60)
+        # Downtime cannot be verified without a snapshot and is not credited
+        self.assertEqual(tracker.ticks_spent_in_call, 1800)
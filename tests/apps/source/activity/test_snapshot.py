@@ -0,0 +1,52 @@
+from dataclasses import FrozenInstanceError
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from apps.source.activity.models import ActivityController, ActivityMultiplier
+from apps.source.activity.settings import VOICE_CONFIG
+from apps.source.activity.util import get_active_multiplier
+from tests.apps.source.activity.utils import create_activity_fixtures
+
+
+class MultiplierSnapshotTests(TestCase):
+    def setUp(self):
+        create_activity_fixtures(self, member_count=0)
+
+    def test_snapshot_matches_active_multiplier(self):
+        snapshot = get_active_multiplier(self.activity_controller)
+        self.assertEqual(snapshot.id, self.activity_multiplier.id)
+        self.assertEqual(snapshot.base, self.activity_multiplier.base)
+        self.assertEqual(snapshot.currency, self.currency)
+        self.assertEqual(snapshot.global_multiplier, 0)
+        with self.assertRaises(FrozenInstanceError):
+            snapshot.base = 2
+
+    def test_snapshot_is_reused_without_queries(self):
+        controller = ActivityController.objects.get(id=self.activity_controller.id)
+        snapshot = get_active_multiplier(controller)
+        with self.assertNumQueries(0):
+            self.assertIs(get_active_multiplier(controller), snapshot)
+            self.assertEqual(controller.get_global_multiplier(), 0)
+
+    def test_snapshot_is_swapped_on_controller_change(self):
+        snapshot = get_active_multiplier(self.activity_controller)
+        self.activity_controller.is_weekend = True
+        self.activity_controller.save()
+        weekend_snapshot = get_active_multiplier(self.activity_controller)
+        self.assertIsNot(weekend_snapshot, snapshot)
+        self.assertEqual(weekend_snapshot.global_multiplier, self.activity_multiplier.weekend)
+
+    def test_snapshot_is_swapped_on_multiplier_edit(self):
+        get_active_multiplier(self.activity_controller)
+        self.activity_multiplier.base = 3
+        self.activity_multiplier.save()
+        self.assertEqual(get_active_multiplier(self.activity_controller).base, 3)
+
+    def test_edit_from_another_process_is_picked_up_after_timeout(self):
+        get_active_multiplier(self.activity_controller)
+        # A queryset update sends no signal, like an edit made by another process
+        ActivityMultiplier.objects.filter(id=self.activity_multiplier.id).update(base=3)
+        self.assertEqual(get_active_multiplier(self.activity_controller).base, self.activity_multiplier.base)
+        with patch.dict(VOICE_CONFIG, {'MULTIPLIER_SNAPSHOT_TIMEOUT': -1}):
+            self.assertEqual(get_active_multiplier(self.activity_controller).base, 3)
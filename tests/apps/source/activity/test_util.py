@@ -0,0 +1,111 @@
+import random
+
+from django.test import TestCase
+
+from apps.source.activity.models import VoiceActivityTracker
+from apps.source.activity.util import (
+    get_activity_tracker_columns,
+    get_activity_tracker_multiplier,
+    get_channel_occupancy,
+    compute_activity_batch,
+    get_activity_tracker_multipliers_batch,
+    tick_member_activity_tracker,
+    tick_activity_trackers_batch,
+)
+from tests.apps.source.activity.utils import create_activity_fixtures
+
+
+class ActivityBatchTests(TestCase):
+    def setUp(self):
+        create_activity_fixtures(self, member_count=12)
+        self.activity_controller.is_weekend = True
+        random.seed(0)
+        for index, tracker in enumerate(self.trackers):
+            tracker.is_birthday = random.random() < 0.2
+            tracker.video_on = random.random() < 0.5
+            tracker.streaming = random.random() < 0.5
+            tracker.muted = random.random() < 0.5
+            tracker.deafened = random.random() < 0.5
+            tracker.ticks_till_reward = index % 3
+            tracker.rewards_left = index % 2
+            tracker.multipliers_data = {'1.0': 2, '1.2': 1} if index % 4 else {'5.0': 1}
+            tracker.save()
+        self.trackers = list(VoiceActivityTracker.objects.all())
+        self.channel_occupancy = get_channel_occupancy()
+
+    def test_multipliers_match_scalar_path(self):
+        columns = get_activity_tracker_columns(self.trackers, self.channel_occupancy)
+        multipliers = get_activity_tracker_multipliers_batch(columns, self.activity_controller, self.activity_multiplier)
+        for tracker, multiplier in zip(self.trackers, multipliers.tolist()):
+            self.assertEqual(multiplier, get_activity_tracker_multiplier(tracker, self.activity_controller, self.activity_multiplier))
+
+    def test_points_match_scalar_path(self):
+        columns = get_activity_tracker_columns(self.trackers, self.channel_occupancy)
+        batch = compute_activity_batch(columns, self.activity_controller, self.activity_multiplier)
+        for index, tracker in enumerate(self.trackers):
+            points_before = tracker.points_earned
+            tick_member_activity_tracker(tracker, self.activity_controller, self.activity_multiplier, save=False)
+            self.assertEqual(bool(batch['eligible'][index]), tracker.ticks_till_reward == 60)
+            self.assertEqual(round(points_before + batch['points'][index], 2), tracker.points_earned)
+
+    def test_batch_tick_matches_scalar_tick(self):
+        expected = list(VoiceActivityTracker.objects.all())
+        for tracker in expected:
+            tick_member_activity_tracker(tracker, self.activity_controller, self.activity_multiplier, save=False)
+        tick_activity_trackers_batch(self.trackers, self.activity_controller, self.activity_multiplier, self.channel_occupancy)
+        for tracker, expected_tracker in zip(self.trackers, expected):
+            self.assertEqual(tracker.ticks_till_reward, expected_tracker.ticks_till_reward)
+            self.assertEqual(tracker.rewards_left, expected_tracker.rewards_left)
+            self.assertEqual(tracker.points_earned, expected_tracker.points_earned)
+            self.assertEqual(tracker.multipliers_data, expected_tracker.multipliers_data)
+
+    def test_repeated_batch_ticks_match_scalar_ticks(self):
+        expected = list(VoiceActivityTracker.objects.all())
+        for _ in range(130):
+            for tracker in expected:
+                tick_member_activity_tracker(tracker, self.activity_controller, self.activity_multiplier, save=False)
+            tick_activity_trackers_batch(self.trackers, self.activity_controller, self.activity_multiplier, self.channel_occupancy)
+        for tracker, expected_tracker in zip(self.trackers, expected):
+            self.assertEqual(tracker.ticks_spent_in_call, expected_tracker.ticks_spent_in_call)
+            self.assertEqual(tracker.rewards_left, expected_tracker.rewards_left)
+            self.assertEqual(tracker.points_earned, expected_tracker.points_earned)
+            self.assertEqual(tracker.multipliers_data, expected_tracker.multipliers_data)
+
+class ActivityBatchRoundingTests(TestCase):
+    def setUp(self):
+        create_activity_fixtures(self, member_count=16)
+        # Weights of a twentieth land multipliers on halves of the currency's last digit
+        self.currency.decimal_places = 1
+        self.currency.save()
+        for weight, value in [('birthday', 0.05), ('video', 0.25), ('streaming', 0.35), ('muted', -0.05), ('deafened', 0.55)]:
+            setattr(self.activity_multiplier, weight, value)
+        self.activity_multiplier.group = 0.05
+        self.activity_multiplier.group_max = 0.05
+        self.activity_multiplier.save()
+
+    def randomize_trackers(self, seed):
+        generator = random.Random(seed)
+        for tracker in VoiceActivityTracker.objects.all():
+            for flag in ['is_birthday', 'video_on', 'streaming', 'muted', 'deafened']:
+                setattr(tracker, flag, generator.random() < 0.5)
+            tracker.ticks_till_reward = generator.randint(1, 3)
+            tracker.rewards_left = generator.randint(0, 3)
+            tracker.multipliers_data = {str(generator.choice([1.0, 1.1, 1.2, 1.3])): generator.randint(1, 3)}
+            tracker.points_earned = generator.randint(0, 50) / 10
+            tracker.save()
+
+    def test_batch_ticks_equal_scalar_ticks(self):
+        for seed in range(5):
+            with self.subTest(seed=seed):
+                self.randomize_trackers(seed)
+                trackers = list(VoiceActivityTracker.objects.all())
+                expected = list(VoiceActivityTracker.objects.all())
+                channel_occupancy = get_channel_occupancy()
+                for _ in range(400):
+                    for tracker in expected:
+                        tick_member_activity_tracker(tracker, self.activity_controller, self.activity_multiplier, save=False, channel_occupancy=channel_occupancy)
+                    tick_activity_trackers_batch(trackers, self.activity_controller, self.activity_multiplier, channel_occupancy)
+                for tracker, expected_tracker in zip(trackers, expected):
+                    self.assertEqual(tracker.multipliers_data, expected_tracker.multipliers_data)
+                    self.assertEqual(tracker.points_earned, expected_tracker.points_earned)
+                    self.assertEqual(tracker.rewards_left, expected_tracker.rewards_left)
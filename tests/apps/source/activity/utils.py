@@ -0,0 +1,51 @@
+from unittest.mock import MagicMock
+
+import discord
+
+from apps.source.activity.models import ActivityMultiplier, ActivityController, VoiceActivityTracker
+from apps.source.bank.models import Currency
+from apps.source.community.models import Citizen
+from apps.source.discord.models import Client, Guild, Member, VoiceChannel
+from tests.apps.source.discord.utils import MockDiscordClass
+
+
+class MockDiscordVoiceState(MockDiscordClass):
+    def __init__(self, channel=None, self_mute=False, self_deaf=False, self_video=False, self_stream=False):
+        super().__init__(discord.VoiceState)
+        self.mock.channel = channel
+        self.mock.self_mute = self_mute
+        self.mock.self_deaf = self_deaf
+        self.mock.self_video = self_video
+        self.mock.self_stream = self_stream
+
+def create_activity_fixtures(test_case, member_count=2):
+    test_case.currency = Currency.objects.create(name="point", decimal_places=2)
+    test_case.activity_multiplier = ActivityMultiplier.objects.create(currency=test_case.currency)
+    test_case.client_model = Client.objects.create(id=102030405060708090, name="Client 1")
+    test_case.activity_controller = ActivityController.objects.create(
+        client=test_case.client_model,
+        base_multiplier=test_case.activity_multiplier,
+    )
+    test_case.guild = Guild.objects.create(id="123456789012345670", name="Guild 1")
+    test_case.voice_channel = VoiceChannel.objects.create(id="123456789012345676", name="Voice Channel 1", guild=test_case.guild)
+    test_case.members = []
+    test_case.trackers = []
+    for index in range(member_count):
+        citizen = Citizen.objects.create(name=f"Citizen {index}")
+        member = Member.objects.create(id=str(223456789012345670 + index), name=f"Member {index}", citizen=citizen)
+        tracker = VoiceActivityTracker.objects.create(
+            id=member.id,
+            member=member,
+            controller=test_case.activity_controller,
+            current_channel=test_case.voice_channel,
+            ticks_till_reward=60,
+            rewards_left=100,
+        )
+        test_case.members.append(member)
+        test_case.trackers.append(tracker)
+
+def mock_discord_member(member: Member):
+    mock_member = MagicMock(spec=discord.Member)
+    mock_member.id = int(member.id)
+    mock_member.name = member.name
+    return mock_member
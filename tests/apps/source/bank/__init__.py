@@ -1 +1 @@
-from . import test_bank
+from . import test_bank, test_util
@@ -1,6 +1,9 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
-from apps.source.bank.models import Account, Currency, AccountCurrencyBalance
+from apps.source.bank.cache import CURRENCY_CACHE
+from apps.source.bank.models import Account, Currency, AccountCurrencyBalance, LedgerEntry
 from apps.source.community.models import Citizen
 
 class AccountModelTests(TestCase):
@@ -196,3 +199,141 @@ class AccountCurrencyBalanceModelTest(TestCase):
     def test_withdraw_negative(self):
         with self.assertRaises(ValueError):
             self.account_currency_1.withdraw(-100)
+
+class LedgerTests(TestCase):
+    def setUp(self):
+        self.citizen = Citizen.objects.create(
+            name="Test Citizen"
+        )
+        self.account = Account.objects.create(
+            owner=self.citizen
+        )
+        self.currency = Currency.objects.create(
+            name="bill",
+            plural="bills",
+            symbol="$",
+            symbol_as_prefix=True,
+            value=100,
+            decimal_places=2,
+        )
+        self.account_currency = AccountCurrencyBalance.objects.create(
+            account=self.account,
+            currency=self.currency,
+            balance=100
+        )
+
+    def test_deposit_from_stale_instance_is_not_lost(self):
+        stale_account_currency = AccountCurrencyBalance.objects.get(id=self.account_currency.id)
+        self.account_currency.deposit(10.5)
+        stale_account_currency.deposit(20)
+        self.assertEqual(stale_account_currency.balance, 130.5)
+        self.account_currency.refresh_from_db()
+        self.assertEqual(self.account_currency.balance, 130.5)
+
+    def test_withdraw_from_stale_instance_cannot_overdraw(self):
+        stale_account_currency = AccountCurrencyBalance.objects.get(id=self.account_currency.id)
+        self.account_currency.withdraw(80)
+        with self.assertRaises(ValueError):
+            stale_account_currency.withdraw(80)
+        self.account_currency.refresh_from_db()
+        self.assertEqual(self.account_currency.balance, 20)
+
+    def test_changes_are_journaled(self):
+        self.account_currency.deposit(25)
+        self.account_currency.withdraw(5)
+        amounts = list(LedgerEntry.objects.filter(account=self.account, currency=self.currency).order_by('id').values_list('amount_minor', flat=True))
+        self.assertEqual(amounts, [2500, -500])
+
+    def test_failed_withdraw_is_not_journaled(self):
+        with self.assertRaises(ValueError):
+            self.account_currency.withdraw(500)
+        self.assertEqual(LedgerEntry.objects.count(), 0)
+
+class MinorUnitTests(TestCase):
+    def setUp(self):
+        self.citizen = Citizen.objects.create(
+            name="Test Citizen"
+        )
+        self.account = Account.objects.create(
+            owner=self.citizen
+        )
+        self.currency = Currency.objects.create(
+            name="bill",
+            plural="bills",
+            symbol="$",
+            symbol_as_prefix=True,
+            value=100,
+            decimal_places=2,
+        )
+
+    def test_balance_is_stored_in_minor_units(self):
+        self.account.deposit(10.29, "bill")
+        account_currency = AccountCurrencyBalance.objects.get(account=self.account, currency=self.currency)
+        self.assertEqual(account_currency.balance_minor, 1029)
+        self.assertEqual(account_currency.balance, 10.29)
+
+    def test_repeated_deposits_do_not_drift(self):
+        for _ in range(10):
+            self.account.deposit(0.1, "bill")
+        self.assertEqual(self.account.check_balance("bill"), 1)
+
+    def test_convert_minor_units(self):
+        currency_2 = Currency.objects.create(
+            name="gold",
+            value=1,
+            decimal_places=0
+        )
+        self.assertEqual(self.currency.convert_minor_units(55555, currency_2), 6)
+        self.assertEqual(self.currency.convert_minor_units(5000, "gold"), 0)
+        self.assertEqual(self.currency.convert_minor_units(15000, "gold"), 2)
+        self.assertEqual(currency_2.convert_minor_units(3, "bill"), 30000)
+
+    def test_from_minor_units_is_always_float(self):
+        self.assertIsInstance(self.currency.from_minor_units(1000), float)
+        self.assertIsInstance(self.currency.from_minor_units(1029), float)
+        self.assertEqual(self.currency.format_minor_units(1000), "10")
+        self.assertEqual(self.currency.format_minor_units(1050), "10.5")
+
+    def test_zero_amounts_are_not_journaled(self):
+        account_currency = AccountCurrencyBalance.objects.create(account=self.account, currency=self.currency)
+        self.assertIsNone(LedgerEntry.record(account_currency, 0))
+        self.assertEqual(LedgerEntry.objects.count(), 0)
+
+class CurrencyCacheTests(TestCase):
+    def setUp(self):
+        self.currency = Currency.objects.create(
+            name="gold",
+            plural="gold",
+            symbol="g",
+            symbol_as_prefix=False,
+            value=1,
+            decimal_places=0
+        )
+        CURRENCY_CACHE.load()
+
+    def test_lookup_without_queries(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(CURRENCY_CACHE.get("gold"), self.currency)
+            self.assertEqual(CURRENCY_CACHE.get_by_id(self.currency.id), self.currency)
+            self.assertEqual(CURRENCY_CACHE.resolve(self.currency), self.currency)
+
+    def test_edit_invalidates_cache(self):
+        self.currency.decimal_places = 2
+        self.currency.save()
+        self.assertEqual(CURRENCY_CACHE.get("gold").decimal_places, 2)
+
+    def test_delete_invalidates_cache(self):
+        self.currency.delete()
+        with self.assertRaises(Currency.DoesNotExist):
+            CURRENCY_CACHE.get("gold")
+
+    def test_currency_changed_elsewhere_found_on_miss(self):
+        Currency.objects.filter(id=self.currency.id).update(name="silver")
+        self.assertEqual(CURRENCY_CACHE.get("silver").id, self.currency.id)
+
+    def test_check_balance_does_not_query_currency(self):
+        account = Account.objects.create()
+        account.deposit(5, self.currency)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(account.check_balance(self.currency), 5)
+        self.assertFalse(any('"bank_currency"' in query['sql'] for query in queries.captured_queries))
@@ -0,0 +1,86 @@
+from unittest.mock import patch
+
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from apps.source.bank.models import Account, Currency, AccountCurrencyBalance, LedgerEntry
+from apps.source.bank.util import bulk_deposit, bulk_transfer
+from apps.source.community.models import Citizen
+
+class BulkBankOperationTests(TestCase):
+    def setUp(self):
+        self.bill = Currency.objects.create(name="bill", value=1, decimal_places=2)
+        self.cent = Currency.objects.create(name="cent", value=100, decimal_places=0)
+        self.accounts = [
+            Account.objects.create(owner=Citizen.objects.create(name=f"Citizen {i}"))
+            for i in range(4)
+        ]
+
+    def get_balance(self, account, currency):
+        return AccountCurrencyBalance.objects.get(account=account, currency=currency).balance
+
+    def test_bulk_deposit_creates_missing_balances(self):
+        AccountCurrencyBalance.objects.create(account=self.accounts[0], currency=self.bill, balance=5)
+        deposited = bulk_deposit({self.accounts[0]: 10.5, self.accounts[1].id: 3}, "bill")
+        self.assertEqual(deposited, 2)
+        self.assertEqual(self.get_balance(self.accounts[0], self.bill), 15.5)
+        self.assertEqual(self.get_balance(self.accounts[1], self.bill), 3)
+        self.assertEqual(LedgerEntry.objects.count(), 2)
+
+    def test_bulk_deposit_query_count_is_constant(self):
+        with CaptureQueriesContext(connection) as small_batch:
+            bulk_deposit({self.accounts[0]: 1}, self.bill)
+        with CaptureQueriesContext(connection) as large_batch:
+            bulk_deposit({account: 1 for account in self.accounts}, self.bill)
+        self.assertEqual(len(small_batch.captured_queries), len(large_batch.captured_queries))
+
+    def test_bulk_deposit_rejects_negative_amounts(self):
+        with self.assertRaises(ValueError):
+            bulk_deposit({self.accounts[0]: -1}, self.bill)
+
+    def test_bulk_transfer(self):
+        bulk_deposit({self.accounts[0]: 10}, self.bill)
+        bulk_transfer([
+            (self.accounts[0], self.accounts[1], 4, "bill"),
+            (self.accounts[1], self.accounts[2], 1.5, "bill"),
+            (self.accounts[0], self.accounts[3], 0.25, "bill", "cent"),
+        ])
+        self.assertEqual(self.get_balance(self.accounts[0], self.bill), 5.75)
+        self.assertEqual(self.get_balance(self.accounts[1], self.bill), 2.5)
+        self.assertEqual(self.get_balance(self.accounts[2], self.bill), 1.5)
+        self.assertEqual(self.get_balance(self.accounts[3], self.cent), 25)
+        self.assertEqual(LedgerEntry.objects.filter(amount_minor__lt=0).count(), 3)
+
+    def test_balances_are_unique_per_currency(self):
+        AccountCurrencyBalance.objects.create(account=self.accounts[0], currency=self.bill)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            AccountCurrencyBalance.objects.create(account=self.accounts[0], currency=self.bill)
+
+    def test_bulk_transfer_uses_concurrently_created_balances(self):
+        bulk_deposit({self.accounts[0]: 10}, self.bill)
+        bulk_create = AccountCurrencyBalance.objects.bulk_create
+
+        def create_concurrently(objs, **kwargs):
+            # Another batch creates the receiver's balance between the lookup and the insert
+            AccountCurrencyBalance.objects.create(account=self.accounts[1], currency=self.bill, balance_minor=100)
+            return bulk_create(objs, **kwargs)
+
+        with patch.object(AccountCurrencyBalance.objects, 'bulk_create', side_effect=create_concurrently):
+            bulk_transfer([(self.accounts[0], self.accounts[1], 4, "bill")])
+        self.assertEqual(AccountCurrencyBalance.objects.filter(account=self.accounts[1], currency=self.bill).count(), 1)
+        self.assertEqual(self.get_balance(self.accounts[1], self.bill), 5)
+
+    def test_bulk_transfer_overdraft_rolls_back_batch(self):
+        bulk_deposit({self.accounts[0]: 10}, self.bill)
+        with self.assertRaises(ValueError):
+            bulk_transfer([
+                (self.accounts[0], self.accounts[1], 6, "bill"),
+                (self.accounts[0], self.accounts[2], 6, "bill"),
+            ])
+        self.assertEqual(self.get_balance(self.accounts[0], self.bill), 10)
+        self.assertFalse(AccountCurrencyBalance.objects.filter(account=self.accounts[1]).exists())
+
+    def test_bulk_transfer_from_missing_balance(self):
+        with self.assertRaises(ValueError):
+            bulk_transfer([(self.accounts[0], self.accounts[1], 1, "bill")])
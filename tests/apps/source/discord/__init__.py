@@ -1 +1 @@
-from . import extensions, test_models
+from . import extensions, test_cache, test_events, test_models, test_writes
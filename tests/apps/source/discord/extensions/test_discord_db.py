@@ -1,6 +1,8 @@
 from unittest.mock import patch, PropertyMock
 
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from discord.ext import commands
 
 from apps.source.discord.client import DiscordClient
@@ -20,8 +22,10 @@ from apps.source.discord.extensions.discord_db import (
     remove_inactive_guilds,
     create_or_update_member,
     sync_members_with_db,
+    bulk_sync_members_with_db,
     create_or_update_channel,
     sync_channels_with_db,
+    bulk_sync_channels_with_db,
 )
 from apps.source.community.models import Citizen
 from tests.apps.source.discord.utils import (
@@ -146,6 +150,26 @@ class DiscordDBMemberFunctionTests(TestCase):
             self.assertEqual(Member.objects.get(id=self.member_model_1.id).name, "Member 1")
             self.assertRaises(Member.DoesNotExist, Member.objects.get, id=self.mock_discord_member_bot.id)
 
+    def test_bulk_sync_members_with_db(self):
+        members = [self.mock_discord_member_1, self.mock_discord_member_2, self.mock_discord_member_3, self.mock_discord_member_bot]
+        with patch('apps.source.discord.extensions.discord_db.EVENT_MANAGER') as mock_event_manager:
+            members_synced = bulk_sync_members_with_db(members)
+            triggered = [call.args[0] for call in mock_event_manager.source.community.trigger.call_args_list]
+        self.assertEqual(members_synced, 1)
+        self.assertListEqual(triggered, ['on_citizen_created', 'on_citizen_updated'])
+        self.assertEqual(Citizen.objects.get(id=self.citizen_model_1.id).name, self.mock_discord_member_1.display_name)
+        self.assertListEqual(list(Member.objects.get(id=self.mock_discord_member_1.id).guilds.values_list('id', flat=True)), [str(self.mock_discord_guild_1.id)])
+        self.assertListEqual(list(Member.objects.get(id=self.mock_discord_member_3.id).guilds.order_by('id').values_list('id', flat=True)), [str(self.mock_discord_guild_1.id), str(self.mock_discord_guild_2.id)])
+        self.assertEqual(Citizen.objects.count(), 2)
+
+    def test_bulk_sync_members_with_db_skips_unchanged_rows(self):
+        members = [self.mock_discord_member_1, self.mock_discord_member_2, self.mock_discord_member_3]
+        bulk_sync_members_with_db(members)
+        with CaptureQueriesContext(connection) as queries:
+            members_synced = bulk_sync_members_with_db(members)
+        self.assertEqual(members_synced, 0)
+        self.assertFalse([query for query in queries.captured_queries if query['sql'].startswith(('INSERT', 'UPDATE'))])
+
 class DiscordDBChannelFunctionTests(TestCase):
     def setUp(self):
         self.client_model = Client.objects.create(
@@ -194,3 +218,33 @@ class DiscordDBChannelFunctionTests(TestCase):
             self.assertEqual(ForumChannel.objects.count(), 1)
             channels_synced_2 = sync_channels_with_db(self.mock_discord_client)
             self.assertEqual(channels_synced_2, 0)
+
+    def test_bulk_sync_channels_with_db_renames_and_prunes(self):
+        bulk_sync_channels_with_db([self.mock_discord_guild])
+        self.mock_discord_text_channel.name = "Text Channel 2"
+        self.mock_discord_voice_channel.permissions_for.return_value.view_channel = False
+        self.mock_discord_guild.channels.remove(self.mock_discord_forum_channel)
+
+        channels_synced = bulk_sync_channels_with_db([self.mock_discord_guild])
+        self.assertEqual(channels_synced, 0)
+        self.assertEqual(TextChannel.objects.get(id=self.mock_discord_text_channel.id).name, "Text Channel 2")
+        self.assertEqual(VoiceChannel.objects.count(), 0)
+        self.assertEqual(ForumChannel.objects.count(), 0)
+        self.assertEqual(Category.objects.count(), 1)
+        self.assertEqual(StageChannel.objects.count(), 1)
+
+    def test_bulk_sync_channels_with_db_query_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            bulk_sync_channels_with_db([self.mock_discord_guild])
+        self.mock_discord_guild.channels += [
+            MockDiscordCategory(123456789012345682, "Category Channel 2", self.mock_discord_guild).get_mock(),
+            MockDiscordTextChannel(123456789012345684, "Text Channel 2", self.mock_discord_guild).get_mock(),
+            MockDiscordVoiceChannel(123456789012345686, "Voice Channel 2", self.mock_discord_guild).get_mock(),
+            MockDiscordStageChannel(123456789012345688, "Stage Channel 2", self.mock_discord_guild).get_mock(),
+            MockDiscordForumChannel(123456789012345690, "Forum Channel 2", self.mock_discord_guild).get_mock(),
+        ]
+        for channel_model in [Category, TextChannel, VoiceChannel, StageChannel, ForumChannel]:
+            channel_model.objects.all().delete()
+        with CaptureQueriesContext(connection) as more_queries:
+            bulk_sync_channels_with_db([self.mock_discord_guild])
+        self.assertEqual(len(queries.captured_queries), len(more_queries.captured_queries))
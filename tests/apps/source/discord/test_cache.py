@@ -0,0 +1,31 @@
+from django.test import TestCase
+
+from apps.source.community.models import Citizen
+from apps.source.discord.cache import IdentityCache, DISCORD_IDENTITIES
+from apps.source.discord.models import Member
+
+
+class IdentityCacheTests(TestCase):
+    def setUp(self):
+        self.cache = IdentityCache()
+        self.member = Member.objects.create(id="123456789012345678", name="Member 1", citizen=Citizen.objects.create(name="Citizen 1"))
+
+    def test_exists_is_cached(self):
+        self.assertTrue(self.cache.exists(Member, 123456789012345678))
+        with self.assertNumQueries(0):
+            self.assertTrue(self.cache.exists(Member, "123456789012345678"))
+
+    def test_missing_rows_are_picked_up_later(self):
+        self.assertFalse(self.cache.exists(Member, "223456789012345678"))
+        Member.objects.create(id="223456789012345678", name="Member 2", citizen=Citizen.objects.create(name="Citizen 2"))
+        self.assertTrue(self.cache.exists(Member, "223456789012345678"))
+
+    def test_load(self):
+        self.cache.load(Member)
+        with self.assertNumQueries(0):
+            self.assertTrue(self.cache.exists(Member, self.member.id))
+
+    def test_deleted_rows_are_forgotten(self):
+        self.assertTrue(DISCORD_IDENTITIES.exists(Member, self.member.id))
+        self.member.delete()
+        self.assertFalse(DISCORD_IDENTITIES.exists(Member, self.member.id))
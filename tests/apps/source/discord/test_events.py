@@ -0,0 +1,28 @@
+from django.test import SimpleTestCase
+
+from apps.source.discord.events import ClientEvent
+
+
+class ClientEventTests(SimpleTestCase):
+    def test_payload_attributes(self):
+        event = ClientEvent("client", guild="guild", before=None)
+        self.assertEqual(event.client, "client")
+        self.assertEqual(event.guild, "guild")
+        self.assertIsNone(event.before)
+        self.assertFalse(hasattr(event, 'after'))
+
+    def test_payload_has_no_instance_dict(self):
+        event = ClientEvent("client", guild="guild")
+        self.assertFalse(hasattr(event, '__dict__'))
+
+    def test_payload_factory_is_called_on_first_access(self):
+        calls = []
+        def payload_factory():
+            calls.append(None)
+            return {'guild': "guild"}
+        event = ClientEvent("client", payload_factory)
+        self.assertEqual(event.client, "client")
+        self.assertEqual(calls, [])
+        self.assertEqual(event.guild, "guild")
+        self.assertEqual(event.guild, "guild")
+        self.assertEqual(len(calls), 1)
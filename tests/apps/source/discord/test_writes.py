@@ -0,0 +1,50 @@
+from unittest.mock import MagicMock, patch
+
+from asgiref.sync import async_to_sync
+from django.test import TestCase
+
+from apps.source.discord.models import Guild
+from apps.source.discord.writes import WriteBehindQueue
+from apps.source.discord.extensions.discord_db import create_or_update_guild
+from tests.apps.source.discord.utils import MockDiscordGuild
+
+
+class WriteBehindQueueTests(TestCase):
+    def setUp(self):
+        self.queue = WriteBehindQueue()
+        self.mock_discord_guild = MockDiscordGuild(123456789012345678, "Guild 1").get_mock()
+
+    def test_writes_to_the_same_key_are_coalesced(self):
+        self.queue.enqueue(('guild', self.mock_discord_guild.id), create_or_update_guild, self.mock_discord_guild)
+        self.queue.enqueue(('guild', self.mock_discord_guild.id), create_or_update_guild, self.mock_discord_guild, active=False)
+        self.assertEqual(Guild.objects.count(), 0)
+
+        writes_applied = async_to_sync(self.queue.flush)()
+        self.assertEqual(writes_applied, 1)
+        self.assertEqual(Guild.objects.get(id=self.mock_discord_guild.id).active, False)
+        self.assertEqual(async_to_sync(self.queue.flush)(), 0)
+
+    def test_coalesced_write_keeps_its_place(self):
+        calls = []
+        self.queue.enqueue(('guild', 1), calls.append, 'guild_join')
+        self.queue.enqueue(('member', 2), calls.append, 'member_join')
+        self.queue.enqueue(('guild', 1), calls.append, 'guild_update')
+        async_to_sync(self.queue.flush)()
+        self.assertEqual(calls, ['guild_update', 'member_join'])
+
+    def test_failed_write_does_not_block_batch(self):
+        failing_write = MagicMock(side_effect=ValueError, __name__='failing_write')
+        self.queue.enqueue(('guild', 1), failing_write)
+        self.queue.enqueue(('guild', self.mock_discord_guild.id), create_or_update_guild, self.mock_discord_guild)
+        with self.assertLogs('apps.source.discord.writes', level='ERROR'):
+            async_to_sync(self.queue.flush)()
+        self.assertEqual(Guild.objects.count(), 1)
+
+    def test_size_threshold_schedules_flush(self):
+        async def enqueue_writes():
+            self.queue.enqueue(('guild', 1), MagicMock())
+            self.queue.enqueue(('guild', 2), MagicMock())
+            await self.queue.flush_task
+        with patch.dict('apps.source.discord.writes.WRITE_BEHIND_CONFIG', {'MAX_PENDING': 2}):
+            async_to_sync(enqueue_writes)()
+        self.assertEqual(self.queue.pending, {})
@@ -1 +1 @@
-from . import test_models, test_util
+from . import test_models, test_schedule, test_util
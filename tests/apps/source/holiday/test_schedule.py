@@ -0,0 +1,92 @@
+from datetime import date
+
+from django.test import TestCase
+
+from apps.source.holiday.models import WeekdayHoliday, FixedHoliday
+from apps.source.holiday.schedule import HolidayCalendar, HolidayCalendarCache, iter_holiday_occurrences
+
+
+class HolidayCalendarTestCase(TestCase):
+    def setUp(self):
+        self.new_year = FixedHoliday.objects.create(name='New Year', date=date(2000, 1, 1))
+        self.leap_day = FixedHoliday.objects.create(name='Leap Day', date=date(2000, 2, 29))
+        self.first_monday = WeekdayHoliday.objects.create(name='First Monday', week=1, month=1, day=0)
+        self.calendar = HolidayCalendar([self.first_monday, self.new_year, self.leap_day])
+
+    def test_get_holidays_on(self):
+        self.assertListEqual(self.calendar.get_holidays_on(date(2020, 1, 1)), [self.new_year])
+        self.assertListEqual(self.calendar.get_holidays_on(date(2020, 1, 6)), [self.first_monday])
+        self.assertListEqual(self.calendar.get_holidays_on(date(2020, 1, 7)), [])
+
+    def test_missing_dates_are_skipped(self):
+        self.assertListEqual(self.calendar.get_holidays_on(date(2020, 2, 29)), [self.leap_day])
+        self.assertNotIn(self.leap_day, sum(self.calendar.get_holidays_between(date(2021, 1, 1), date(2021, 12, 31)).values(), []))
+
+    def test_get_holidays_between(self):
+        holidays = self.calendar.get_holidays_between(date(2020, 12, 1), date(2021, 1, 31))
+        self.assertDictEqual(holidays, {
+            date(2021, 1, 1): [self.new_year],
+            date(2021, 1, 4): [self.first_monday],
+        })
+
+    def test_get_next_holiday(self):
+        self.assertEqual(self.calendar.get_next_holiday(date(2020, 1, 1)), (date(2020, 1, 6), [self.first_monday]))
+        self.assertEqual(self.calendar.get_next_holiday(date(2020, 3, 1)), (date(2021, 1, 1), [self.new_year]))
+        self.assertIsNone(HolidayCalendar([]).get_next_holiday(date(2020, 1, 1)))
+
+    def test_years_are_built_once(self):
+        self.calendar.get_holidays_on(date(2020, 1, 1))
+        built_year = self.calendar.years[2020]
+        self.calendar.get_holidays_on(date(2020, 5, 1))
+        self.assertIs(self.calendar.years[2020], built_year)
+
+class HolidayOccurrencesTestCase(TestCase):
+    def setUp(self):
+        self.new_year = FixedHoliday.objects.create(name='New Year', date=date(2000, 1, 1))
+        self.leap_day = FixedHoliday.objects.create(name='Leap Day', date=date(2000, 2, 29))
+        self.first_monday = WeekdayHoliday.objects.create(name='First Monday', week=1, month=1, day=0)
+        # The fifth Thursday of December 2019 falls in January 2020
+        self.fifth_thursday = WeekdayHoliday.objects.create(name='Fifth Thursday', week=5, month=12, day=3)
+
+    def test_occurrences_are_in_order(self):
+        occurrences = list(iter_holiday_occurrences(date(2020, 1, 1), date(2021, 3, 1), years_per_batch=1))
+        self.assertListEqual(occurrences, [
+            (date(2020, 1, 1), self.new_year),
+            (date(2020, 1, 2), self.fifth_thursday),
+            (date(2020, 1, 6), self.first_monday),
+            (date(2020, 2, 29), self.leap_day),
+            (date(2020, 12, 31), self.fifth_thursday),
+            (date(2021, 1, 1), self.new_year),
+            (date(2021, 1, 4), self.first_monday),
+        ])
+
+    def test_occurrences_match_calendar(self):
+        holidays = [self.first_monday, self.fifth_thursday, self.new_year, self.leap_day]
+        calendar = HolidayCalendar(holidays)
+        expected = [
+            (holiday_date, holiday)
+            for holiday_date, day_holidays in calendar.get_holidays_between(date(2000, 1, 1), date(2040, 12, 31)).items()
+            for holiday in day_holidays
+        ]
+        occurrences = list(iter_holiday_occurrences(date(2000, 1, 1), date(2040, 12, 31), holidays, years_per_batch=7))
+        self.assertListEqual(sorted(occurrences, key=lambda item: (item[0], item[1].name)), sorted(expected, key=lambda item: (item[0], item[1].name)))
+
+    def test_occurrences_stream(self):
+        occurrences = iter_holiday_occurrences(date(2020, 1, 1), date(9000, 1, 1))
+        self.assertEqual(next(occurrences), (date(2020, 1, 1), self.new_year))
+
+class HolidayCalendarCacheTestCase(TestCase):
+    def test_invalidated_on_holiday_change(self):
+        from apps.source.holiday.schedule import HOLIDAY_CALENDARS
+        calendar = HOLIDAY_CALENDARS.get('test', lambda: [])
+        self.assertIs(HOLIDAY_CALENDARS.get('test', lambda: []), calendar)
+        FixedHoliday.objects.create(name='New Year', date=date(2000, 1, 1))
+        self.assertIsNot(HOLIDAY_CALENDARS.get('test', lambda: []), calendar)
+
+    def test_invalidate_key(self):
+        cache = HolidayCalendarCache()
+        calendar_1 = cache.get(1, lambda: [])
+        calendar_2 = cache.get(2, lambda: [])
+        cache.invalidate(1)
+        self.assertIsNot(cache.get(1, lambda: []), calendar_1)
+        self.assertIs(cache.get(2, lambda: []), calendar_2)
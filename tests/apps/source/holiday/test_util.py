@@ -1,17 +1,43 @@
+from datetime import date
+
+import numpy as np
 from django.test import TestCase
-from dateutil.relativedelta import MO, TU, WE, TH, FR, SA, SU
+from dateutil.relativedelta import relativedelta, weekday
 
 from apps.source.holiday.util import (
-    int_to_dateutil_weekday
+    get_weekday_date,
+    get_weekday_dates,
+    get_fixed_dates,
 )
 
 
-class IntToDateutilWeekdayTestCase(TestCase):
-    def test_int_to_dateutil_weekday(self):
-        self.assertEqual(int_to_dateutil_weekday(0), MO)
-        self.assertEqual(int_to_dateutil_weekday(1), TU)
-        self.assertEqual(int_to_dateutil_weekday(2), WE)
-        self.assertEqual(int_to_dateutil_weekday(3), TH)
-        self.assertEqual(int_to_dateutil_weekday(4), FR)
-        self.assertEqual(int_to_dateutil_weekday(5), SA)
-        self.assertEqual(int_to_dateutil_weekday(6), SU)
+class WeekdayDateTestCase(TestCase):
+    def setUp(self):
+        self.cases = [
+            (year, month, day, week)
+            for year in (2019, 2020, 2024)
+            for month in range(1, 13)
+            for day in range(7)
+            for week in (-5, -2, -1, 1, 2, 5)
+        ]
+
+    def get_relativedelta_date(self, year, month, day, week):
+        return date(year, 1, 1) + relativedelta(month=month, day=1 if week >= 0 else 31, weekday=weekday(day, week))
+
+    def test_get_weekday_date(self):
+        for year, month, day, week in self.cases:
+            self.assertEqual(get_weekday_date(year, month, day, week), self.get_relativedelta_date(year, month, day, week))
+
+    def test_get_weekday_dates(self):
+        years, months, days, weeks = (np.array(column, dtype=np.int64) for column in zip(*self.cases))
+        dates = get_weekday_dates(years, months, days, weeks)
+        self.assertListEqual(dates.tolist(), [self.get_relativedelta_date(*case) for case in self.cases])
+
+    def test_week_zero_is_first_week(self):
+        self.assertEqual(get_weekday_date(2020, 1, 0, 0), date(2020, 1, 6))
+
+class FixedDatesTestCase(TestCase):
+    def test_get_fixed_dates(self):
+        years = np.array([[2020], [2021]], dtype=np.int64)
+        dates, exists = get_fixed_dates(years, np.array([1, 2], dtype=np.int64), np.array([1, 29], dtype=np.int64))
+        self.assertListEqual(dates[exists].tolist(), [date(2020, 1, 1), date(2020, 2, 29), date(2021, 1, 1)])
@@ -0,0 +1,143 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.source.activity.models import VoiceActivityTracker, VoiceActivityLongTermTracker
+from apps.source.activity.sessions import VoiceSessionEngine
+from apps.source.activity.util import bulk_daily_activity_tracker_reset
+from apps.source.bank.models import Account
+from apps.source.leaderboard.leaderboards import LEADERBOARDS, DAILY_POINTS, LIFETIME_POINTS, TIME_IN_CALL
+from apps.source.leaderboard.models import LeaderboardEntry
+from apps.source.leaderboard.util import get_top_message
+from tests.apps.source.activity.utils import create_activity_fixtures
+
+
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        create_activity_fixtures(self)
+        LEADERBOARDS.clear()
+        self.addCleanup(LEADERBOARDS.clear)
+        self.engine = VoiceSessionEngine()
+        self.engine.load()
+        self.citizen_ids = [member.citizen_id for member in self.members]
+
+    def tick(self, ticks, tracker_ids=None):
+        trackers = [self.engine.trackers[tracker_id] for tracker_id in tracker_ids or self.engine.trackers]
+        for _ in range(ticks):
+            for tracker in trackers:
+                tracker.ticks_spent_in_call += 1
+                tracker.points_earned += 1
+                self.engine.mark_dirty(tracker.id)
+
+    def test_flush_records_without_queries(self):
+        self.tick(5)
+        with CaptureQueriesContext(connection) as queries:
+            self.engine.flush()
+        self.assertEqual(len(queries.captured_queries), 1)
+        self.assertEqual(LEADERBOARDS.pending[self.members[0].id], (5, 5))
+        self.assertEqual(LeaderboardEntry.objects.count(), 0)
+
+    def test_save_writes_activity_boards(self):
+        self.tick(5)
+        self.tick(2, [self.trackers[1].id])
+        self.engine.flush()
+        self.assertEqual(LEADERBOARDS.save(), 2)
+        self.assertEqual(LEADERBOARDS.pending, {})
+        self.assertEqual(LEADERBOARDS.get_ranking(DAILY_POINTS).get_top(2), [(1, self.citizen_ids[1], 7), (2, self.citizen_ids[0], 5)])
+        self.assertEqual(LeaderboardEntry.objects.get(board=TIME_IN_CALL, citizen_id=self.citizen_ids[1]).score, 7)
+        LEADERBOARDS.clear()
+        self.assertEqual(LEADERBOARDS.get_ranking(LIFETIME_POINTS).get_rank(self.citizen_ids[0]), 2)
+
+    def test_reads_do_not_scan_trackers(self):
+        self.tick(5)
+        self.engine.flush()
+        LEADERBOARDS.save()
+        with CaptureQueriesContext(connection) as queries:
+            get_top_message(DAILY_POINTS, 10, self.members[0].id)
+        for query in queries.captured_queries:
+            self.assertNotIn('voiceactivity', query['sql'])
+
+    def test_reset_settles_lifetime_bases(self):
+        self.tick(5)
+        self.engine.flush()
+        LEADERBOARDS.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_daily_activity_tracker_reset(VoiceActivityTracker.objects.all(), self.activity_multiplier)
+        citizen_id = self.citizen_ids[0]
+        self.assertEqual(LEADERBOARDS.get_ranking(DAILY_POINTS).get_score(citizen_id), 0)
+        self.assertEqual(LEADERBOARDS.get_ranking(LIFETIME_POINTS).get_score(citizen_id), 5)
+        self.assertEqual(LEADERBOARDS.get_ranking(TIME_IN_CALL).get_score(citizen_id), 5)
+
+        self.engine.load()
+        self.tick(3)
+        self.engine.flush()
+        LEADERBOARDS.save()
+        self.assertEqual(LEADERBOARDS.get_ranking(DAILY_POINTS).get_score(citizen_id), 3)
+        self.assertEqual(LEADERBOARDS.get_ranking(LIFETIME_POINTS).get_score(citizen_id), 8)
+
+    def test_deposit_updates_balance_board(self):
+        account = Account.objects.create(owner=self.members[0].citizen)
+        with self.captureOnCommitCallbacks(execute=True):
+            account.deposit(12, self.currency)
+        self.assertEqual(LEADERBOARDS.get_ranking('balance:point').get_score(self.citizen_ids[0]), 12)
+        with self.captureOnCommitCallbacks(execute=True):
+            account.withdraw(2, self.currency)
+        self.assertEqual(LEADERBOARDS.get_ranking('balance:point').get_score(self.citizen_ids[0]), 10)
+        self.assertIn('balance:point', LEADERBOARDS.get_boards())
+
+    def test_rolled_back_deposit_leaves_rankings_alone(self):
+        account = Account.objects.create(owner=self.members[0].citizen)
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(ValueError), transaction.atomic():
+                account.deposit(12, self.currency)
+                raise ValueError
+        self.assertIsNone(LEADERBOARDS.get_ranking('balance:point').get_score(self.citizen_ids[0]))
+
+    def test_deposit_waits_for_commit(self):
+        account = Account.objects.create(owner=self.members[0].citizen)
+        with self.captureOnCommitCallbacks() as callbacks, CaptureQueriesContext(connection) as queries:
+            account.deposit(12, self.currency)
+        self.assertFalse(any('leaderboard_leaderboardentry' in query['sql'] for query in queries.captured_queries))
+        self.assertEqual(len(callbacks), 1)
+
+    def test_rebuild(self):
+        VoiceActivityTracker.objects.filter(id=self.trackers[0].id).update(points_earned=4, ticks_spent_in_call=60)
+        VoiceActivityLongTermTracker.objects.create(id=self.members[0].id, member=self.members[0], points_earned=10, time_spent_in_call=600)
+        Account.objects.create(owner=self.members[1].citizen).deposit(3, self.currency)
+        output = StringIO()
+        call_command('rebuild_leaderboards', stdout=output)
+        self.assertIn('Rebuilt leaderboards', output.getvalue())
+        self.assertEqual(LEADERBOARDS.get_ranking(LIFETIME_POINTS).get_score(self.citizen_ids[0]), 14)
+        self.assertEqual(LEADERBOARDS.get_ranking(TIME_IN_CALL).get_score(self.citizen_ids[0]), 660)
+        self.assertEqual(LEADERBOARDS.get_ranking('balance:point').get_rank(self.citizen_ids[1]), 1)
+
+    def test_top_message(self):
+        self.tick(5, [self.trackers[0].id])
+        self.tick(1, [self.trackers[1].id])
+        self.engine.flush()
+        LEADERBOARDS.save()
+        message = get_top_message(DAILY_POINTS, 10, self.members[0].id)
+        self.assertIn('**Daily points**', message)
+        self.assertIn('`#1` Citizen 0 - 5', message)
+        self.assertIn('You are `#1` of 2 with 5.', message)
+        self.assertIn('does not exist', get_top_message('unknown'))
+
+    def test_api(self):
+        self.tick(5, [self.trackers[1].id])
+        self.tick(1, [self.trackers[0].id])
+        self.engine.flush()
+        LEADERBOARDS.save()
+        client = APIClient()
+        self.assertEqual(client.get('/apps/source/leaderboard/').status_code, 403)
+        client.force_authenticate(User.objects.create_user('leaderboard'))
+        self.assertIn(DAILY_POINTS, client.get('/apps/source/leaderboard/').json())
+        response = client.get(f'/apps/source/leaderboard/{DAILY_POINTS}/', {'size': 1, 'member': self.members[0].id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [{'rank': 1, 'citizen': self.citizen_ids[1], 'name': 'Citizen 1', 'score': 5}])
+        self.assertEqual(response.json()['member']['rank'], 2)
+        self.assertEqual(client.get('/apps/source/leaderboard/balance:missing/').status_code, 404)
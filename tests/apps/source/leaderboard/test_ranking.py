@@ -0,0 +1,48 @@
+import random
+
+from django.test import SimpleTestCase
+
+from apps.source.leaderboard.ranking import Ranking
+
+
+class RankingTests(SimpleTestCase):
+    def test_rank_and_top(self):
+        ranking = Ranking({1: 10, 2: 30, 3: 20})
+        self.assertEqual(ranking.get_rank(2), 1)
+        self.assertEqual(ranking.get_rank(1), 3)
+        self.assertEqual(ranking.get_top(2), [(1, 2, 30), (2, 3, 20)])
+        self.assertEqual(ranking.get_top(2, offset=2), [(3, 1, 10)])
+
+    def test_update_moves_entry(self):
+        ranking = Ranking({1: 10, 2: 30})
+        ranking.update(1, 40)
+        self.assertEqual(ranking.get_rank(1), 1)
+        self.assertEqual(ranking.get_rank(2), 2)
+        self.assertEqual(len(ranking.entries), 2)
+
+    def test_ties_share_rank(self):
+        ranking = Ranking({1: 10, 2: 20, 3: 20, 4: 5})
+        self.assertEqual(ranking.get_rank(3), 1)
+        self.assertEqual(ranking.get_top(4), [(1, 2, 20), (1, 3, 20), (3, 1, 10), (4, 4, 5)])
+        self.assertEqual(ranking.get_top(1, offset=1), [(1, 3, 20)])
+
+    def test_remove(self):
+        ranking = Ranking({1: 10, 2: 20})
+        ranking.remove(2)
+        ranking.remove(3)
+        self.assertIsNone(ranking.get_rank(2))
+        self.assertEqual(ranking.get_top(5), [(1, 1, 10)])
+        self.assertEqual(len(ranking), 1)
+
+    def test_matches_sorting(self):
+        generator = random.Random(0)
+        ranking = Ranking()
+        scores = {}
+        for _ in range(500):
+            key = generator.randrange(50)
+            scores[key] = generator.randrange(20)
+            ranking.update(key, scores[key])
+        ordered = sorted(scores, key=lambda key: (-scores[key], key))
+        self.assertEqual([key for _, key, _ in ranking.get_top(50)], ordered)
+        for key in scores:
+            self.assertEqual(ranking.get_rank(key), 1 + sum(1 for score in scores.values() if score > scores[key]))
@@ -1 +1 @@
-from . import test_views
+from . import test_metrics, test_registry, test_util, test_versions, test_views
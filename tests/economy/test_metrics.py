@@ -0,0 +1,121 @@
+import json
+import tempfile
+from io import StringIO
+from functools import partial
+from pathlib import Path
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from economy.metrics import EVENT_METRICS, EventMetrics, get_handler_name, percentile
+from economy.util import AppEventManager
+
+METRICS_SETTINGS = {
+    'MAX_WORKERS': 2,
+    'HANDLER_TIMEOUT': 1,
+    'METRICS': True,
+    'METRICS_SAMPLE_SIZE': 100,
+    'METRICS_PATH': None,
+    'METRICS_SAVE_INTERVAL': 60,
+}
+
+@override_settings(EVENTS=METRICS_SETTINGS)
+class EventMetricsTests(SimpleTestCase):
+    def setUp(self):
+        EVENT_METRICS.reset()
+        self.event_manager = AppEventManager('source.test')
+        self.event_manager.register_event('on_test')
+
+    def tearDown(self):
+        EVENT_METRICS.reset()
+
+    def test_percentile(self):
+        samples = list(range(1, 101))
+        self.assertEqual(percentile(samples, 0.50), 50)
+        self.assertEqual(percentile(samples, 0.95), 95)
+        self.assertEqual(percentile(samples, 0.99), 99)
+        self.assertIsNone(percentile([], 0.5))
+
+    def test_handler_names(self):
+        class CallableHandler:
+            def __call__(self):
+                pass
+
+        self.assertEqual(get_handler_name(partial(percentile, [])), 'economy.metrics.percentile')
+        self.assertTrue(get_handler_name(CallableHandler()).endswith('test_handler_names.<locals>.CallableHandler'))
+
+    def test_trigger_records_handlers_and_errors(self):
+        @self.event_manager.event('on_test')
+        def working_handler():
+            pass
+
+        @self.event_manager.event('on_test')
+        def failing_handler():
+            raise ValueError
+
+        with self.assertRaises(ValueError):
+            self.event_manager.trigger('on_test')
+        event = EVENT_METRICS.snapshot()['source.test.on_test']
+        self.assertEqual(event['triggers'], 1)
+        self.assertEqual(event['handler_calls'], 2)
+        self.assertEqual(event['errors'], 1)
+        self.assertIsNotNone(event['p99_ms'])
+        self.assertEqual(len(event['handlers']), 2)
+
+    def test_trigger_async_records_handlers(self):
+        @self.event_manager.event('on_test')
+        async def async_handler():
+            raise ValueError
+
+        with self.assertLogs('economy.util', level='ERROR'):
+            async_to_sync(self.event_manager.trigger_async)('on_test')
+        event = EVENT_METRICS.snapshot()['source.test.on_test']
+        self.assertEqual(event['triggers'], 1)
+        self.assertEqual(event['errors'], 1)
+
+    @override_settings(EVENTS={**METRICS_SETTINGS, 'METRICS': False})
+    def test_disabled_metrics_record_nothing(self):
+        self.event_manager.event('on_test')(lambda: None)
+        self.event_manager.trigger('on_test')
+        self.assertEqual(EVENT_METRICS.snapshot(), {})
+
+    def test_save_and_read(self):
+        metrics = EventMetrics()
+        metrics.record_handler('on_test', 'handler', 0.002)
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'metrics.json'
+            metrics.save(path)
+            snapshot = EventMetrics().read(path)
+        self.assertEqual(snapshot['events']['on_test']['handlers']['handler']['calls'], 1)
+        self.assertEqual(snapshot['events']['on_test']['p50_ms'], 2)
+
+@override_settings(EVENTS=METRICS_SETTINGS)
+class EventMetricsOutputTests(TestCase):
+    def setUp(self):
+        EVENT_METRICS.reset()
+        EVENT_METRICS.record_trigger('source.test.on_test')
+        EVENT_METRICS.record_handler('source.test.on_test', 'tests.handler', 0.001)
+
+    def tearDown(self):
+        EVENT_METRICS.reset()
+
+    def test_events_endpoint(self):
+        client = APIClient()
+        self.assertEqual(client.get('/api/events/').status_code, 403)
+        client.force_authenticate(User.objects.create_user('metrics'))
+        response = client.get('/api/events/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['events']['source.test.on_test']['triggers'], 1)
+
+    def test_dump_event_metrics_command(self):
+        output = StringIO()
+        call_command('dump_event_metrics', stdout=output)
+        self.assertIn('source.test.on_test: triggers=1', output.getvalue())
+        self.assertIn('tests.handler: calls=1', output.getvalue())
+
+        output = StringIO()
+        call_command('dump_event_metrics', '--json', stdout=output)
+        self.assertEqual(json.loads(output.getvalue())['events']['source.test.on_test']['handler_calls'], 1)
@@ -0,0 +1,52 @@
+from django.test import TestCase
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from apps.source.community.models import Citizen
+from apps.source.discord.models import Guild, Member
+from economy.registry import ItemRegistry
+from economy.serializers import DynamicFieldsModelSerializer
+
+
+class MemberNameSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Member
+        fields = ['id', 'name']
+
+class ItemRegistryTests(TestCase):
+    def setUp(self):
+        self.registry = ItemRegistry()
+
+    def test_model_is_memoized(self):
+        self.assertIs(self.registry.get_model('discord', 'Member'), Member)
+        self.assertIn(('discord', 'member'), self.registry.models)
+        self.assertIs(self.registry.get_model('discord', 'member'), Member)
+
+    def test_serializer_class_is_memoized(self):
+        serializer_class = self.registry.get_serializer_class(Member)
+        self.assertTrue(issubclass(serializer_class, DynamicFieldsModelSerializer))
+        self.assertIs(self.registry.get_serializer_class(Member), serializer_class)
+        self.assertIsNot(self.registry.get_serializer_class(Member, ['citizen']), serializer_class)
+        self.assertIs(self.registry.get_serializer_class(Member, ['citizen']), self.registry.get_serializer_class(Member, ['citizen']))
+
+    def test_unknown_relation_is_not_memoized(self):
+        with self.assertRaises(ValidationError):
+            self.registry.get_serializer_class(Member, ['owner'])
+        self.assertEqual(self.registry.serializer_classes, {})
+
+    def test_serializer_override(self):
+        self.registry.get_serializer_class(Member)
+        self.registry.register(Member, serializer_class=MemberNameSerializer)
+        serializer_class = self.registry.get_serializer_class(Member)
+        self.assertTrue(issubclass(serializer_class, MemberNameSerializer))
+
+        member = Member.objects.create(id='223456789012345670', name='Member 0', citizen=Citizen.objects.create(name='Citizen 0'))
+        self.assertEqual(serializer_class(member).data, {'id': member.id, 'name': 'Member 0'})
+        self.assertEqual(serializer_class(member, fields=['name']).data, {'name': 'Member 0'})
+
+    def test_queryset_override(self):
+        self.assertEqual(self.registry.get_queryset(Guild).count(), 0)
+        Guild.objects.create(id='123456789012345670', name='Guild 1', active=False)
+        self.registry.register(Guild, queryset=lambda: Guild.objects.filter(active=True))
+        self.assertEqual(self.registry.get_queryset(Guild).count(), 0)
+        self.assertEqual(self.registry.get_queryset(Member).model, Member)
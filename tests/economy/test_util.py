@@ -0,0 +1,90 @@
+import asyncio
+import threading
+import time
+from functools import partial
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, override_settings
+
+from economy.util import AppEventManager
+
+
+class AppEventManagerTests(SimpleTestCase):
+    def setUp(self):
+        self.event_manager = AppEventManager()
+        self.event_manager.register_event('on_test')
+
+    def test_trigger_async_runs_sync_and_async_handlers(self):
+        calls = []
+
+        @self.event_manager.event('on_test')
+        def sync_handler(value):
+            calls.append(('sync', value, threading.current_thread() is threading.main_thread()))
+            return 'sync'
+
+        @self.event_manager.event('on_test')
+        async def async_handler(value):
+            calls.append(('async', value))
+            return 'async'
+
+        results = async_to_sync(self.event_manager.trigger_async)('on_test', 1)
+        self.assertListEqual(results, ['sync', 'async'])
+        self.assertIn(('sync', 1, False), calls)
+        self.assertIn(('async', 1), calls)
+
+    def test_has_subscribers(self):
+        self.assertFalse(self.event_manager.has_subscribers('on_test'))
+        self.assertFalse(self.event_manager.has_subscribers('on_unknown'))
+
+        @self.event_manager.event('on_test')
+        def handler():
+            pass
+
+        self.assertTrue(self.event_manager.has_subscribers('on_test'))
+        self.event_manager.unsubscribe('on_test', handler)
+        self.assertFalse(self.event_manager.has_subscribers('on_test'))
+
+    def test_trigger_async_without_handlers(self):
+        self.assertListEqual(async_to_sync(self.event_manager.trigger_async)('on_unknown'), [])
+
+    @override_settings(EVENTS={'MAX_WORKERS': 2, 'HANDLER_TIMEOUT': 0.05, 'METRICS': False})
+    def test_slow_and_failing_handlers_are_isolated(self):
+        @self.event_manager.event('on_test')
+        async def slow_handler():
+            await asyncio.sleep(1)
+
+        @self.event_manager.event('on_test')
+        def failing_handler():
+            raise ValueError
+
+        @self.event_manager.event('on_test')
+        def working_handler():
+            return True
+
+        start = time.monotonic()
+        with self.assertLogs('economy.util', level='WARNING') as logs:
+            results = async_to_sync(self.event_manager.trigger_async)('on_test')
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertListEqual(results, [None, None, True])
+        self.assertEqual(len(logs.records), 2)
+
+    def test_failing_partial_handler_is_logged_by_name(self):
+        def failing_handler(value):
+            raise ValueError(value)
+
+        self.event_manager.event('on_test')(partial(failing_handler, 1))
+        with self.assertLogs('economy.util', level='WARNING') as logs:
+            results = async_to_sync(self.event_manager.trigger_async)('on_test')
+        self.assertListEqual(results, [None])
+        self.assertIn('failing_handler', logs.output[0])
+
+    def test_sync_handlers_close_old_connections(self):
+        @self.event_manager.event('on_test')
+        def sync_handler():
+            return True
+
+        with patch('economy.util.close_old_connections') as close_old_connections:
+            results = async_to_sync(self.event_manager.trigger_async)('on_test')
+        self.assertListEqual(results, [True])
+        self.assertEqual(close_old_connections.call_count, 2)
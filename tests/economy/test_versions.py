@@ -0,0 +1,64 @@
+from django.contrib.auth.models import User
+from django.db.models.deletion import Collector
+from django.test import TestCase, override_settings
+
+from apps.source.bank.models import Currency, Account, AccountCurrencyBalance
+from apps.source.bank.util import bulk_deposit
+from apps.source.community.models import Citizen
+from apps.source.activity.models import VoiceActivityTracker
+from apps.source.discord.models import Guild, Member, TextChannel
+from apps.source.leaderboard.models import LeaderboardEntry
+from economy.versions import MODEL_VERSIONS, is_versioned_model
+
+
+@override_settings(ITEM_API={'VERSION_CACHE': 'default', 'VERSIONED_MODELS': ['discord.guild', 'bank.accountcurrencybalance']})
+class ModelVersionsTests(TestCase):
+    def test_version_is_stable_until_bumped(self):
+        version = MODEL_VERSIONS.get(Guild)
+        self.assertEqual(MODEL_VERSIONS.get(Guild), version)
+        with self.captureOnCommitCallbacks(execute=True):
+            MODEL_VERSIONS.bump(Guild)
+        self.assertNotEqual(MODEL_VERSIONS.get(Guild), version)
+
+    def test_bump_waits_for_commit(self):
+        version = MODEL_VERSIONS.get(Guild)
+        with self.captureOnCommitCallbacks() as callbacks:
+            Guild.objects.create(id='123456789012345670', name='Guild 1')
+            self.assertEqual(MODEL_VERSIONS.get(Guild), version)
+        self.assertEqual(len(callbacks), 1)
+
+    def test_only_configured_models_are_versioned(self):
+        self.assertTrue(is_versioned_model(Guild))
+        self.assertFalse(is_versioned_model(VoiceActivityTracker))
+        self.assertFalse(is_versioned_model(User))
+
+    def test_unversioned_model_writes_do_not_bump(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertEqual(MODEL_VERSIONS.bump(VoiceActivityTracker), [])
+            User.objects.create_user('versions')
+        self.assertEqual(callbacks, [])
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertEqual(len(MODEL_VERSIONS.bump(VoiceActivityTracker, force=True)), 1)
+        self.assertEqual(len(callbacks), 1)
+
+    def test_bulk_deposit_bumps_balances(self):
+        currency = Currency.objects.create(name='point', decimal_places=2)
+        account = Account.objects.create(owner=Citizen.objects.create(name='Citizen 0'))
+        version = MODEL_VERSIONS.get(AccountCurrencyBalance)
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_deposit({account: 10}, currency)
+        self.assertNotEqual(MODEL_VERSIONS.get(AccountCurrencyBalance), version)
+
+    def test_unversioned_models_keep_fast_deletes(self):
+        collector = Collector(using='default')
+        self.assertTrue(collector.can_fast_delete(TextChannel.objects.all()))
+        self.assertTrue(collector.can_fast_delete(LeaderboardEntry.objects.all()))
+        self.assertFalse(collector.can_fast_delete(Guild.objects.all()))
+
+    def test_many_to_many_change_from_unversioned_side_bumps(self):
+        guild = Guild.objects.create(id='123456789012345670', name='Guild 1')
+        member = Member.objects.create(id='223456789012345670', name='Member 0', citizen=Citizen.objects.create(name='Citizen 0'))
+        version = MODEL_VERSIONS.get(Guild)
+        with self.captureOnCommitCallbacks(execute=True):
+            member.guilds.add(guild)
+        self.assertNotEqual(MODEL_VERSIONS.get(Guild), version)
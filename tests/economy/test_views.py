@@ -0,0 +1,209 @@
+import csv
+import json
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.source.community.models import Citizen
+from apps.source.discord.models import Guild, Member
+from economy.registry import ITEM_REGISTRY
+from economy.versions import MODEL_VERSIONS
+
+
+ITEM_API_SETTINGS = {
+    'PAGE_SIZE': 2,
+    'MAX_PAGE_SIZE': 3,
+    'EXPORT_CHUNK_SIZE': 2,
+    'VERSION_CACHE': 'default',
+    'VERSIONED_MODELS': ['discord.member', 'discord.guild', 'community.citizen'],
+}
+MEMBERS_URL = '/api/apps/source/discord/member/'
+
+@override_settings(ITEM_API=ITEM_API_SETTINGS)
+class ItemViewSetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('items'))
+        self.guild = Guild.objects.create(id='123456789012345670', name='Guild 1')
+        self.members = []
+        for index in range(5):
+            citizen = Citizen.objects.create(name=f'Citizen {index}')
+            member = Member.objects.create(id=str(223456789012345670 + index), name=f'Member {index}', citizen=citizen)
+            member.guilds.add(self.guild)
+            self.members.append(member)
+
+    def get_all_pages(self, url):
+        results = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            results += response.json()['results']
+            url = response.json()['next']
+        return results
+
+    def test_cursor_pagination(self):
+        response = self.client.get(MEMBERS_URL)
+        self.assertEqual(len(response.json()['results']), 2)
+        self.assertNotIn('count', response.json())
+        results = self.get_all_pages(MEMBERS_URL)
+        self.assertEqual([result['id'] for result in results], [member.id for member in self.members])
+
+    def test_page_size_is_capped(self):
+        response = self.client.get(MEMBERS_URL, {'page_size': 100})
+        self.assertEqual(len(response.json()['results']), 3)
+
+    def test_page_queries_do_not_scale_with_depth(self):
+        url = self.client.get(MEMBERS_URL).json()['next']
+        with CaptureQueriesContext(connection) as first_page:
+            self.client.get(MEMBERS_URL)
+        with CaptureQueriesContext(connection) as next_page:
+            self.client.get(url)
+        self.assertEqual(len(first_page.captured_queries), len(next_page.captured_queries))
+        self.assertNotIn('OFFSET', next_page.captured_queries[0]['sql'])
+
+    def test_fields_projection(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(MEMBERS_URL, {'fields': 'name'})
+        self.assertEqual(response.json()['results'][0], {'name': 'Member 0'})
+        self.assertNotIn('citizen_id', queries.captured_queries[0]['sql'])
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get(MEMBERS_URL, {'fields': 'name,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('fields', response.json())
+
+    def test_expand_forward_relation(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(MEMBERS_URL, {'fields': 'name', 'expand': 'citizen'})
+        result = response.json()['results'][0]
+        self.assertEqual(result['citizen'], {'id': self.members[0].citizen.id, 'name': 'Citizen 0'})
+
+    def test_expand_many_to_many(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(MEMBERS_URL, {'expand': 'guilds'})
+        self.assertEqual(response.json()['results'][0]['guilds'][0]['id'], self.guild.id)
+
+    def test_expand_reverse_relation(self):
+        response = self.client.get('/api/apps/source/discord/guild/', {'expand': 'members'})
+        self.assertEqual(len(response.json()['results'][0]['members']), 5)
+
+    def test_unknown_relation_is_rejected(self):
+        response = self.client.get(MEMBERS_URL, {'expand': 'owner'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('expand', response.json())
+
+    def test_many_to_many_ids_are_prefetched(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(MEMBERS_URL)
+        self.assertEqual(response.json()['results'][0]['guilds'], [self.guild.id])
+
+    def test_retrieve_with_fields(self):
+        response = self.client.get(f'{MEMBERS_URL}{self.members[1].id}/', {'fields': 'id,name'})
+        self.assertEqual(response.json(), {'id': self.members[1].id, 'name': 'Member 1'})
+
+    def test_writes_ignore_projection(self):
+        response = self.client.patch(f'{MEMBERS_URL}{self.members[1].id}/?fields=id', {'name': 'Renamed'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['name'], 'Renamed')
+
+    def test_serializer_class_is_reused_across_requests(self):
+        self.client.get(MEMBERS_URL)
+        serializer_classes = dict(ITEM_REGISTRY.serializer_classes)
+        self.client.get(MEMBERS_URL)
+        self.assertEqual(ITEM_REGISTRY.serializer_classes, serializer_classes)
+        self.assertIn((Member, ()), serializer_classes)
+
+    def get_export(self, params=None):
+        response = self.client.get(f'{MEMBERS_URL}export/', params or {})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_export_ndjson(self):
+        rows = [json.loads(line) for line in self.get_export().splitlines()]
+        self.assertEqual(rows[0], {'id': self.members[0].id, 'name': 'Member 0', 'citizen': self.members[0].citizen.id})
+        self.assertEqual([row['id'] for row in rows], [member.id for member in self.members])
+
+    def test_export_csv(self):
+        rows = list(csv.reader(self.get_export({'output': 'csv', 'fields': 'id,name'}).splitlines()))
+        self.assertEqual(rows[0], ['id', 'name'])
+        self.assertEqual(rows[1], [self.members[0].id, 'Member 0'])
+        self.assertEqual(len(rows), 6)
+
+    def test_export_since_and_filters(self):
+        rows = [json.loads(line) for line in self.get_export({'since': self.members[2].id}).splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.members[3].id, self.members[4].id])
+        rows = [json.loads(line) for line in self.get_export({'name': 'Member 1'}).splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.members[1].id])
+
+    def test_export_rejects_bad_parameters(self):
+        self.assertEqual(self.client.get(f'{MEMBERS_URL}export/', {'output': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.get(f'{MEMBERS_URL}export/', {'fields': 'guilds'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/apps/source/discord/guild/export/', {'active': 'maybe'}).status_code, 400)
+
+    def get_conditional(self, url, params=None):
+        response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        return self.client.get(url, params or {}, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_list_not_modified(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.get_conditional(MEMBERS_URL)
+        self.assertEqual(response.status_code, 304)
+
+    def test_list_not_modified_skips_database(self):
+        etag = self.client.get(MEMBERS_URL)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(MEMBERS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_list_is_modified_by_save(self):
+        etag = self.client.get(MEMBERS_URL)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.members[0].name = 'Renamed'
+            self.members[0].save()
+        response = self.client.get(MEMBERS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['name'], 'Renamed')
+
+    def test_list_is_modified_by_many_to_many_change(self):
+        etag = self.client.get(MEMBERS_URL)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.members[0].guilds.clear()
+        self.assertEqual(self.client.get(MEMBERS_URL, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_list_is_modified_by_expanded_relation(self):
+        etag = self.client.get(MEMBERS_URL, {'expand': 'citizen'})['ETag']
+        unexpanded_etag = self.client.get(MEMBERS_URL)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Citizen.objects.filter(id=self.members[0].citizen_id).update(name='Renamed')
+            MODEL_VERSIONS.bump(Citizen)
+        self.assertEqual(self.client.get(MEMBERS_URL, {'expand': 'citizen'}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertEqual(self.client.get(MEMBERS_URL, HTTP_IF_NONE_MATCH=unexpanded_etag).status_code, 304)
+
+    def test_unversioned_models_have_no_etag(self):
+        response = self.client.get('/api/apps/source/community/citizen/')
+        self.assertIn('ETag', response)
+        response = self.client.get(MEMBERS_URL, {'expand': 'voiceactivitytracker'})
+        self.assertNotIn('ETag', response)
+
+    def test_pages_have_their_own_etags(self):
+        first_page = self.client.get(MEMBERS_URL)
+        next_page = self.client.get(first_page.json()['next'])
+        self.assertNotEqual(first_page['ETag'], next_page['ETag'])
+
+    def test_discovery_not_modified(self):
+        for url in ['/api/apps/', '/api/apps/source/', '/api/apps/source/discord/']:
+            response = self.get_conditional(url)
+            self.assertEqual(response.status_code, 304)
+
+    def test_discovery_response_is_cached(self):
+        self.client.get('/api/apps/source/discord/')
+        with patch('economy.views.apps.get_app_config') as get_app_config:
+            response = self.client.get('/api/apps/source/discord/')
+        get_app_config.assert_not_called()
+        self.assertIn('member', response.json())